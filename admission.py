@@ -0,0 +1,250 @@
+"""Admission control for expensive routes
+
+Routes are grouped into classes (uploads, bulk imports, exports, list pages,
+searches). Before a request of a class runs, two checks apply:
+
+* A per-client token bucket (``rate`` requests per second, bursts of up to
+  ``burst``). A client over its rate gets 429 at once, with Retry-After set
+  to when its next token is due. Buckets live in a ``MemoryBucketStore``
+  (per process) or a ``RedisBucketStore`` shared by every worker and host.
+* A concurrency limit with a bounded wait queue. At most ``concurrency``
+  requests of the class run at a time, and up to ``queue`` more wait up to
+  ``max_wait`` seconds for a slot. Anything beyond that gets 503 with
+  Retry-After instead of piling up until it times out.
+
+Everything else, /health in particular, is never queued behind these
+routes. Limits are per process. List pages and searches may run as many
+requests as the worker has DB connections, since more would only queue for
+a connection; uploads, exports and bulk imports hold a thread (and for
+exports a connection) for a long time, so they get a few slots each.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+def default_limits(pool_size=10):
+    """Limits for each route class, with list/search concurrency sized from the DB pool"""
+    return {
+        'upload': {'concurrency': 2, 'queue': 2, 'max_wait': 5, 'rate': 0.2, 'burst': 5},
+        'bulk_import': {'concurrency': 1, 'queue': 0, 'max_wait': 0, 'rate': 0.01, 'burst': 2},
+        'export': {'concurrency': 2, 'queue': 0, 'max_wait': 0, 'rate': 0.1, 'burst': 3},
+        'list': {'concurrency': pool_size, 'queue': pool_size * 4, 'max_wait': 5, 'rate': 10, 'burst': 50},
+        'search': {'concurrency': pool_size, 'queue': pool_size * 4, 'max_wait': 5, 'rate': 10, 'burst': 50},
+    }
+
+
+class Rejected(Exception):
+    """A request turned away; carries the status and Retry-After seconds to answer with"""
+
+    def __init__(self, status, reason, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ----------------------------------------------------------------------
+# Token buckets
+# ----------------------------------------------------------------------
+class MemoryBucketStore:
+    """Per-process token buckets; the least recently seen clients are forgotten past ``max_clients``"""
+
+    def __init__(self, max_clients=100000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token; returns ``(allowed, seconds until the next token)``"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                # A forgotten client starts over with a full bucket, which errs on the lenient side
+                self._buckets.popitem(last=False)
+        return allowed, (1 - tokens) / rate if tokens < 1 else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {'clients': len(self._buckets), 'backend': 'memory'}
+
+
+# Refill and take in one step on the Redis server, using its clock so every host agrees
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Token buckets shared through Redis; lets requests through while Redis is unreachable"""
+
+    def __init__(self, client, prefix='hrms:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._lock = threading.Lock()
+        self._errors = 0
+
+    def take(self, key, rate, burst):
+        try:
+            allowed, tokens = self._take(keys=[self.prefix + key], args=[rate, burst])
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            return True, 0.0
+        tokens = float(tokens)
+        return bool(allowed), (1 - tokens) / rate if tokens < 1 else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {'errors': self._errors, 'backend': 'redis'}
+
+
+def create_bucket_store(backend='memory', redis_url=None):
+    """Build a token bucket store from config values"""
+    if backend == 'redis':
+        import redis
+        return RedisBucketStore(redis.Redis.from_url(redis_url))
+    return MemoryBucketStore()
+
+
+# ----------------------------------------------------------------------
+# Concurrency limits
+# ----------------------------------------------------------------------
+class ConcurrencyLimiter:
+    """At most ``limit`` holders at a time, with up to ``queue_size`` waiting ``max_wait`` seconds"""
+
+    def __init__(self, limit, queue_size=0, max_wait=0):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0}
+
+    def acquire(self):
+        """Take a slot; returns the seconds spent waiting, or raises Rejected"""
+        started = time.monotonic()
+        waited = 0.0
+        retry_after = max(1, math.ceil(self.max_wait))
+        with self._cond:
+            if self._active >= self.limit:
+                if self._waiting >= self.queue_size:
+                    self._stats['rejected_queue_full'] += 1
+                    raise Rejected(503, 'queue_full', retry_after, "Server is busy, please retry shortly.")
+                self._waiting += 1
+                self._stats['queued'] += 1
+                try:
+                    deadline = started + self.max_wait
+                    while self._active >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats['rejected_timeout'] += 1
+                            raise Rejected(503, 'timeout', retry_after, "Server is busy, please retry shortly.")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                waited = time.monotonic() - started
+            self._active += 1
+            self._stats['admitted'] += 1
+        return waited
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(active=self._active, queue_depth=self._waiting,
+                         limit=self.limit, queue_size=self.queue_size)
+        return stats
+
+
+class Slot:
+    """A held concurrency slot; ``release`` may be called more than once"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter.release()
+
+
+class AdmissionControl:
+    """Rate and concurrency limits for each route class"""
+
+    def __init__(self, limits=None, store=None, pool_size=10):
+        defaults = default_limits(pool_size)
+        self.limits = {name: dict(defaults.get(name, {}), **settings)
+                       for name, settings in dict(defaults, **(limits or {})).items()}
+        self.store = store or MemoryBucketStore()
+        self.limiters = {name: ConcurrencyLimiter(settings['concurrency'], settings['queue'], settings['max_wait'])
+                         for name, settings in self.limits.items()}
+        self._rate_limited = {name: 0 for name in self.limits}
+        self._lock = threading.Lock()
+
+    def admit(self, route_class, client):
+        """Slot for a request of ``route_class`` from ``client``, or raises Rejected"""
+        settings = self.limits[route_class]
+        if settings.get('rate'):
+            allowed, retry_after = self.store.take(f"{route_class}:{client}", settings['rate'], settings['burst'])
+            if not allowed:
+                with self._lock:
+                    self._rate_limited[route_class] += 1
+                metrics.ADMISSION_REJECTIONS.inc(route_class, 'rate_limited')
+                raise Rejected(429, 'rate_limited', max(1, math.ceil(retry_after)),
+                               "Too many requests, please slow down.")
+        limiter = self.limiters[route_class]
+        try:
+            waited = limiter.acquire()
+        except Rejected as e:
+            metrics.ADMISSION_REJECTIONS.inc(route_class, e.reason)
+            raise
+        metrics.ADMISSION_WAIT_SECONDS.observe(waited, route_class)
+        if waited:
+            metrics.record('queue', waited)
+        return Slot(limiter)
+
+    def class_stats(self, route_class):
+        stats = self.limiters[route_class].stats()
+        with self._lock:
+            stats['rejected_rate_limited'] = self._rate_limited[route_class]
+        return stats
+
+    def stats(self):
+        stats = {name: self.class_stats(name) for name in self.limits}
+        stats['rate_limit_store'] = self.store.stats()
+        return stats
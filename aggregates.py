@@ -0,0 +1,239 @@
+"""Precomputed headcount aggregates for the dashboard
+
+``employee_counts`` holds one row per (dimension, value): the total headcount,
+and the headcount per location, per normalized skill (see skills.py) and per
+hire month. Writers bump the affected rows inside their own insert
+transaction. Reading the dashboard is therefore a few indexed lookups over a
+table that grows with the number of distinct locations, skills and months,
+not with the number of employees.
+
+A periodic full rebuild from ``employees`` corrects any drift, such as rows
+written by manual SQL or tools that skip the incremental path. A rebuild
+counts from a consistent snapshot without blocking anyone, then swaps the
+counts in under the change-counter row lock that every writer takes to
+allocate its change version. If a writer committed since the snapshot, the
+counts would miss it, so the rebuild starts over; the last attempt counts
+while holding the lock, so a busy table can't starve it.
+
+Values compare byte for byte (``utf8mb4_bin``), like skill names, so
+"London" and "london" are counted apart both incrementally and on rebuild.
+"""
+import threading
+from collections import Counter
+
+import changes
+import skills
+
+COUNTS_TABLE = 'employee_counts'
+STATE_TABLE = 'employee_counts_state'
+
+# How each dimension's value is derived from an employees row during a rebuild
+_REBUILD_EXPRESSIONS = {
+    'location': "CONVERT(COALESCE(TRIM(location), '') USING utf8mb4) COLLATE utf8mb4_bin",
+    'month': "COALESCE(DATE_FORMAT(created_at, '%Y-%m'), '')",
+}
+
+
+def create_aggregate_tables(cursor):
+    """Create the counts and rebuild-state tables (idempotent)"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTS_TABLE} (
+            dimension VARCHAR(16) NOT NULL,
+            value VARCHAR(200) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            headcount INT NOT NULL,
+            PRIMARY KEY (dimension, value),
+            INDEX idx_counts_rank (dimension, headcount)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            id TINYINT PRIMARY KEY,
+            rebuilt_at TIMESTAMP NULL
+        )
+    """)
+    cursor.execute(f"INSERT IGNORE INTO {STATE_TABLE} (id, rebuilt_at) VALUES (1, NULL)")
+
+
+def use_binary_values(cursor):
+    """Switch a counts table created before values were compared byte for byte"""
+    cursor.execute(f"ALTER TABLE {COUNTS_TABLE} MODIFY value VARCHAR(200) "
+                   "CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL")
+
+
+def never_rebuilt(cursor):
+    cursor.execute(f"SELECT rebuilt_at FROM {STATE_TABLE} WHERE id = 1")
+    row = cursor.fetchone()
+    return row is None or row[0] is None
+
+
+def _apply(cursor, deltas):
+    rows = [(dimension, value, delta) for (dimension, value), delta in sorted(deltas.items()) if delta]
+    if rows:
+        cursor.executemany(
+            f"INSERT INTO {COUNTS_TABLE} (dimension, value, headcount) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE headcount = headcount + VALUES(headcount)",
+            rows
+        )
+
+
+def _location(value):
+    # TRIM() in the rebuild strips spaces only, not tabs or newlines
+    return (value or '').strip(' ')
+
+
+def record_inserts(cursor, employees):
+    """Count newly inserted employees, given as ``(location, pri_skill)`` pairs (inside the insert's transaction)"""
+    # Month of the database clock, which is what created_at defaults to
+    cursor.execute("SELECT DATE_FORMAT(CURRENT_TIMESTAMP, '%Y-%m')")
+    month = cursor.fetchone()[0]
+    deltas = Counter()
+    for location, pri_skill in employees:
+        deltas[('total', '')] += 1
+        deltas[('location', _location(location))] += 1
+        for skill in skills.parse_skills(pri_skill):
+            deltas[('skill', skill)] += 1
+        deltas[('month', month)] += 1
+    _apply(cursor, deltas)
+
+
+def record_delete(cursor, location, pri_skill, month):
+    """Uncount a deleted employee (inside the delete's transaction)"""
+    deltas = Counter({('total', ''): -1, ('location', _location(location)): -1, ('month', month or ''): -1})
+    for skill in skills.parse_skills(pri_skill):
+        deltas[('skill', skill)] -= 1
+    _apply(cursor, deltas)
+
+
+def _count_rows(cursor):
+    """``(dimension, value, headcount)`` for every count, computed from ``employees``"""
+    cursor.execute("SELECT 'total', '', COUNT(*) FROM employees")
+    rows = list(cursor.fetchall())
+    for dimension, expression in _REBUILD_EXPRESSIONS.items():
+        cursor.execute(f"SELECT '{dimension}', {expression}, COUNT(*) FROM employees GROUP BY {expression}")
+        rows.extend(cursor.fetchall())
+    cursor.execute(
+        f"SELECT 'skill', s.name, COUNT(*) FROM {skills.LINK_TABLE} es "
+        f"JOIN {skills.SKILLS_TABLE} s ON s.skill_id = es.skill_id GROUP BY s.skill_id, s.name"
+    )
+    rows.extend(cursor.fetchall())
+    return rows
+
+
+def _rebuilt_within(cursor, min_age, lock=False):
+    cursor.execute(f"SELECT TIMESTAMPDIFF(SECOND, rebuilt_at, CURRENT_TIMESTAMP) FROM {STATE_TABLE} "
+                   "WHERE id = 1" + (" FOR UPDATE" if lock else ""))
+    row = cursor.fetchone()
+    return bool(min_age and row and row[0] is not None and row[0] < min_age)
+
+
+def rebuild(cursor, min_age=None, attempts=3):
+    """Recompute every count from ``employees`` in transactions of its own
+
+    Returns False, changing nothing, when the counts were already rebuilt
+    less than ``min_age`` seconds ago (by this or any other process).
+    """
+    conn = cursor.connection
+    for attempt in range(attempts):
+        under_lock = attempt == attempts - 1
+        # The snapshot must cover both the counter and the counts, whatever the server's default isolation
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("START TRANSACTION" if under_lock else "START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        try:
+            if not under_lock:
+                if _rebuilt_within(cursor, min_age):
+                    conn.rollback()
+                    return False
+                cursor.execute(f"SELECT version FROM {changes.COUNTER_TABLE} WHERE id = 1")
+                counted_at = cursor.fetchone()
+                rows = _count_rows(cursor)
+            # Writers allocate change versions under this lock; holding it keeps them out until commit
+            cursor.execute(f"SELECT version FROM {changes.COUNTER_TABLE} WHERE id = 1 FOR UPDATE")
+            current = cursor.fetchone()
+            if not under_lock and current != counted_at:
+                conn.rollback()
+                continue
+            if _rebuilt_within(cursor, min_age, lock=True):
+                conn.rollback()
+                return False
+            if under_lock:
+                rows = _count_rows(cursor)
+            cursor.execute(f"DELETE FROM {COUNTS_TABLE}")
+            if rows:
+                cursor.executemany(f"INSERT INTO {COUNTS_TABLE} (dimension, value, headcount) VALUES (%s, %s, %s)",
+                                   rows)
+            cursor.execute(f"UPDATE {STATE_TABLE} SET rebuilt_at = CURRENT_TIMESTAMP WHERE id = 1")
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def summary(cursor, top=10, months=12):
+    """Total headcount, the largest locations and skills, and hires over the latest months"""
+    cursor.execute(f"SELECT headcount FROM {COUNTS_TABLE} WHERE dimension = 'total'")
+    row = cursor.fetchone()
+    result = {'total': row[0] if row else 0}
+    for key, dimension, order, limit in (('by_location', 'location', 'headcount DESC, value', top),
+                                         ('by_skill', 'skill', 'headcount DESC, value', top),
+                                         ('hires_by_month', 'month', 'value DESC', months)):
+        cursor.execute(
+            f"SELECT value, headcount FROM {COUNTS_TABLE} WHERE dimension = %s AND headcount > 0 "
+            f"ORDER BY {order} LIMIT %s",
+            (dimension, limit)
+        )
+        result[key] = [{'value': value, 'headcount': headcount} for value, headcount in cursor.fetchall()]
+    # Oldest month first, the way a timeline reads
+    result['hires_by_month'].reverse()
+    cursor.execute(f"SELECT rebuilt_at FROM {STATE_TABLE} WHERE id = 1")
+    row = cursor.fetchone()
+    result['rebuilt_at'] = row[0] if row else None
+    return result
+
+
+class AggregateRebuilder:
+    """Rebuilds the counts from a connection pool every ``interval`` seconds
+
+    Every web worker runs one, but a rebuild is skipped when another worker
+    did one within the last half interval, so a fleet rebuilds about once per
+    interval in total.
+    """
+
+    def __init__(self, pool, interval=3600, on_rebuild=None):
+        self.pool = pool
+        self.interval = interval
+        self.on_rebuild = on_rebuild
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rebuild_now(self, min_age=None):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                rebuilt = rebuild(cursor, min_age)
+            finally:
+                cursor.close()
+        if rebuilt and self.on_rebuild:
+            self.on_rebuild()
+        return rebuilt
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.rebuild_now(min_age=self.interval / 2):
+                    print("📊 Dashboard aggregates rebuilt")
+            except Exception as e:
+                print(f"⚠️ Aggregate rebuild failed: {e}")
+
+    def start(self):
+        if self._thread or not self.interval:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='aggregate-rebuild', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
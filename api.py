@@ -0,0 +1,75 @@
+"""JSON representation of employees for the /api/v1 endpoints
+
+Rows come from the same cached queries as the HTML pages and are projected
+onto the requested ``fields``. Every response carries a weak ETag of its
+body, so clients that poll with If-None-Match get an empty 304 while nothing
+changed. Single employees also carry Last-Modified. Lists and searches do not:
+a delete, or a row dropping out of the results, changes them without a newer
+updated_at, so only their ETag is reliable.
+The change feed (/api/changes) serializes rows with the same helpers.
+"""
+import hashlib
+import json
+from datetime import timezone
+
+from flask import current_app, request
+
+from schema import EMPLOYEE_FIELDS
+
+
+def parse_fields(value):
+    """Turn ``fields=a,b,c`` into a tuple of column names (all columns when empty)"""
+    if not value:
+        return EMPLOYEE_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in EMPLOYEE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(EMPLOYEE_FIELDS)}")
+    return fields
+
+
+def employee_dict(row, fields=EMPLOYEE_FIELDS, image_href=None):
+    """One employee row (in EMPLOYEE_COLUMNS order) as a JSON-ready dict
+
+    ``image_href`` turns the stored image URL into one a browser can load;
+    without it the storage URL (``s3://...``) is kept, as sync consumers need.
+    """
+    record = dict(zip(EMPLOYEE_FIELDS, row))
+    result = {}
+    for field in fields:
+        value = record.get(field)
+        if field in ('created_at', 'updated_at') and value is not None:
+            value = value.replace(tzinfo=timezone.utc).isoformat()
+        elif field == 'image_url' and image_href is not None:
+            value = image_href(value)
+        elif field == 'image_variants':
+            value = [int(w) for w in str(value or '').split(',') if w.strip().isdigit()]
+        result[field] = value
+    return result
+
+
+def last_modified(rows):
+    """Newest ``updated_at`` of the rows, for the Last-Modified header"""
+    stamps = [r['updated_at'] or r['created_at'] for r in (dict(zip(EMPLOYEE_FIELDS, row)) for row in rows)]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    if not stamps:
+        return None
+    return max(stamps).replace(tzinfo=timezone.utc)
+
+
+def json_response(payload, status=200, modified=None):
+    """Serialize ``payload`` with a weak ETag and answer conditional GETs with 304"""
+    body = json.dumps(payload, separators=(',', ':'), sort_keys=True, default=str).encode()
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    if status == 200:
+        response.set_etag(hashlib.sha256(body).hexdigest()[:32], weak=True)
+        if modified is not None:
+            response.last_modified = modified
+        # Caches may keep the body but must ask again before reusing it
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+    return response
+
+
+def error_response(message, status):
+    return json_response({"error": message}, status=status)
@@ -1,185 +1,593 @@
-from flask import Flask, render_template, request, redirect
-from pymysql import connections
+from flask import (Flask, Request, render_template, stream_template, stream_with_context, request, redirect, g,
+                   has_request_context)
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-import boto3
-import re
+import io
+import threading
+import time
+import uuid
+import base64
+import json
+import binascii
+from datetime import datetime, timezone
+import pymysql
 from botocore.exceptions import ClientError, NoCredentialsError
+import config
 from config import *
+from db_pool import ConnectionPool, PoolError
+from replicas import ReplicaRouter
+from schema import EMPLOYEE_COLUMNS, UTC_SESSION
+import search
+import skills
+from cache import create_cache, employee_key
+from health_monitor import HealthMonitor
+import metrics
+from profiler import SamplingProfiler
+from storage import (IMMUTABLE_CACHE_CONTROL, create_s3_client, delete_object, delete_objects, image_keys,
+                     key_from_s3_uri, presign_employee_upload, read_object, s3_uri, upload_employee_image,
+                     verify_direct_upload)
+from images import ImageError, MAX_IMAGE_BYTES, sniff_upload, variant_url
+from upload_queue import UploadQueue
+from validators import employee_error
+import bulk_import
+import api
+import admission
+import changes
+import aggregates
+import idempotency
+import export
+import migrations
+from compression import gzip_response
+import delivery
+import fragments
+import fix_s3_permissions
+import assets
 
 app = Flask(__name__)
 app.secret_key = 'aws-emp-management-secret-key-2024'
 
+# Request/SQL/S3/template timings for /metrics and the Server-Timing header
+metrics.instrument_app(app)
+metrics.SLOW_QUERY_SECONDS = getattr(config, 'slow_query_ms', 200) / 1000.0
+
+GZIP_MIN_BYTES = getattr(config, 'gzip_min_bytes', 1024)
+GZIP_LEVEL = getattr(config, 'gzip_level', 6)
+
+@app.after_request
+def compress_response(response):
+    """gzip HTML/JSON responses for clients that accept it"""
+    if GZIP_LEVEL:
+        gzip_response(response, request.accept_encodings, GZIP_MIN_BYTES, GZIP_LEVEL)
+    return response
+
+# Expensive routes get per-client rate limits and per-class concurrency limits; the rest never wait
+ADMISSION_CLASSES = {
+    ('POST', '/addemp'): 'upload',
+    ('POST', '/api/uploads/confirm'): 'upload',
+    ('POST', '/bulk-import'): 'bulk_import',
+    ('POST', '/bulk-import/<job_id>/resume'): 'bulk_import',
+    ('GET', '/listemp'): 'list',
+    ('GET', '/export'): 'export',
+    ('POST', '/fetchdata'): 'search',
+    ('GET', '/api/v1/employees/search'): 'search',
+}
+ADMISSION_ENABLED = getattr(config, 'admission_enabled', True)
+admission_control = admission.AdmissionControl(
+    getattr(config, 'admission_limits', None),
+    store=admission.create_bucket_store(
+        backend=getattr(config, 'rate_limit_backend', 'memory'),
+        redis_url=getattr(config, 'rate_limit_redis_url', getattr(config, 'cache_redis_url', None)),
+    ),
+    pool_size=getattr(config, 'db_pool_size', 10),
+)
+for _route_class in admission_control.limits:
+    metrics.register_gauges(f'hrms_admission_{_route_class}',
+                            lambda route_class=_route_class: admission_control.class_stats(route_class))
+
+# Behind a load balancer, rate limits must key on the client address it forwards.
+# Required in production: with 0, every client shares the load balancer's buckets.
+TRUSTED_PROXY_HOPS = getattr(config, 'trusted_proxy_hops', 0)
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+_proxy_warned = False
+
+# Form fields around the profile image in an /addemp upload
+FORM_OVERHEAD_BYTES = 64 * 1024
+BULK_IMPORT_MAX_BYTES = getattr(config, 'bulk_import_max_bytes', 512 * 1024 * 1024)
+BODY_LIMITS = {
+    '/addemp': MAX_IMAGE_BYTES + FORM_OVERHEAD_BYTES,
+    '/bulk-import': BULK_IMPORT_MAX_BYTES,
+}
+
+class LimitedRequest(Request):
+    """Request whose body size limit depends on the route (BODY_LIMITS)"""
+
+    @property
+    def max_content_length(self):
+        if self.url_rule is not None and self.url_rule.rule in BODY_LIMITS:
+            return BODY_LIMITS[self.url_rule.rule]
+        return super().max_content_length
+
+app.request_class = LimitedRequest
+
+def wants_json():
+    return request.path.startswith('/api/') or request.accept_mimetypes.best == 'application/json'
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    if request.url_rule is not None and request.url_rule.rule == '/bulk-import':
+        message = f"Import is too large. Uploads can be at most {BULK_IMPORT_MAX_BYTES // (1024 * 1024)} MB."
+    else:
+        message = f"Upload is too large. Profile images can be at most {MAX_IMAGE_BYTES // (1024 * 1024)} MB."
+    if wants_json():
+        return api.error_response(message, 413)
+    return render_template('error.html', message=message), 413
+
+@app.before_request
+def admit_request():
+    """Reject oversized uploads unread, then apply the route's rate and concurrency limits"""
+    global _proxy_warned
+    route_class = ADMISSION_CLASSES.get((request.method, request.url_rule.rule if request.url_rule else None))
+    if route_class is None:
+        return None
+    limit = request.max_content_length
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    if not ADMISSION_ENABLED:
+        return None
+    if route_class == 'list' and request.args.get('stream') == '1':
+        # The full directory streams for as long as an export does
+        route_class = 'export'
+    if not TRUSTED_PROXY_HOPS and not _proxy_warned and 'X-Forwarded-For' in request.headers:
+        _proxy_warned = True
+        print("⚠️ Requests arrive through a proxy but trusted_proxy_hops is 0; "
+              "all clients share one rate limit bucket (set trusted_proxy_hops)")
+    try:
+        g.admission_slot = admission_control.admit(route_class, request.remote_addr or 'unknown')
+    except admission.Rejected as e:
+        if wants_json():
+            response = api.error_response(str(e), e.status)
+        else:
+            response = app.make_response((render_template('error.html', message=str(e)), e.status))
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+@app.after_request
+def hold_admission_slot(response):
+    """Release the slot, or for streamed lists and exports, once the body has been sent"""
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        if response.is_streamed:
+            response.call_on_close(slot.release)
+        else:
+            slot.release()
+    return response
+
+@app.teardown_request
+def release_admission_slot(exc):
+    # Only reached with the slot still in g when no response was produced
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        slot.release()
+
 print("🚀 Initializing AWS Employee Management System...")
 
-# Initialize AWS services
-try:
-    # RDS Database connection
-    db_conn = connections.Connection(
-        host=host,
-        port=3306,
+# Nothing below touches the network at import time: connections, the S3
+# client and the background workers all start lazily or from create_app().
+def create_pool(pool_host, pool_port, max_size=None):
+    """Connection pool to one MySQL endpoint, sized from config unless ``max_size`` is given"""
+    return ConnectionPool(
+        host=pool_host,
+        port=pool_port,
         user=user,
         password=password,
-        db=db
+        db=db,
+        max_size=max_size or getattr(config, 'db_pool_size', 10),
+        min_size=getattr(config, 'db_pool_min_size', 1),
+        checkout_timeout=getattr(config, 'db_pool_timeout', 5),
+        max_lifetime=getattr(config, 'db_pool_max_lifetime', 1800),
+        ping_interval=getattr(config, 'db_pool_ping_interval', 30),
+        cursorclass=metrics.TimedCursor,
+        init_command=UTC_SESSION,
     )
-    print("✅ RDS Database connected successfully!")
-except Exception as e:
-    print(f"❌ RDS Connection failed: {e}")
-    db_conn = None
 
-# S3 Client with better error handling
-s3_client = None
-s3_bucket_exists = False
-s3_access_denied = False
+def replica_pool(endpoint):
+    """Pool for a read replica given as host or host:port"""
+    replica_host, _, replica_port = endpoint.rpartition(':')
+    if not replica_port.isdigit():
+        return create_pool(endpoint, getattr(config, 'db_port', 3306))
+    return create_pool(replica_host, int(replica_port))
 
-try:
-    s3_client = boto3.client('s3', region_name=region)
-    
-    # Check if bucket exists and accessible
+# RDS Database connection pool - every request borrows its own connection
+db_pool = create_pool(host, getattr(config, 'db_port', 3306))
+# The health probe's own connection: a pool saturated by requests is busy, not down
+monitor_pool = create_pool(host, getattr(config, 'db_port', 3306), max_size=1)
+
+# Read replicas (optional): read-only queries are spread over the ones that are caught up
+read_router = ReplicaRouter(
+    db_pool,
+    [replica_pool(endpoint) for endpoint in getattr(config, 'read_replicas', [])],
+    max_lag=getattr(config, 'replica_max_lag', 5),
+)
+# Clients that just wrote read from the primary for this long, so they see their own changes
+READ_YOUR_WRITES_SECONDS = getattr(config, 'read_your_writes_seconds', 15)
+RECENT_WRITE_COOKIE = 'hrms_recent_write'
+
+# Read-through cache for lookups, searches and list pages
+query_cache = create_cache(
+    backend=getattr(config, 'cache_backend', 'memory'),
+    max_entries=getattr(config, 'cache_max_entries', 10000),
+    ttl=getattr(config, 'cache_ttl', 300),
+    redis_url=getattr(config, 'cache_redis_url', None),
+)
+
+def get_db():
+    """Borrow a pooled connection for the current request"""
+    if 'db_conn' not in g:
+        started = time.perf_counter()
+        g.db_conn = db_pool.acquire()
+        metrics.record('pool', time.perf_counter() - started)
+    return g.db_conn
+
+def get_read_db():
+    """Pooled connection for read-only queries: a read replica, unless this client just wrote
+
+    Falls back to the request's primary connection when no replica is
+    configured or caught up, or when the chosen one cannot hand out a
+    connection.
+    """
+    if 'read_conn' in g:
+        return g.read_conn[1]
+    if 'db_conn' in g or g.get('wrote') or request.cookies.get(RECENT_WRITE_COOKIE):
+        return get_db()
+    pool = read_router.read_pool()
+    if pool is db_pool:
+        return get_db()
+    started = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    except PoolError as e:
+        read_router.mark_failed(pool, e)
+        return get_db()
+    metrics.record('pool', time.perf_counter() - started)
+    g.read_conn = (pool, conn)
+    return conn
+
+def employees_changed(emp_ids=()):
+    """Call after committing writes to employees: drops cached reads and routes reads to the primary"""
+    read_router.note_write()
+    query_cache.invalidate_employees(emp_ids)
+    if has_request_context():
+        g.wrote = True
+
+@app.after_request
+def remember_write(response):
+    if g.get('wrote') and read_router.replicas:
+        response.set_cookie(RECENT_WRITE_COOKIE, '1', max_age=READ_YOUR_WRITES_SECONDS,
+                            httponly=True, samesite='Lax')
+    return response
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn)
+    read_conn = g.pop('read_conn', None)
+    if read_conn is not None:
+        pool, conn = read_conn
+        pool.release(conn)
+
+# S3 Client, created on first use (botocore loads its service models then)
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """Shared boto3 S3 client, or None if it cannot be created"""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                try:
+                    _s3_client = create_s3_client()
+                except NoCredentialsError:
+                    print("❌ AWS credentials not found. Please configure AWS CLI or IAM role.")
+                except Exception as e:
+                    print(f"❌ S3 Client initialization failed: {e}")
+    return _s3_client
+
+def probe_rds():
+    """Round-trip a query on the monitor's connection and check the schema has been migrated"""
+    with monitor_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            version = migrations.current_version(cursor)
+            if version >= migrations.SCHEMA_VERSION and not search.fulltext_enabled:
+                search.detect_search_indexes(cursor)
+        finally:
+            cursor.close()
+    return {'schema_version': version, 'schema_current': version >= migrations.SCHEMA_VERSION}
+
+def probe_s3():
+    """Check if bucket exists and accessible"""
+    s3_client = get_s3_client()
+    if not s3_client:
+        return {'ok': False, 'bucket_exists': False, 'access_denied': False,
+                'error': "S3 client not initialized"}
     try:
         s3_client.head_bucket(Bucket=bucket)
-        s3_bucket_exists = True
-        print(f"✅ S3 Bucket '{bucket}' is accessible!")
+        return {'bucket_exists': True, 'access_denied': False}
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == '404':
-            print(f"❌ S3 Bucket '{bucket}' does not exist")
+            return {'ok': False, 'bucket_exists': False, 'access_denied': False,
+                    'error': f"S3 Bucket '{bucket}' does not exist"}
         elif error_code == '403':
-            print(f"🔐 S3 Bucket exists but access denied - need permissions")
-            s3_bucket_exists = True
-            s3_access_denied = True
-        else:
-            print(f"❌ S3 Bucket error: {e}")
-    except Exception as e:
-        print(f"❌ S3 Client initialization failed: {e}")
-
-except NoCredentialsError:
-    print("❌ AWS credentials not found. Please configure AWS CLI or IAM role.")
-except Exception as e:
-    print(f"❌ S3 Client initialization failed: {e}")
-
-# Create employees table if it doesn't exist
-def create_employees_table():
-    if not db_conn:
-        print("❌ Cannot create table - no database connection")
-        return False
-    
-    cursor = db_conn.cursor()
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                emp_id VARCHAR(20) PRIMARY KEY,
-                first_name VARCHAR(100) NOT NULL,
-                last_name VARCHAR(100) NOT NULL,
-                pri_skill VARCHAR(200),
-                location VARCHAR(100),
-                image_url VARCHAR(500),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        db_conn.commit()
-        print("✅ Employees table created/verified successfully!")
-        return True
-    except Exception as e:
-        print(f"❌ Table creation error: {e}")
-        return False
-    finally:
-        cursor.close()
-
-# Initialize table
-if db_conn:
-    create_employees_table()
+            return {'ok': False, 'bucket_exists': True, 'access_denied': True,
+                    'error': "S3 Bucket exists but access denied - need permissions"}
+        raise
 
-def validate_emp_id(emp_id):
-    return emp_id.isdigit() and len(emp_id) >= 3
+# RDS/S3 are probed in the background; requests only read the latest snapshot
+health_monitor = HealthMonitor(
+    {'rds': probe_rds, 's3': probe_s3, **read_router.probes()},
+    interval=getattr(config, 'health_check_interval', 15),
+)
 
-def validate_name(name):
-    return bool(re.match(r"^[A-Za-z\s]{2,50}$", name.strip()))
-
-def upload_image_to_s3(image_file, emp_id):
-    """Upload employee image to S3 and return public URL"""
-    if not s3_client or not s3_bucket_exists:
+def upload_spooled_image(emp_id, spool_path, filename):
+    """Upload worker: resize a spooled (or directly uploaded) image, store it in S3, return (url, variants)"""
+    aws_status = check_aws_services()
+    s3_client = get_s3_client()
+    if not s3_client or not aws_status['s3_bucket_exists']:
         raise Exception("S3 service not available.")
     
-    if s3_access_denied:
+    if aws_status['s3_access_denied']:
         raise Exception("S3 bucket access denied. Please check AWS permissions.")
     
+    # Browser uploads are already in S3; process them from there
+    direct_upload_key = key_from_s3_uri(spool_path)
+    if direct_upload_key:
+        data = read_object(s3_client, direct_upload_key, MAX_IMAGE_BYTES)
+        image_url, variants = upload_employee_image(s3_client, io.BytesIO(data), emp_id)
+    else:
+        with open(spool_path, 'rb') as image_file:
+            image_url, variants = upload_employee_image(s3_client, image_file, emp_id)
+    print(f"✅ Image uploaded to S3: {image_url}")
+    return image_url, variants
+
+def set_employee_image(emp_id, uploaded):
+    """Upload worker callback: attach the uploaded image to the employee row"""
+    image_url, variants = uploaded
     try:
-        # Get file extension
-        file_extension = os.path.splitext(image_file.filename)[1].lower()
-        if file_extension not in ['.png', '.jpg', '.jpeg', '.gif']:
-            raise Exception("Invalid file format. Use PNG, JPG, JPEG, or GIF.")
-        
-        # Create unique S3 key
-        s3_key = f"employees/{emp_id}/profile{file_extension}"
-        
-        # Upload to S3
-        s3_client.upload_fileobj(
-            image_file,
-            bucket,
-            s3_key,
-            ExtraArgs={
-                'ContentType': 'image/jpeg' if file_extension in ['.jpg', '.jpeg'] else 'image/png',
-                'ACL': 'public-read'
-            }
-        )
-        
-        # Generate public URL
-        image_url = f"https://{bucket}.s3.{region}.amazonaws.com/{s3_key}"
-        print(f"✅ Image uploaded to S3: {image_url}")
-        return image_url
-        
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code == 'AccessDenied':
-            raise Exception(f"Access denied to S3 bucket. Please fix permissions.")
-        elif error_code == 'InvalidAccessKeyId':
-            raise Exception(f"AWS Access Key ID is invalid. Please check your credentials.")
-        else:
-            raise Exception(f"AWS S3 Error: {e}")
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                conn.begin()
+                cursor.execute(
+                    "UPDATE employees SET image_url = %s, image_variants = %s, image_status = 'ready', "
+                    "change_version = %s WHERE emp_id = %s",
+                    (image_url, variants, changes.next_versions(cursor), emp_id)
+                )
+                attached = cursor.rowcount > 0
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    except Exception:
+        # Nothing points at the upload; a retry stores the same content-hashed keys again
+        delete_objects(get_s3_client(), image_keys(image_url, variants))
+        raise
+    if not attached:
+        print(f"⚠️ Employee {emp_id} was deleted during its image upload; removing the image")
+        delete_objects(get_s3_client(), image_keys(image_url, variants))
+        return
+    employees_changed([emp_id])
+
+def mark_image_failed(emp_id, error):
+    """Upload worker callback: record that the image never made it to S3"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            conn.begin()
+            cursor.execute(
+                "UPDATE employees SET image_status = 'failed', change_version = %s WHERE emp_id = %s",
+                (changes.next_versions(cursor), emp_id)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+    employees_changed([emp_id])
+
+def remove_upload_source(spool_path):
+    """Upload worker callback: delete a finished job's spooled file or browser upload
+
+    Runs only after the job has succeeded (its image attached and committed)
+    or failed for good, so a retried job can still read a browser upload.
+    """
+    direct_upload_key = key_from_s3_uri(spool_path)
+    if direct_upload_key:
+        delete_object(get_s3_client(), direct_upload_key)
+    else:
+        os.remove(spool_path)
+
+def prune_idempotency_keys(retention=getattr(config, 'idempotency_key_retention', 86400)):
+    """Delete idempotency keys past the retention window (0 keeps them until their employee goes)"""
+    if not retention:
+        return 0
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            pruned = idempotency.prune(cursor, retention)
+        finally:
+            cursor.close()
+    if pruned:
+        print(f"🧹 Pruned {pruned} expired idempotency keys")
+    return pruned
+
+def after_aggregate_rebuild():
+    """Runs about once per rebuild interval across the fleet, so it doubles as the key prune schedule"""
+    employees_changed()
+    try:
+        prune_idempotency_keys()
     except Exception as e:
-        raise Exception(f"Upload Error: {e}")
+        print(f"⚠️ Idempotency key prune failed: {e}")
+
+aggregate_rebuilder = aggregates.AggregateRebuilder(
+    db_pool,
+    interval=getattr(config, 'aggregate_rebuild_interval', 3600),
+    on_rebuild=after_aggregate_rebuild
+)
+
+# Image uploads run on background workers fed from an on-disk queue
+upload_queue = UploadQueue(
+    getattr(config, 'upload_spool_dir', 'upload_spool'),
+    upload=upload_spooled_image,
+    on_success=set_employee_image,
+    on_failure=mark_image_failed,
+    remove=remove_upload_source,
+    workers=getattr(config, 'upload_workers', 4),
+    max_attempts=getattr(config, 'upload_max_attempts', 5),
+    failed_retention=getattr(config, 'upload_failed_retention', 7 * 86400),
+)
+
+metrics.register_gauges('hrms_db_pool', db_pool.stats)
+metrics.register_gauges('hrms_replicas', read_router.stats)
+metrics.register_gauges('hrms_cache', query_cache.stats)
+metrics.register_gauges('hrms_upload_queue', upload_queue.stats)
+
+# Buckets stay private; pages get presigned (or proxied) URLs for the images
+image_delivery = delivery.ImageDelivery(
+    get_s3_client,
+    mode=getattr(config, 'image_delivery', 'presigned'),
+    expiry=getattr(config, 'image_url_expiry', 86400)
+)
+metrics.register_gauges('hrms_image_urls', image_delivery.stats)
+
+def image_src(image_url, variants=None, size=None, fmt='jpg'):
+    """Browser-loadable URL of an employee image, or of its thumbnail closest to ``size``"""
+    if size:
+        image_url = variant_url(image_url, variants, size, fmt)
+    return image_delivery.url(image_url)
+
+app.add_template_global(image_src)
+
+# Stylesheets and scripts are built ahead of time (python assets.py) into fingerprinted files
+asset_manifest = assets.AssetManifest()
+
+def asset_url(name):
+    """URL of a file under static/, fingerprinted once the assets are built"""
+    return asset_manifest.url(name)
+
+app.add_template_global(asset_url)
+
+# Rendered employee cards and search pages. They embed image URLs, so they expire before those do.
+_fragment_ttl = getattr(config, 'fragment_cache_ttl', getattr(config, 'cache_ttl', 300))
+if image_delivery.url_lifetime is not None:
+    _fragment_ttl = min(_fragment_ttl, image_delivery.url_lifetime)
+fragment_cache = fragments.FragmentCache(
+    card_entries=getattr(config, 'fragment_cache_entries', 20000),
+    page_entries=getattr(config, 'page_cache_entries', 500),
+    ttl=_fragment_ttl,
+)
+metrics.register_gauges('hrms_card_cache', fragment_cache.card_stats)
+metrics.register_gauges('hrms_page_cache', fragment_cache.page_stats)
+CARD_MACROS = {'list': 'list_card', 'result': 'result_card'}
+
+def employee_card(kind, row):
+    """Card HTML for an employee row ('list' or 'result' layout), rendered once per row version"""
+    def render(row):
+        return getattr(app.jinja_env.get_template('_cards.html').module, CARD_MACROS[kind])(row)
+    return fragment_cache.card(kind, row, render)
+
+app.add_template_global(employee_card)
 
 def check_aws_services():
-    """Check status of AWS services"""
-    status = {
-        'rds': False,
-        's3': False,
-        's3_bucket_exists': s3_bucket_exists,
-        's3_access_denied': s3_access_denied
+    """Check status of AWS services (from the background monitor, never blocks)"""
+    snapshot = health_monitor.snapshot()
+    return {
+        'rds': snapshot['rds']['ok'],
+        's3': snapshot['s3']['ok'],
+        's3_bucket_exists': snapshot['s3'].get('bucket_exists', False),
+        's3_access_denied': snapshot['s3'].get('access_denied', False),
+        'checks': snapshot
     }
-    
-    # Check RDS
-    if db_conn:
-        try:
-            cursor = db_conn.cursor()
-            cursor.execute("SELECT 1")
-            status['rds'] = True
-            cursor.close()
-        except:
-            status['rds'] = False
-    
-    # Check S3 - considered connected if bucket exists and no access denied
-    status['s3'] = s3_bucket_exists and not s3_access_denied
-    
-    return status
 
 @app.route("/")
 def home():
     return redirect("/dashboard")
 
+def headcount_summary():
+    """Dashboard aggregates, cached until the next insert or rebuild"""
+    def load():
+        cursor = get_read_db().cursor()
+        try:
+            return aggregates.summary(cursor)
+        finally:
+            cursor.close()
+    return query_cache.get_or_load('aggregates:headcount', load)
+
 @app.route("/dashboard")
 def dashboard():
     aws_status = check_aws_services()
+    try:
+        headcount = headcount_summary()
+    except Exception as e:
+        print(f"⚠️ Dashboard aggregates unavailable: {e}")
+        headcount = None
     return render_template('dashboard.html', 
                          aws_status=aws_status,
+                         headcount=headcount,
                          bucket=bucket,
                          region=region)
 
+# MySQL error for an INSERT that hit an existing primary/unique key
+DUP_ENTRY = 1062
+
+def insert_employee(cursor, employee, idempotency_key=None, result=None):
+    """Insert one new employee with a pending image (inside the caller's transaction)
+
+    ``employee`` is ``(emp_id, first_name, last_name, pri_skill, location)``.
+    With an idempotency key, ``result`` is stored under it in the same
+    transaction. Raises IntegrityError when the ID (or the key) is taken.
+    """
+    emp_id, first_name, last_name, pri_skill, location = employee
+    cursor.execute(
+        "INSERT INTO employees (emp_id, first_name, last_name, pri_skill, location, image_url, image_status, "
+        "change_version) VALUES (%s, %s, %s, %s, %s, NULL, 'pending', %s)",
+        (emp_id, first_name, last_name, pri_skill, location, changes.next_versions(cursor))
+    )
+    skills.link_skills(cursor, [(emp_id, pri_skill)])
+    aggregates.record_inserts(cursor, [(location, pri_skill)])
+    if idempotency_key:
+        idempotency.record(cursor, idempotency_key, emp_id, result)
+
+def replayed_add(cursor, error, emp_id, idempotency_key):
+    """Stored result of an earlier add with the same idempotency key, after ``error`` rejected this one"""
+    if not idempotency_key or not error.args or error.args[0] != DUP_ENTRY:
+        return None
+    stored = idempotency.lookup(cursor, idempotency_key)
+    if stored is None:
+        return None
+    stored_emp_id, result = stored
+    if stored_emp_id != emp_id:
+        raise ValueError(f"This request was already used to add employee {stored_emp_id}.")
+    print(f"↩️ Replaying the earlier add of employee {emp_id}")
+    return result
+
+def insert_error_message(error, emp_id):
+    if error.args and error.args[0] == DUP_ENTRY:
+        return f"Employee ID {emp_id} already exists! Please use a different ID."
+    return f"Database error: {error}"
+
 @app.route("/addemp", methods=['GET', 'POST'])
 def AddEmp():
     if request.method == 'GET':
         aws_status = check_aws_services()
-        return render_template('AddEmp.html', aws_status=aws_status)
+        # A fresh key per rendered form; resubmitting the same form replays its first result
+        return render_template('AddEmp.html', aws_status=aws_status, idempotency_key=uuid.uuid4().hex)
     
     # Get form data
     emp_id = request.form.get('emp_id', '').strip()
@@ -188,22 +596,21 @@ def AddEmp():
     pri_skill = request.form.get('pri_skill', '').strip()
     location = request.form.get('location', '').strip()
     emp_image_file = request.files.get('emp_image_file')
+    idempotency_key = idempotency.clean_key(request.headers.get('Idempotency-Key')
+                                            or request.form.get('idempotency_key'))
     
     # Validate inputs
-    if not emp_id or not first_name or not last_name:
-        return render_template('error.html', message="Employee ID, First Name, and Last Name are required.")
-    
-    if not validate_emp_id(emp_id):
-        return render_template('error.html', message="Employee ID must contain only numbers (min 3 digits).")
-    
-    if not validate_name(first_name) or not validate_name(last_name):
-        return render_template('error.html', message="Names must contain only letters (2-50 characters).")
+    error = employee_error(emp_id, first_name, last_name)
+    if error:
+        return render_template('error.html', message=error)
     
     if not emp_image_file or emp_image_file.filename == '':
         return render_template('error.html', message="Please select a profile image.")
     
     # Check database connection
-    if not db_conn:
+    try:
+        conn = get_db()
+    except PoolError:
         return render_template('error.html', message="Database connection unavailable.")
     
     # Check S3 availability
@@ -216,105 +623,697 @@ def AddEmp():
             return render_template('error.html', 
                                  message=f"S3 bucket '{bucket}' is not accessible.")
     
-    cursor = db_conn.cursor()
+    # Check the real format from the file's magic bytes, not its name
+    try:
+        sniff_upload(emp_image_file.stream)
+    except ImageError as e:
+        return render_template('error.html', message=str(e))
+    
+    cursor = conn.cursor()
+    spool_path = None
+    emp_name = f"{first_name} {last_name}"
     
     try:
-        # Check if employee ID already exists
-        cursor.execute("SELECT emp_id FROM employees WHERE emp_id = %s", (emp_id,))
-        if cursor.fetchone():
+        # Spool the image to local disk; a background worker uploads it to S3
+        spool_path = upload_queue.spool(emp_image_file.stream, emp_image_file.filename)
+        if os.path.getsize(spool_path) > MAX_IMAGE_BYTES:
             return render_template('error.html', 
-                                 message=f"Employee ID {emp_id} already exists! Please use a different ID.")
+                                 message=f"Profile image is too large. Maximum size is {MAX_IMAGE_BYTES // (1024 * 1024)} MB.")
         
-        # Upload image to S3
-        image_url = upload_image_to_s3(emp_image_file, emp_id)
-        
-        # Insert employee into database
-        insert_sql = """
-            INSERT INTO employees (emp_id, first_name, last_name, pri_skill, location, image_url) 
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_sql, (emp_id, first_name, last_name, pri_skill, location, image_url))
-        db_conn.commit()
+        # Insert first: the primary key, not an earlier SELECT, decides who gets the ID
+        try:
+            conn.begin()
+            insert_employee(cursor, (emp_id, first_name, last_name, pri_skill, location),
+                            idempotency_key, {'name': emp_name, 'upload': None})
+            conn.commit()
+        except pymysql.err.IntegrityError as e:
+            conn.rollback()
+            replayed = replayed_add(cursor, e, emp_id, idempotency_key)
+            if replayed:
+                return render_template('add_employee.html', name=replayed['name'], emp_id=emp_id,
+                                       image_pending=True)
+            return render_template('error.html', message=insert_error_message(e, emp_id))
+        employees_changed([emp_id])
         
-        emp_name = f"{first_name} {last_name}"
         print(f"✅ Employee {emp_name} (ID: {emp_id}) added successfully!")
         
+        try:
+            upload_queue.enqueue(emp_id, spool_path, emp_image_file.filename)
+            spool_path = None
+        except Exception as e:
+            mark_image_failed(emp_id, str(e))
+            return render_template('error.html', 
+                                 message=f"Employee {emp_name} was saved but the profile image could not be queued: {e}")
+        
         return render_template('add_employee.html', 
                              name=emp_name, 
                              emp_id=emp_id,
-                             image_url=image_url)
+                             image_pending=True)
 
     except Exception as e:
-        if db_conn:
-            db_conn.rollback()
+        conn.rollback()
         error_msg = str(e)
         print(f"❌ Error adding employee: {error_msg}")
         return render_template('error.html', message=error_msg)
     
     finally:
         cursor.close()
+        if spool_path:
+            upload_queue.discard(spool_path)
+
+# Direct-to-S3 uploads: the browser sends the image to S3 itself and the app
+# only handles the small JSON requests on either side of it
+DIRECT_UPLOAD_EXPIRY = getattr(config, 'direct_upload_expiry', 300)
+upload_signer = URLSafeTimedSerializer(app.secret_key, salt='employee-direct-upload')
+
+def discard_direct_upload(s3_key):
+    """Best-effort removal of a browser upload that will never be processed"""
+    try:
+        delete_object(get_s3_client(), s3_key)
+    except Exception as e:
+        print(f"⚠️ Could not delete unused upload {s3_key}: {e}")
+
+@app.route("/api/uploads/presign", methods=['POST'])
+def presign_upload():
+    """Validate a new employee and issue a short-lived, size/type-restricted S3 upload form"""
+    data = request.get_json(silent=True) or {}
+    employee = {field: str(data.get(field) or '').strip()
+                for field in ('emp_id', 'first_name', 'last_name', 'pri_skill', 'location')}
+    content_type = str(data.get('content_type') or '')
+    idempotency_key = idempotency.clean_key(request.headers.get('Idempotency-Key')
+                                            or str(data.get('idempotency_key') or ''))
+    
+    error = employee_error(employee['emp_id'], employee['first_name'], employee['last_name'])
+    if error:
+        return {"error": error}, 400
+    
+    aws_status = check_aws_services()
+    s3_client = get_s3_client()
+    if not s3_client or not aws_status['s3']:
+        return {"error": "S3 service not available."}, 503
+    
+    # Fail fast before the browser uploads anything; the confirm step's INSERT still has the final say
+    try:
+        cursor = get_db().cursor()
+        try:
+            cursor.execute("SELECT emp_id FROM employees WHERE emp_id = %s", (employee['emp_id'],))
+            exists = cursor.fetchone()
+            stored = idempotency.lookup(cursor, idempotency_key) if exists and idempotency_key else None
+        finally:
+            cursor.close()
+    except PoolError:
+        return {"error": "Database connection unavailable."}, 503
+    if stored and stored[0] == employee['emp_id']:
+        # This form was already submitted successfully
+        return {"emp_id": employee['emp_id'], "name": stored[1]['name'], "image_status": "pending",
+                "replayed": True}
+    if exists:
+        return {"error": f"Employee ID {employee['emp_id']} already exists! Please use a different ID."}, 409
+    
+    try:
+        s3_key, post = presign_employee_upload(s3_client, employee['emp_id'], content_type,
+                                               MAX_IMAGE_BYTES, DIRECT_UPLOAD_EXPIRY)
+    except ImageError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": f"AWS S3 Error: {e}"}, 502
+    
+    token = upload_signer.dumps(dict(employee, s3_key=s3_key, content_type=content_type,
+                                     idempotency_key=idempotency_key))
+    return {
+        "upload": post,
+        "upload_token": token,
+        "max_bytes": MAX_IMAGE_BYTES,
+        "expires_in": DIRECT_UPLOAD_EXPIRY
+    }
+
+@app.route("/api/uploads/confirm", methods=['POST'])
+def confirm_upload():
+    """Verify a direct upload with head_object, then commit the employee row"""
+    data = request.get_json(silent=True) or {}
+    try:
+        claims = upload_signer.loads(data.get('upload_token', ''), max_age=DIRECT_UPLOAD_EXPIRY + 60)
+    except SignatureExpired:
+        return {"error": "Upload token expired. Please try again."}, 400
+    except BadSignature:
+        return {"error": "Invalid upload token."}, 400
+    
+    emp_id = claims['emp_id']
+    try:
+        verify_direct_upload(get_s3_client(), claims['s3_key'], claims['content_type'], MAX_IMAGE_BYTES)
+    except ImageError as e:
+        discard_direct_upload(claims['s3_key'])
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": f"AWS S3 Error: {e}"}, 502
+    
+    try:
+        conn = get_db()
+    except PoolError:
+        return {"error": "Database connection unavailable."}, 503
+    
+    # Tokens signed before idempotency keys existed have none; the upload key is unique per token
+    idempotency_key = claims.get('idempotency_key') or claims['s3_key']
+    emp_name = f"{claims['first_name']} {claims['last_name']}"
+    cursor = conn.cursor()
+    try:
+        conn.begin()
+        insert_employee(cursor, (emp_id, claims['first_name'], claims['last_name'], claims['pri_skill'],
+                                 claims['location']),
+                        idempotency_key, {'name': emp_name, 'upload': claims['s3_key']})
+        conn.commit()
+    except pymysql.err.IntegrityError as e:
+        conn.rollback()
+        try:
+            replayed = replayed_add(cursor, e, emp_id, idempotency_key)
+        except ValueError as reuse_error:
+            discard_direct_upload(claims['s3_key'])
+            return {"error": str(reuse_error)}, 409
+        # Compensate: drop this upload unless it is the one the committed employee uses
+        if not replayed or replayed['upload'] != claims['s3_key']:
+            discard_direct_upload(claims['s3_key'])
+        if replayed:
+            return {"emp_id": emp_id, "name": replayed['name'], "image_status": "pending", "replayed": True}, 201
+        return {"error": insert_error_message(e, emp_id)}, 409 if e.args and e.args[0] == DUP_ENTRY else 500
+    except Exception as e:
+        conn.rollback()
+        return {"error": f"Database error: {e}"}, 500
+    finally:
+        cursor.close()
+    employees_changed([emp_id])
+    
+    print(f"✅ Employee {emp_name} (ID: {emp_id}) added successfully!")
+    
+    # Thumbnails are generated in the background from the uploaded object
+    try:
+        upload_queue.enqueue(emp_id, s3_uri(claims['s3_key']), claims['s3_key'])
+    except Exception as e:
+        mark_image_failed(emp_id, str(e))
+        return {"error": f"Employee {emp_name} was saved but the profile image could not be queued: {e}"}, 500
+    
+    return {"emp_id": emp_id, "name": emp_name, "image_status": "pending"}, 201
+
+BULK_IMPORT_DIR = getattr(config, 'bulk_import_dir', 'imports')
+
+@app.route("/bulk-import", methods=['POST'])
+def start_bulk_import():
+    """Start a bulk import from an uploaded manifest (CSV/JSONL) and images zip"""
+    manifest = request.files.get('manifest')
+    images = request.files.get('images')
+    if not manifest or not manifest.filename or not images or not images.filename:
+        return {"error": "Both 'manifest' (CSV/JSONL) and 'images' (zip) files are required."}, 400
+    s3_client = get_s3_client()
+    if not s3_client:
+        return {"error": "S3 service not available."}, 503
+    
+    try:
+        job_id = bulk_import.create_job(BULK_IMPORT_DIR, manifest.stream, manifest.filename, images.stream)
+        bulk_import.start_job(BULK_IMPORT_DIR, job_id, db_pool, s3_client,
+                              on_commit=employees_changed)
+    except Exception as e:
+        return {"error": f"Could not start import: {e}"}, 400
+    print(f"📦 Bulk import {job_id} started")
+    return {"job_id": job_id, "status_url": f"/bulk-import/{job_id}"}, 202
+
+@app.route("/bulk-import/<job_id>", methods=['GET'])
+def bulk_import_status(job_id):
+    """Progress and per-row errors of a bulk import"""
+    if not job_id.isalnum():
+        return {"error": "Invalid job id."}, 400
+    progress = bulk_import.job_status(BULK_IMPORT_DIR, job_id)
+    if progress is None:
+        return {"error": f"Import job {job_id} not found."}, 404
+    return progress
+
+@app.route("/bulk-import/<job_id>/resume", methods=['POST'])
+def resume_bulk_import(job_id):
+    """Continue an import that was interrupted by a crash or restart"""
+    if not job_id.isalnum():
+        return {"error": "Invalid job id."}, 400
+    try:
+        importer = bulk_import.start_job(BULK_IMPORT_DIR, job_id, db_pool, get_s3_client(),
+                                         on_commit=employees_changed)
+    except FileNotFoundError as e:
+        return {"error": str(e)}, 404
+    if importer is None:
+        # Another worker or host holds the job lock and is still running it
+        return {"error": f"Import job {job_id} is already running in another process.",
+                "job_id": job_id, "status_url": f"/bulk-import/{job_id}",
+                "progress": bulk_import.job_status(BULK_IMPORT_DIR, job_id)}, 409
+    return {"job_id": job_id, "status_url": f"/bulk-import/{job_id}"}, 202
 
 @app.route("/getemp", methods=['GET', 'POST'])
 def getemp():
     return render_template('GetEmp.html')
 
+def find_employee(emp_id):
+    """Rows matching one employee ID (cached until that employee is written)"""
+    def load():
+        cursor = get_read_db().cursor()
+        try:
+            cursor.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE emp_id = %s", (emp_id,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    # Deleted exactly when this employee is inserted
+    return query_cache.get_or_load(employee_key(emp_id), load, per_generation=False)
+
+def find_employees(search_type, value, match_mode='relevance'):
+    """Name/skill search results (cached until the next insert)
+
+    ``skills`` searches the normalized skills with match_mode ``all`` or
+    ``any``; the other types use relevance/contains text search.
+    """
+    def load():
+        cursor = get_read_db().cursor()
+        try:
+            if search_type == 'skills':
+                return skills.employees_with_skills(cursor, value, match_mode)
+            return search.search_employees(cursor, search_type, value, match_mode)
+        finally:
+            cursor.close()
+    return query_cache.get_or_load(f"search:{search_type}:{match_mode}:{value.lower()}", load)
+
 @app.route("/fetchdata", methods=['POST'])
 def GetEmp():
-    if not db_conn:
-        return render_template('error.html', message="Database connection unavailable.")
-    
     search_type = request.form.get('search_type')
     search_value = request.form.get('search_value', '').strip()
+    match_mode = request.form.get('match_mode', 'relevance')
+    if search_type == 'skills':
+        match_mode = 'any' if request.form.get('skill_match') == 'any' else 'all'
 
     if not search_value:
         return render_template('error.html', message="Please enter a search value.")
-
-    cursor = db_conn.cursor()
     
-    try:
+    if search_type == 'emp_id':
+        if not search_value.isdigit():
+            return render_template('error.html', message="Employee ID must be a number.")
+    elif search_type not in ('emp_name', 'primary_skills', 'skills'):
+        return render_template('error.html', message="Invalid search type.")
+    
+    def render():
         if search_type == 'emp_id':
-            if not search_value.isdigit():
-                return render_template('error.html', message="Employee ID must be a number.")
-            query = "SELECT * FROM employees WHERE emp_id = %s"
-            cursor.execute(query, (search_value,))
-        elif search_type == 'emp_name':
-            query = "SELECT * FROM employees WHERE first_name LIKE %s OR last_name LIKE %s"
-            search_pattern = f"%{search_value}%"
-            cursor.execute(query, (search_pattern, search_pattern))
-        elif search_type == 'primary_skills':
-            query = "SELECT * FROM employees WHERE pri_skill LIKE %s"
-            search_pattern = f"%{search_value}%"
-            cursor.execute(query, (search_pattern,))
+            results = find_employee(search_value)
         else:
-            return render_template('error.html', message="Invalid search type.")
-
-        results = cursor.fetchall()
-        
+            results = find_employees(search_type, search_value, match_mode)
         if not results:
+            return None
+        return render_template('GetEmpOutput.html', output=results)
+    
+    try:
+        # Whole result pages are cached per query until the next employee write
+        page = fragment_cache.page((search_type, match_mode, search_value.lower()),
+                                   query_cache.generation(), render)
+        if page is None:
             return render_template('error.html', 
                                  message=f"No employees found matching '{search_value}'")
+        return page
         
-        return render_template('GetEmpOutput.html', output=results)
-        
+    except PoolError:
+        return render_template('error.html', message="Database connection unavailable.")
     except Exception as e:
         return render_template('error.html', message=f"Search error: {str(e)}")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_page_cursor(row):
+    """Opaque keyset cursor pointing just past the given employee row"""
+    raw = f"{row[6].strftime('%Y-%m-%d %H:%M:%S')}|{row[0]}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_page_cursor(token):
+    """Turn an ``after`` token back into its (created_at, emp_id) key"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, emp_id = raw.split('|', 1)
+        return datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S'), emp_id
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid page cursor.")
+
+def _stream_rows(cursor):
+    """Yield rows from an unbuffered cursor, closing it once every row has been sent
+
+    A response that is never read (HEAD) or closed early leaves the rest of the
+    result unread. The pool then drops the connection rather than reading to the end.
+    """
+    for row in cursor:
+        yield row
+    cursor.close()
+
+def _buffered(chunks, size=16384):
+    """Coalesce Jinja's small template chunks into fewer, larger writes"""
+    buf = []
+    buffered = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield ''.join(buf)
+
+def employee_page(page_size, after=None, after_key=None):
+    """One keyset page, newest first; returns (rows, cursor of the next page or None)"""
+    def load_page():
+        cursor = get_read_db().cursor()
+        try:
+            if after_key:
+                cursor.execute(
+                    f"SELECT {EMPLOYEE_COLUMNS} FROM employees "
+                    "WHERE created_at < %s OR (created_at = %s AND emp_id < %s) "
+                    "ORDER BY created_at DESC, emp_id DESC LIMIT %s",
+                    (after_key[0], after_key[0], after_key[1], page_size + 1)
+                )
+            else:
+                cursor.execute(
+                    f"SELECT {EMPLOYEE_COLUMNS} FROM employees "
+                    "ORDER BY created_at DESC, emp_id DESC LIMIT %s",
+                    (page_size + 1,)
+                )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    
+    results = query_cache.get_or_load(f"list:{page_size}:{after or ''}", load_page)
+    
+    # The extra row only tells us whether another page exists
+    if len(results) > page_size:
+        results = results[:page_size]
+        return results, encode_page_cursor(results[-1])
+    return results, None
+
+@app.route("/api/autocomplete", methods=['GET'])
+def autocomplete():
+    """Name/skill suggestions for the search form"""
+    field = request.args.get('field', 'name')
+    prefix = request.args.get('q', '').strip()
+    if field not in ('name', 'skill'):
+        return {"error": "field must be 'name' or 'skill'"}, 400
+    if not prefix:
+        return {"suggestions": []}
+    
+    try:
+        conn = get_read_db()
+    except PoolError:
+        return {"error": "Database connection unavailable."}, 503
+    
+    cursor = conn.cursor()
+    try:
+        return {"suggestions": search.autocomplete(cursor, field, prefix)}
+    except Exception as e:
+        return {"error": f"Search error: {str(e)}"}, 500
     finally:
         cursor.close()
 
 @app.route("/listemp", methods=['GET'])
 def ListAllEmp():
-    if not db_conn:
-        return render_template('error.html', message="Database connection unavailable.")
+    # Stream the whole directory from a server-side cursor in constant memory
+    if request.args.get('stream') == '1':
+        try:
+            conn = get_read_db()
+        except PoolError:
+            return render_template('error.html', message="Database connection unavailable.")
+        cursor = conn.cursor(metrics.TimedSSCursor)
+        try:
+            cursor.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees ORDER BY created_at DESC, emp_id DESC")
+        except Exception as e:
+            cursor.close()
+            return render_template('error.html', message=f"Database error: {str(e)}")
+        return app.response_class(
+            _buffered(stream_template('ListAllEmp.html', output=_stream_rows(cursor), streaming=True)),
+            mimetype='text/html'
+        )
     
-    cursor = db_conn.cursor()
+    # Otherwise serve one keyset page at a time
     try:
-        cursor.execute("SELECT * FROM employees ORDER BY created_at DESC")
-        results = cursor.fetchall()
-        return render_template('ListAllEmp.html', output=results)
+        page_size = int(request.args.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return render_template('error.html', message="page_size must be a number.")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    
+    after = request.args.get('after')
+    try:
+        after_key = decode_page_cursor(after) if after else None
+    except ValueError as e:
+        return render_template('error.html', message=str(e))
+    
+    try:
+        results, next_cursor = employee_page(page_size, after, after_key)
+        return render_template('ListAllEmp.html',
+                             output=results,
+                             page_size=page_size,
+                             next_cursor=next_cursor,
+                             is_first_page=after_key is None)
+    except PoolError:
+        return render_template('error.html', message="Database connection unavailable.")
     except Exception as e:
         return render_template('error.html', message=f"Database error: {str(e)}")
+
+@app.route("/export", methods=['GET'])
+def export_employees():
+    """Stream the directory as CSV, NDJSON or XLSX, optionally filtered like /fetchdata
+
+    ?format=csv|ndjson|xlsx&fields=a,b&search_type=...&search_value=...&match_mode=...
+    """
+    fmt = request.args.get('format', 'csv')
+    search_type = request.args.get('search_type') or None
+    search_value = request.args.get('search_value', '').strip()
+    match_mode = request.args.get('match_mode') or None
+    if fmt not in export.FORMATS:
+        return {"error": f"format must be one of: {', '.join(export.FORMATS)}"}, 400
+    try:
+        fields = api.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    if search_type:
+        if search_type not in export.SEARCH_TYPES:
+            return {"error": "Invalid search type."}, 400
+        if not search_value:
+            return {"error": "Please enter a search value."}, 400
+        if search_type == 'emp_id' and not search_value.isdigit():
+            return {"error": "Employee ID must be a number."}, 400
+        allowed_modes = ('all', 'any') if search_type == 'skills' else ('relevance', 'contains')
+        if match_mode and match_mode not in allowed_modes:
+            return {"error": f"match_mode must be '{allowed_modes[0]}' or '{allowed_modes[1]}'"}, 400
+    
+    try:
+        conn = get_read_db()
+    except PoolError:
+        return {"error": "Database connection unavailable."}, 503
+    
+    cursor = conn.cursor()
+    try:
+        where, params = export.filter_clause(cursor, search_type, search_value, match_mode)
+        rows = export.open_export(conn, where, params, metrics.TimedSSCursor)
+    except Exception as e:
+        return {"error": f"Database error: {str(e)}"}, 500
     finally:
         cursor.close()
+    
+    mimetype, extension = export.FORMATS[fmt]
+    # stream_with_context keeps the pooled connection checked out until the last row is sent
+    response = app.response_class(
+        stream_with_context(export.export_chunks(fmt, _stream_rows(rows), fields)),
+        mimetype=mimetype
+    )
+    filename = f"employees-{datetime.now(timezone.utc):%Y%m%d}.{extension}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Versioned JSON API; responses are projected with ?fields= and carry ETags
+@app.route("/api/v1/employees", methods=['GET'])
+def api_list_employees():
+    """Keyset-paginated employees, newest first (?limit=50&after=<cursor>&fields=a,b)"""
+    try:
+        fields = api.parse_fields(request.args.get('fields'))
+        page_size = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        after = request.args.get('after')
+        after_key = decode_page_cursor(after) if after else None
+    except ValueError as e:
+        return api.error_response(str(e), 400)
+    
+    try:
+        rows, next_cursor = employee_page(page_size, after, after_key)
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    
+    return api.json_response({
+        "data": [api.employee_dict(row, fields, image_delivery.url) for row in rows],
+        "next_cursor": next_cursor
+    })
+
+@app.route("/api/v1/employees/search", methods=['GET'])
+def api_search_employees():
+    """Name/skill search (?by=name|skill|skills&q=...&mode=relevance|contains, or all|any for skills&fields=a,b)"""
+    search_types = {'name': 'emp_name', 'skill': 'primary_skills', 'skills': 'skills'}
+    search_type = search_types.get(request.args.get('by', 'name'))
+    value = request.args.get('q', '').strip()
+    match_mode = request.args.get('mode', 'all' if search_type == 'skills' else 'relevance')
+    try:
+        fields = api.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return api.error_response(str(e), 400)
+    if search_type is None:
+        return api.error_response("by must be 'name', 'skill' or 'skills'", 400)
+    if not value:
+        return api.error_response("q is required", 400)
+    if search_type == 'skills':
+        if match_mode not in ('all', 'any'):
+            return api.error_response("mode must be 'all' or 'any'", 400)
+    elif match_mode not in ('relevance', 'contains'):
+        return api.error_response("mode must be 'relevance' or 'contains'", 400)
+    
+    try:
+        rows = find_employees(search_type, value, match_mode)
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Search error: {e}", 500)
+    
+    return api.json_response({"data": [api.employee_dict(row, fields, image_delivery.url) for row in rows]})
+
+@app.route("/api/v1/employees/<emp_id>", methods=['GET'])
+def api_get_employee(emp_id):
+    """One employee (?fields=a,b)"""
+    try:
+        fields = api.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return api.error_response(str(e), 400)
+    if not emp_id.isdigit():
+        return api.error_response(f"Employee {emp_id} not found", 404)
+    
+    try:
+        rows = find_employee(emp_id)
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    if not rows:
+        return api.error_response(f"Employee {emp_id} not found", 404)
+    
+    return api.json_response({"data": api.employee_dict(rows[0], fields, image_delivery.url)},
+                             modified=api.last_modified(rows))
+
+@app.route("/api/v1/employees/<emp_id>", methods=['DELETE'])
+def api_delete_employee(emp_id):
+    """Delete one employee; the change feed reports it as a delete"""
+    if not emp_id.isdigit():
+        return api.error_response(f"Employee {emp_id} not found", 404)
+    
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                conn.begin()
+                deleted = changes.delete_employee(cursor, emp_id)
+                conn.commit()
+            finally:
+                cursor.close()
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    if deleted is None:
+        return api.error_response(f"Employee {emp_id} not found", 404)
+    
+    employees_changed([emp_id])
+    keys = image_keys(*deleted)
+    s3_client = get_s3_client()
+    if keys and s3_client:
+        delete_objects(s3_client, keys)
+    print(f"🗑️ Employee {emp_id} deleted")
+    return '', 204
+
+@app.route("/api/v1/skills", methods=['GET'])
+def api_skills():
+    """Normalized skills starting with q, with employee counts (?q=py&limit=50)"""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE))
+    except ValueError:
+        return api.error_response("limit must be a number", 400)
+    prefix = request.args.get('q', '').strip()
+    
+    def load():
+        cursor = get_read_db().cursor()
+        try:
+            return skills.skill_counts(cursor, prefix, limit)
+        finally:
+            cursor.close()
+    try:
+        counts = query_cache.get_or_load(f"skills:{limit}:{prefix.lower()}", load)
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    
+    return api.json_response({"data": counts})
+
+@app.route("/api/v1/aggregates", methods=['GET'])
+def api_aggregates():
+    """Headcount total, by location, by primary skill and hires per month"""
+    try:
+        headcount = headcount_summary()
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    
+    rebuilt_at = headcount['rebuilt_at']
+    if rebuilt_at is not None:
+        rebuilt_at = rebuilt_at.replace(tzinfo=timezone.utc).isoformat()
+    return api.json_response(dict(headcount, rebuilt_at=rebuilt_at))
+
+CHANGE_FEED_DEFAULT_LIMIT = 1000
+CHANGE_FEED_MAX_LIMIT = 10000
+
+@app.route("/api/changes", methods=['GET'])
+def change_feed():
+    """Employees changed since a continuation token, as NDJSON (?since=<token>&limit=1000&fields=a,b)
+
+    One line per change (``upsert`` with the employee, or ``delete``), oldest
+    first, then a final line with the token to pass as ``since`` next time.
+    """
+    try:
+        fields = api.parse_fields(request.args.get('fields'))
+        limit = max(1, min(int(request.args.get('limit', CHANGE_FEED_DEFAULT_LIMIT)), CHANGE_FEED_MAX_LIMIT))
+        since = request.args.get('since')
+        after_key = changes.decode_token(since) if since else None
+    except ValueError as e:
+        return api.error_response(str(e), 400)
+    
+    try:
+        # Always the primary: it alone guarantees versions become visible in commit order
+        cursor = get_db().cursor()
+        try:
+            feed, has_more = changes.changes_since(cursor, after_key, limit)
+        finally:
+            cursor.close()
+    except PoolError:
+        return api.error_response("Database connection unavailable.", 503)
+    except Exception as e:
+        return api.error_response(f"Database error: {e}", 500)
+    
+    lines = []
+    for op, version, emp_id, data in feed:
+        if op == 'upsert':
+            lines.append({"op": op, "version": version, "emp_id": emp_id,
+                          "employee": api.employee_dict(data, fields)})
+        else:
+            lines.append({"op": op, "version": version, "emp_id": emp_id,
+                          "deleted_at": data.replace(tzinfo=timezone.utc).isoformat() if data else None})
+    # With nothing new, hand the same token back so the client keeps its place
+    next_since = changes.encode_token(feed[-1][1], feed[-1][2]) if feed else since
+    lines.append({"next_since": next_since, "has_more": has_more})
+    
+    body = ''.join(json.dumps(line, separators=(',', ':'), default=str) + '\n' for line in lines)
+    response = app.response_class(body, mimetype='application/x-ndjson')
+    response.headers['X-Next-Since'] = next_since or ''
+    return response
 
 @app.route("/fix-s3")
 def fix_s3():
@@ -327,25 +1326,58 @@ def fix_s3():
 
 @app.route("/fix-permissions")
 def fix_permissions():
-    """Endpoint to fix S3 permissions"""
+    """Endpoint to lock the bucket down to private access"""
     try:
-        s3 = boto3.client('s3', region_name=region)
-        
-        # Remove public access blocks
-        s3.put_public_access_block(
-            Bucket=bucket,
-            PublicAccessBlockConfiguration={
-                'BlockPublicAcls': False,
-                'IgnorePublicAcls': False,
-                'BlockPublicPolicy': False,
-                'RestrictPublicBuckets': False
-            }
-        )
-        
-        return "✅ S3 permissions fixed! Please restart the application."
+        fix_s3_permissions.secure_bucket(create_s3_client())
+        return "✅ S3 bucket is private. Images are served through signed URLs."
     except Exception as e:
         return f"❌ Error fixing permissions: {e}"
 
+@app.route("/assets/<path:filename>")
+def built_asset(filename):
+    """Serve a built asset, precompressed when the client accepts it, cached for a year"""
+    response = asset_manifest.send(filename, request.accept_encodings)
+    if response is None:
+        return {"error": "Asset not found."}, 404
+    return response
+
+@app.route("/images/<path:s3_key>")
+def image_proxy(s3_key):
+    """Stream a private profile image with its ETag and long-lived cache headers"""
+    if not delivery.proxy_allowed(s3_key):
+        return {"error": "Image not found."}, 404
+    cache_control = delivery.cache_control(s3_key)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and cache_control == IMMUTABLE_CACHE_CONTROL:
+        # A content-hashed key never changes, so whatever the browser holds is current
+        return app.response_class(status=304, headers={'Cache-Control': cache_control})
+    
+    s3_client = get_s3_client()
+    if not s3_client:
+        return {"error": "S3 unavailable."}, 503
+    try:
+        params = {'IfNoneMatch': if_none_match} if if_none_match else {}
+        obj = s3_client.get_object(Bucket=bucket, Key=s3_key, **params)
+    except ClientError as e:
+        code = e.response['Error']['Code']
+        if code in ('304', 'NotModified'):
+            return app.response_class(status=304, headers={'Cache-Control': cache_control})
+        if code in ('404', 'NoSuchKey', 'NotFound'):
+            return {"error": "Image not found."}, 404
+        return {"error": f"S3 error: {code}"}, 502
+    
+    def body():
+        try:
+            yield from obj['Body'].iter_chunks(65536)
+        finally:
+            obj['Body'].close()
+    response = app.response_class(body(), mimetype=obj.get('ContentType') or 'application/octet-stream')
+    response.headers['Content-Length'] = str(obj['ContentLength'])
+    response.headers['ETag'] = obj['ETag']
+    response.headers['Cache-Control'] = cache_control
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
 @app.route("/health")
 def health_check():
     """Health check endpoint"""
@@ -355,8 +1387,78 @@ def health_check():
         "database": "connected" if aws_status['rds'] else "disconnected",
         "s3": "connected" if aws_status['s3'] else "disconnected",
         "s3_bucket_exists": aws_status['s3_bucket_exists'],
-        "s3_access_denied": aws_status['s3_access_denied']
+        "s3_access_denied": aws_status['s3_access_denied'],
+        "checks": aws_status['checks'],
+        "db_pool": db_pool.stats(),
+        "replicas": read_router.stats(),
+        "cache": query_cache.stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "admission": admission_control.stats(),
+        "upload_queue": upload_queue.stats()
+    }
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return app.response_class(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Slow-query report and profiler are only reachable with the configured token
+DEBUG_TOKEN = getattr(config, 'debug_token', None)
+profiler = SamplingProfiler(interval=getattr(config, 'profiler_interval', 0.01))
+
+def debug_authorized():
+    return bool(DEBUG_TOKEN) and request.headers.get('X-Debug-Token') == DEBUG_TOKEN
+
+@app.route("/debug/slow-queries")
+def slow_queries():
+    """Slowest normalized SQL statements since startup"""
+    if not debug_authorized():
+        return {"error": "Not found"}, 404
+    return {"threshold_ms": metrics.SLOW_QUERY_SECONDS * 1000, "statements": metrics.slow_queries()}
+
+@app.route("/debug/profiler", methods=['GET', 'POST'])
+def sampling_profiler():
+    """POST action=start|stop to toggle sampling; GET ?format=collapsed for the stacks"""
+    if not debug_authorized():
+        return {"error": "Not found"}, 404
+    if request.method == 'POST':
+        action = request.values.get('action')
+        if action == 'start':
+            try:
+                interval = float(request.values.get('interval', 0)) or None
+                duration = float(request.values.get('duration', 60))
+            except ValueError:
+                return {"error": "interval and duration must be numbers"}, 400
+            profiler.start(interval=interval, duration=duration)
+            print(f"🔬 Sampling profiler started for {duration:.0f}s")
+        elif action == 'stop':
+            profiler.stop()
+            print("🔬 Sampling profiler stopped")
+        else:
+            return {"error": "action must be 'start' or 'stop'"}, 400
+    if request.args.get('format') == 'collapsed':
+        return app.response_class(profiler.collapsed(), mimetype='text/plain')
+    return profiler.status()
+
+@app.route("/health/live")
+def liveness():
+    """Liveness probe: the process is up and serving requests (never touches RDS/S3)"""
+    return {"status": "alive"}
+
+@app.route("/health/ready")
+def readiness():
+    """Readiness probe: RDS reachable and schema migrated, per the latest background check"""
+    rds = health_monitor.snapshot()['rds']
+    ready = rds['ok'] and rds.get('schema_current', False)
+    body = {
+        "status": "ready" if ready else "not ready",
+        "database": "connected" if rds['ok'] else "disconnected",
+        "schema_version": rds.get('schema_version'),
+        "required_schema_version": migrations.SCHEMA_VERSION,
+        "checked_at": rds['checked_at'],
+        "error": rds['error']
     }
+    return body, 200 if ready else 503
 
 @app.route("/aws-status")
 def aws_status():
@@ -368,18 +1470,90 @@ def aws_status():
                          region=region,
                          host=host)
 
+_started = False
+_start_lock = threading.Lock()
+
+def _warm_up_pool():
+    try:
+        db_pool.warm_up()
+        print(f"✅ RDS Database connected successfully! (pool size {db_pool.max_size})")
+    except Exception as e:
+        print(f"❌ RDS Connection failed: {e}")
+
+def create_app():
+    """Start the background services and return the app (safe to call more than once)
+
+    Importing this module opens no connections. The first call here warms
+    up the pool and starts the health probes and upload workers, all on
+    background threads, so it returns in milliseconds even when RDS or S3 is
+    slow or unreachable. /health/ready reports when the app can serve traffic.
+    """
+    global _started
+    with _start_lock:
+        if not _started:
+            threading.Thread(target=_warm_up_pool, name='db-warm-up', daemon=True).start()
+            health_monitor.start()
+            upload_queue.start()
+            aggregate_rebuilder.start()
+            _started = True
+    return app
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create or upgrade the database schema"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            migrations.migrate(cursor)
+        finally:
+            cursor.close()
+
+@app.cli.command('assets')
+def assets_command():
+    """Build fingerprinted, precompressed static assets"""
+    assets.build()
+
+def shutdown(timeout=10):
+    """Drain background work and close pooled connections before the process exits
+
+    Queued uploads stay in the on-disk queue and resume on the next start;
+    only uploads already in progress are waited for.
+    """
+    print("🛑 Shutting down: finishing in-flight uploads and closing connections...")
+    profiler.stop()
+    health_monitor.stop()
+    aggregate_rebuilder.stop()
+    upload_queue.stop(timeout)
+    db_pool.close()
+    monitor_pool.close()
+    for pool in read_router.replicas:
+        pool.close()
+    print("✅ Shutdown complete")
+
 if __name__ == '__main__':
+    # The development server migrates on start; production runs `python migrations.py` once per deploy
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                migrations.migrate(cursor)
+            finally:
+                cursor.close()
+    except Exception as e:
+        print(f"❌ Table creation error: {e}")
+    create_app()
+    health_monitor.probe_now()
     print("=" * 60)
     print("🏢 AWS Employee Management System")
     print("=" * 60)
     print(f"📍 AWS Region: {region}")
     print(f"🗄️  RDS Database: {host}")
-    print(f"📦 S3 Bucket: {bucket} - {'✅ EXISTS' if s3_bucket_exists else '❌ MISSING'}")
-    if s3_access_denied:
+    status = check_aws_services()
+    print(f"📦 S3 Bucket: {bucket} - {'✅ EXISTS' if status['s3_bucket_exists'] else '❌ MISSING'}")
+    if status['s3_access_denied']:
         print(f"🔐 S3 Access: ❌ DENIED - Need permissions")
     print("=" * 60)
     
-    status = check_aws_services()
     print(f"✅ RDS Status: {'Connected' if status['rds'] else 'Disconnected'}")
     print(f"✅ S3 Status: {'Connected' if status['s3'] else 'Disconnected'}")
     
@@ -390,6 +1564,7 @@ if __name__ == '__main__':
     
     print("=" * 60)
     print("🌐 Starting server at http://localhost:8080")
+    print("   (development server - use `gunicorn -c gunicorn.conf.py wsgi:app` in production)")
     print("=" * 60)
     
     app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""ASGI entry point for platforms that only speak ASGI
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 8080 --workers 4 --timeout-graceful-shutdown 30
+
+The Flask app itself stays WSGI: asgiref runs each request on a thread pool
+and buffers request bodies, so this gives no extra concurrency over
+gunicorn's gevent worker (see gunicorn.conf.py), which is the preferred
+production mode. What it adds is ASGI lifespan handling, so uvicorn's
+graceful shutdown drains the upload workers and closes the connection pool.
+"""
+import asyncio
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as hrms
+
+
+class LifespanApp:
+    """Answers ASGI lifespan events and forwards HTTP to the wrapped app"""
+
+    def __init__(self, app, on_shutdown):
+        self.app = app
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            await self.app(scope, receive, send)
+            return
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Draining joins worker threads; keep the event loop free meanwhile
+                await asyncio.get_running_loop().run_in_executor(None, self.on_shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = LifespanApp(WsgiToAsgi(hrms.create_app()), hrms.shutdown)
@@ -0,0 +1,259 @@
+"""Static asset pipeline: fingerprinted, minified, precompressed copies of static/
+
+``python assets.py`` (or ``flask --app app assets``) reads the sources under
+static/ and writes the files the pages actually load into static/dist/:
+
+* CSS and JS get a content hash in their name (``css/app.3f2a9c0d5e6b.css``),
+  comments and indentation are stripped from CSS, and a gzip copy (and a
+  brotli one when the ``brotli`` package is installed) is written next to
+  each.
+* Raster images referenced from CSS ``background-image`` are resized to
+  BACKGROUND_WIDTHS and stored as WebP, AVIF (when Pillow can encode it) and
+  JPEG. The CSS is rewritten to an ``image-set()`` so browsers pick the
+  smallest format they support, with the narrower copy for small screens.
+* ``manifest.json`` maps each source name to its built name.
+
+Run it once per deploy, like the migrations. Built files never change
+content under a given name, so /assets/ serves them with a one-year
+immutable Cache-Control and earlier builds can stay in place for pages still
+open in browsers. Without a build, pages fall back to the plain files under
+/static/.
+
+Usage:
+    python assets.py
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+
+from flask import send_from_directory, url_for
+from PIL import Image, features
+
+from storage import IMMUTABLE_CACHE_CONTROL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+OUTPUT_DIR = os.path.join(SOURCE_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+URL_PREFIX = '/assets/'
+
+HASH_LENGTH = 12
+# Built names look like app.3f2a9c0d5e6b.css or wallpaper-1920.3f2a9c0d5e6b.webp
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{%d}\.[a-z0-9]+$' % HASH_LENGTH)
+
+BACKGROUND_WIDTHS = (1280, 1920)
+BACKGROUND_QUALITY = {'avif': 55, 'webp': 75, 'jpg': 80}
+IMAGE_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpg': 'image/jpeg'}
+PRECOMPRESSED_TYPES = ('.css', '.js', '.svg', '.json')
+RASTER_TYPES = ('.jpg', '.jpeg', '.png')
+
+# A CSS rule with no nested blocks, and a url() inside it
+_CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+
+
+def _fingerprint(name, data):
+    root, extension = posixpath.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def minify_css(css):
+    """Drop comments and layout whitespace; keeps every declaration as written"""
+    css = _CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};])\s*', r'\1', css)
+    return css.replace(';}', '}').strip() + '\n'
+
+
+class _Build:
+    """One run of the pipeline; collects written files into the manifest"""
+
+    def __init__(self, source_dir, output_dir):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.manifest = {}
+        self.written = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _write(self, name, data):
+        path = os.path.join(self.output_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.written += 1
+
+    def emit(self, source_name, data, built_name=None):
+        """Write ``data`` under its fingerprinted name, plus compressed copies; returns that name"""
+        built = _fingerprint(built_name or source_name, data)
+        self._write(built, data)
+        if built.endswith(PRECOMPRESSED_TYPES):
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                self._write(built + '.gz', compressed)
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    self._write(built + '.br', compressed)
+        self.bytes_out += len(data)
+        return built
+
+    def read(self, name):
+        with open(os.path.join(self.source_dir, *name.split('/')), 'rb') as f:
+            data = f.read()
+        self.bytes_in += len(data)
+        return data
+
+    def asset(self, name):
+        """Built name of a source file copied as-is (fingerprinted and, for text, compressed)"""
+        if name not in self.manifest:
+            self.manifest[name] = self.emit(name, self.read(name))
+        return self.manifest[name]
+
+    def background(self, name):
+        """Resized copies of a background image: ``{width: {format: built name}}``, widest last"""
+        with Image.open(io.BytesIO(self.read(name))) as image:
+            image = image.convert('RGB')
+            root = posixpath.splitext(name)[0]
+            formats = ['avif', 'webp', 'jpg'] if features.check('avif') else ['webp', 'jpg']
+            variants = {}
+            for width in BACKGROUND_WIDTHS:
+                if width > image.width and variants:
+                    break
+                resized = image
+                if image.width > width:
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                variants[width] = {}
+                for fmt in formats:
+                    buf = io.BytesIO()
+                    save_args = {'quality': BACKGROUND_QUALITY[fmt]}
+                    if fmt == 'jpg':
+                        save_args.update(optimize=True, progressive=True)
+                    resized.save(buf, {'jpg': 'JPEG'}.get(fmt, fmt.upper()), **save_args)
+                    variants[width][fmt] = self.emit(name, buf.getvalue(), f"{root}-{width}.{fmt}")
+        self.manifest[name] = variants[max(variants)]['jpg']
+        return variants
+
+    def css(self, name):
+        """Minify a stylesheet and point its url()s at built files"""
+        base = posixpath.dirname(name)
+        css = minify_css(self.read(name).decode())
+
+        def relative(built):
+            return posixpath.relpath(built, base)
+
+        def image_set(variants):
+            return 'image-set(' + ','.join(
+                f'url("{relative(built)}") type("{IMAGE_TYPES[fmt]}")'
+                for fmt, built in variants.items()
+            ) + ')'
+
+        def rewrite_rule(match):
+            selector, body = match.groups()
+            extra = ''
+            declarations = []
+            for declaration in body.split(';'):
+                prop, _, value = declaration.partition(':')
+                url = _CSS_URL.search(value)
+                target = url and posixpath.normpath(posixpath.join(base, url.group(2)))
+                if not url or ':' in url.group(2) or url.group(2).startswith(('/', '#')):
+                    declarations.append(declaration)
+                elif prop.strip() == 'background-image' and target.lower().endswith(RASTER_TYPES):
+                    variants = self.background(target)
+                    widest = variants[max(variants)]
+                    # Plain url() first for browsers without image-set()
+                    declarations.append(f'{prop}:url("{relative(widest["jpg"])}")')
+                    declarations.append(f'{prop}:{image_set(widest)}')
+                    for width in sorted(variants)[:-1]:
+                        extra += f'@media (max-width:{width}px){{{selector}{{{prop}:{image_set(variants[width])}}}}}'
+                else:
+                    built = self.asset(target)
+                    declarations.append(declaration[:url.start() + len(prop) + 1]
+                                        + f'url("{relative(built)}")'
+                                        + declaration[len(prop) + 1 + url.end():])
+            return f"{selector}{{{';'.join(declarations)}}}" + extra
+
+        css = _CSS_RULE.sub(rewrite_rule, css)
+        self.manifest[name] = self.emit(name, css.encode())
+        return self.manifest[name]
+
+
+def build(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR):
+    """Build every stylesheet and script under ``source_dir``; returns the manifest"""
+    run = _Build(source_dir, output_dir)
+    for folder, build_file in (('css', run.css), ('js', run.asset)):
+        for filename in sorted(os.listdir(os.path.join(source_dir, folder))):
+            build_file(f"{folder}/{filename}")
+    # Written last, so a reader never sees a manifest naming files that don't exist yet
+    run._write(MANIFEST_NAME, json.dumps(run.manifest, indent=2, sort_keys=True).encode())
+    print(f"✅ Built {len(run.manifest)} assets ({run.written} files): "
+          f"{run.bytes_in / 1024:.0f} KB of sources -> {run.bytes_out / 1024:.0f} KB")
+    return run.manifest
+
+
+class AssetManifest:
+    """Resolves source names to the URLs of their built copies"""
+
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = output_dir
+        self._manifest = None
+
+    def _load(self):
+        if self._manifest is None:
+            try:
+                with open(os.path.join(self.output_dir, MANIFEST_NAME)) as f:
+                    self._manifest = json.load(f)
+            except FileNotFoundError:
+                print("⚠️ Static assets are not built (run `python assets.py`); serving them unoptimized")
+                self._manifest = {}
+        return self._manifest
+
+    def url(self, name):
+        """URL of the built copy of ``name``, or of the source file before a build"""
+        built = self._load().get(name)
+        if built is None:
+            return url_for('static', filename=name)
+        return URL_PREFIX + built
+
+    def send(self, filename, accept_encodings):
+        """Response for a built file, using a precompressed copy the client accepts"""
+        if not FINGERPRINTED.search(filename):
+            return None
+        mimetype = IMAGE_TYPES.get(filename.rsplit('.', 1)[-1]) or mimetypes.guess_type(filename)[0]
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accept_encodings[candidate] and os.path.isfile(os.path.join(self.output_dir, filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+        response = send_from_directory(self.output_dir, filename, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if filename.endswith(PRECOMPRESSED_TYPES + ('.gz', '.br')):
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def main():
+    try:
+        build()
+    except (OSError, ValueError) as e:
+        print(f"❌ Asset build failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,501 @@
+"""Load-testing harness for the HRMS routes
+
+Starts the app in-process against a local MySQL (or compatible) server and a
+local S3 stand-in (a moto server started on the fly, or MinIO/any endpoint
+given with --s3-endpoint-url). It then seeds synthetic employees and drives
+/health, /listemp, /fetchdata (all three search types) and /addemp at each
+concurrency level. Throughput and latency percentiles are written as JSON,
+so runs from two commits can be diffed with --compare.
+
+    python benchmark.py --db-user root --db-password secret --employees 5000 \\
+        --concurrency 1,8,32 --requests 500 --output bench.json
+    python benchmark.py ... --compare bench.json
+
+The harness writes its own config.py into a temporary directory. It drops and
+recreates the whole --db-name database (default ``hrms_bench``) and reseeds
+it, so never point it at a database you care about.
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+import pymysql
+
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Priya', 'Carlos', 'Fatima', 'Olga', 'Kenji', 'Amara', 'Liam',
+               'Sofia', 'Noah', 'Aisha', 'Mateo', 'Yuki', 'Elena', 'Omar', 'Grace', 'Ivan', 'Zara']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Patel', 'Kowalski', 'Okafor', 'Tanaka', 'Nguyen', 'Silva',
+              'Murphy', 'Haddad', 'Larsen', 'Rossi', 'Kim', 'Novak', 'Cohen', 'Ali', 'Moreau']
+SKILLS = ['Python', 'AWS', 'SQL', 'Java', 'Kubernetes', 'React', 'Go', 'Terraform', 'Docker',
+          'Spark', 'Linux', 'Rust', 'TypeScript', 'Networking', 'Security', 'Machine Learning']
+LOCATIONS = ['Seattle, USA', 'London, UK', 'Bangalore, India', 'Berlin, Germany', 'Tokyo, Japan',
+             'Sao Paulo, Brazil', 'Lagos, Nigeria', 'Sydney, Australia', 'Toronto, Canada']
+
+SEED_ID_START = 100000      # seeded employees
+ADD_ID_START = 500000       # employees created by the /addemp scenario
+SEED_BATCH_SIZE = 1000
+
+DEFAULT_SCENARIOS = ['health', 'dashboard', 'listemp', 'listemp_stream', 'fetchdata_emp_id',
+                     'fetchdata_name', 'fetchdata_skill', 'fetchdata_skills', 'addemp']
+
+# Every handled failure renders error.html with a 200, so look for its title
+ERROR_PAGE_MARKER = b'<title>Error</title>'
+
+CONFIG_TEMPLATE = '''# Generated by benchmark.py
+host = {host!r}
+db_port = {port!r}
+user = {user!r}
+password = {password!r}
+db = {db!r}
+bucket = {bucket!r}
+region = {region!r}
+s3_endpoint_url = {s3_endpoint_url!r}
+db_pool_size = {pool_size!r}
+read_replicas = {read_replicas!r}
+cache_backend = {cache_backend!r}
+upload_spool_dir = {spool_dir!r}
+bulk_import_dir = {import_dir!r}
+# Every simulated client comes from 127.0.0.1; rate and concurrency limits would only measure rejections
+admission_enabled = False
+'''
+
+
+# ----------------------------------------------------------------------
+# Environment: database, S3 stand-in, in-process app server
+# ----------------------------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_moto_server():
+    """Start a moto S3 server on a free local port and return its URL"""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit("❌ moto is not installed. Run `pip install 'moto[server]'` or pass --s3-endpoint-url.")
+    # moto accepts any credentials; make sure boto3 finds some
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    port = free_port()
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def prepare_database(args):
+    """Start from an empty benchmark database, so no table or count from an earlier run leaks in"""
+    conn = pymysql.connect(host=args.db_host, port=args.db_port, user=args.db_user,
+                           password=args.db_password, connect_timeout=10, autocommit=True)
+    try:
+        with conn.cursor() as cursor:
+            if not args.keep_data:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{args.db_name}`")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.db_name}`")
+    finally:
+        conn.close()
+
+
+def write_config(args, workdir, s3_endpoint_url):
+    with open(os.path.join(workdir, 'config.py'), 'w') as f:
+        f.write(CONFIG_TEMPLATE.format(
+            host=args.db_host, port=args.db_port, user=args.db_user, password=args.db_password,
+            db=args.db_name, bucket=args.bucket, region=args.region, s3_endpoint_url=s3_endpoint_url,
+            pool_size=args.pool_size, read_replicas=args.read_replica, cache_backend=args.cache,
+            spool_dir=os.path.join(workdir, 'upload_spool'),
+            import_dir=os.path.join(workdir, 'imports'),
+        ))
+
+
+def start_app_server(workdir):
+    """Import the app against the generated config, migrate, and serve it on a free port"""
+    from werkzeug.serving import make_server
+
+    sys.path.insert(0, workdir)
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+    import app as hrms
+    import migrations
+
+    with hrms.db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            migrations.migrate(cursor)
+        finally:
+            cursor.close()
+    hrms.create_app()
+
+    # Per-request access logging would dominate the measurements
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    port = free_port()
+    server = make_server('127.0.0.1', port, hrms.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return hrms, server, f"http://127.0.0.1:{port}"
+
+
+def sample_image(size=(640, 480)):
+    """A small PNG with some detail so encoding cost is realistic"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', size, (35, 47, 62))
+    draw = ImageDraw.Draw(img)
+    rng = random.Random(42)
+    for _ in range(40):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.ellipse((x, y, x + rng.randrange(20, 120), y + rng.randrange(20, 120)),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def seed_employees(hrms, count, image_data):
+    """Insert ``count`` synthetic employees sharing one uploaded profile image"""
+    import skills
+    from storage import upload_employee_image
+
+    image_url, variants = upload_employee_image(hrms.get_s3_client(), io.BytesIO(image_data), 'bench-seed')
+    rng = random.Random(1)
+    rows = [
+        (str(SEED_ID_START + i), rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+         ', '.join(rng.sample(SKILLS, 3)), rng.choice(LOCATIONS), image_url, variants)
+        for i in range(count)
+    ]
+    started = time.perf_counter()
+    with hrms.db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            conn.begin()
+            for i in range(0, len(rows), SEED_BATCH_SIZE):
+                cursor.executemany(
+                    "INSERT INTO employees (emp_id, first_name, last_name, pri_skill, location, image_url, "
+                    "image_variants) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    rows[i:i + SEED_BATCH_SIZE]
+                )
+                skills.link_skills(cursor, [(row[0], row[3]) for row in rows[i:i + SEED_BATCH_SIZE]])
+            conn.commit()
+        finally:
+            cursor.close()
+    # The seed bypasses the incremental counters; recount for the dashboard
+    hrms.aggregate_rebuilder.rebuild_now()
+    print(f"✅ Seeded {count} employees in {time.perf_counter() - started:.1f}s")
+
+
+# ----------------------------------------------------------------------
+# Scenarios: each returns (method, path, body, headers) for one request
+# ----------------------------------------------------------------------
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def form(fields):
+    return urlencode(fields).encode(), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class Scenarios:
+    """Request factories for every benchmarked route"""
+
+    def __init__(self, seeded, image_data, page_size):
+        self.seeded = max(seeded, 1)
+        self.image_data = image_data
+        self.page_size = page_size
+        self._next_id = ADD_ID_START
+        self._lock = threading.Lock()
+
+    def health(self, rng):
+        return 'GET', '/health', None, {}
+
+    def dashboard(self, rng):
+        return 'GET', '/dashboard', None, {}
+
+    def listemp(self, rng):
+        return 'GET', f'/listemp?page_size={self.page_size}', None, {}
+
+    def listemp_stream(self, rng):
+        return 'GET', '/listemp?stream=1', None, {}
+
+    def fetchdata_emp_id(self, rng):
+        body, headers = form({'search_type': 'emp_id',
+                              'search_value': str(SEED_ID_START + rng.randrange(self.seeded))})
+        return 'POST', '/fetchdata', body, headers
+
+    def fetchdata_name(self, rng):
+        body, headers = form({'search_type': 'emp_name', 'search_value': rng.choice(FIRST_NAMES)})
+        return 'POST', '/fetchdata', body, headers
+
+    def fetchdata_skill(self, rng):
+        body, headers = form({'search_type': 'primary_skills', 'search_value': rng.choice(SKILLS)})
+        return 'POST', '/fetchdata', body, headers
+
+    def fetchdata_skills(self, rng):
+        body, headers = form({'search_type': 'skills', 'search_value': ', '.join(rng.sample(SKILLS, 2)),
+                              'skill_match': rng.choice(['all', 'any'])})
+        return 'POST', '/fetchdata', body, headers
+
+    def addemp(self, rng):
+        with self._lock:
+            emp_id = self._next_id
+            self._next_id += 1
+        body, headers = multipart(
+            {'emp_id': emp_id, 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+             'pri_skill': ', '.join(rng.sample(SKILLS, 2)), 'location': rng.choice(LOCATIONS)},
+            {'emp_image_file': ('profile.png', self.image_data, 'image/png')},
+        )
+        return 'POST', '/addemp', body, headers
+
+
+# ----------------------------------------------------------------------
+# Load driver
+# ----------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_level(base_url, make_request, concurrency, total_requests, warmup, timeout):
+    """Issue ``total_requests`` requests from ``concurrency`` keep-alive clients"""
+    target = urlsplit(base_url)
+    remaining = [warmup + total_requests]
+    lock = threading.Lock()
+    latencies, statuses, errors = [], {}, []
+
+    def take():
+        with lock:
+            if remaining[0] <= 0:
+                return None
+            remaining[0] -= 1
+            return remaining[0] >= total_requests    # True while still warming up
+
+    def client(worker):
+        rng = random.Random(worker)
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=timeout)
+        while True:
+            warming = take()
+            if warming is None:
+                break
+            method, path, body, headers = make_request(rng)
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                status = response.status
+                error = None
+                if status >= 400:
+                    error = f"HTTP {status}"
+                elif ERROR_PAGE_MARKER in payload:
+                    error = 'error page'
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                status, error = 'exception', f"{type(e).__name__}: {e}"
+            elapsed = (time.perf_counter() - started) * 1000
+            if warming:
+                continue
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if error:
+                    errors.append(error)
+        conn.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    distinct_errors = sorted(set(errors))
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': distinct_errors[:5],
+        'status_codes': statuses,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'latency_ms': {
+            'min': round(latencies[0], 2) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50': round(percentile(latencies, 50), 2) if latencies else None,
+            'p95': round(percentile(latencies, 95), 2) if latencies else None,
+            'p99': round(percentile(latencies, 99), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None,
+        },
+    }
+
+
+def compare(report, baseline):
+    """Print throughput and p95/p99 changes against an earlier report"""
+    previous = {(r['scenario'], r['concurrency']): r for r in baseline.get('results', [])}
+    print(f"\n📊 Compared with {baseline.get('git_commit') or 'baseline'}:", file=sys.stderr)
+    print(f"{'scenario':<20}{'conc':>5}{'rps':>12}{'p95 ms':>12}{'p99 ms':>12}", file=sys.stderr)
+    for result in report['results']:
+        before = previous.get((result['scenario'], result['concurrency']))
+        if not before:
+            continue
+
+        def change(new, old):
+            if not new or not old:
+                return 'n/a'
+            return f"{(new - old) / old * 100:+.1f}%"
+
+        print(f"{result['scenario']:<20}{result['concurrency']:>5}"
+              f"{change(result['throughput_rps'], before['throughput_rps']):>12}"
+              f"{change(result['latency_ms']['p95'], before['latency_ms']['p95']):>12}"
+              f"{change(result['latency_ms']['p99'], before['latency_ms']['p99']):>12}", file=sys.stderr)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HRMS routes against local MySQL and S3 stand-ins")
+    parser.add_argument('--url', help="benchmark an already running app instead of starting one (no seeding)")
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='hrms_bench')
+    parser.add_argument('--read-replica', action='append', default=[], metavar='HOST:PORT',
+                        help="replica of --db-host to route reads to (repeatable)")
+    parser.add_argument('--s3-endpoint-url', help="existing S3-compatible endpoint (default: start a moto server)")
+    parser.add_argument('--bucket', default='hrms-bench')
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--employees', type=int, default=1000, help="synthetic employees to seed")
+    parser.add_argument('--keep-data', action='store_true', help="reuse the existing database instead of recreating and reseeding it")
+    parser.add_argument('--cache', default='memory', choices=['memory', 'none'],
+                        help="query cache backend for the app under test")
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS))
+    parser.add_argument('--concurrency', default='1,8,32', help="comma separated client counts")
+    parser.add_argument('--requests', type=int, default=200, help="measured requests per scenario and level")
+    parser.add_argument('--warmup', type=int, default=20, help="unmeasured requests before each level")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--compare', help="earlier JSON report to compare against")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="allow a database host that looks like RDS (the --db-name database is dropped!)")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args, scenario_names, levels, image_data):
+    """Set up the environment (unless --url is given) and measure every scenario"""
+    moto_server = app_server = None
+
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            if 'rds.amazonaws.com' in args.db_host and not args.allow_remote:
+                sys.exit("❌ Refusing to drop the benchmark database on an RDS host. Use a local database or --allow-remote.")
+            s3_endpoint_url = args.s3_endpoint_url
+            if not s3_endpoint_url:
+                moto_server, s3_endpoint_url = start_moto_server()
+                print(f"✅ moto S3 server running at {s3_endpoint_url}")
+
+            import boto3
+            s3 = boto3.client('s3', region_name=args.region, endpoint_url=s3_endpoint_url)
+            if args.bucket not in [b['Name'] for b in s3.list_buckets().get('Buckets', [])]:
+                s3.create_bucket(Bucket=args.bucket)
+
+            prepare_database(args)
+            workdir = tempfile.mkdtemp(prefix='hrms-bench-')
+            write_config(args, workdir, s3_endpoint_url)
+            hrms, app_server, base_url = start_app_server(workdir)
+            hrms.health_monitor.probe_now()
+            if not args.keep_data:
+                seed_employees(hrms, args.employees, image_data)
+
+        scenarios = Scenarios(args.employees, image_data, args.page_size)
+        results = []
+        for name in scenario_names:
+            for concurrency in levels:
+                print(f"🔄 {name} @ {concurrency} clients...")
+                result = run_level(base_url, getattr(scenarios, name), concurrency,
+                                   args.requests, args.warmup, args.timeout)
+                result['scenario'] = name
+                results.append(result)
+                print(f"   {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+                      f"p99 {result['latency_ms']['p99']} ms, {result['errors']} errors")
+    finally:
+        if app_server:
+            app_server.shutdown()
+        if moto_server:
+            moto_server.stop()
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenario_names = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenario_names if s not in DEFAULT_SCENARIOS]
+    if unknown:
+        sys.exit(f"❌ Unknown scenario(s): {', '.join(unknown)}. Choose from {', '.join(DEFAULT_SCENARIOS)}")
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    image_data = sample_image()
+    # The app logs with print(); keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_benchmark(args, scenario_names, levels, image_data)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'employees': args.employees, 'cache': args.cache, 'pool_size': args.pool_size,
+            'page_size': args.page_size, 'requests': args.requests, 'warmup': args.warmup,
+            'target': args.url or 'in-process',
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"✅ Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,556 @@
+"""Bulk employee import from a CSV/JSONL manifest and a zip or directory of images
+
+The manifest has one employee per row/line with the fields
+``emp_id, first_name, last_name, pri_skill, location, image`` where ``image``
+is a file name inside the image zip/directory.
+
+Rows are processed in batches: validated, de-duplicated against the table with
+a single ``IN (...)`` query, images uploaded through a bounded thread pool, and
+the batch inserted with ``executemany`` inside one transaction. Committed IDs
+are appended to a checkpoint file so a crashed import can be re-run and will
+pick up where it stopped. The report keeps the first MAX_REPORTED_ERRORS row
+errors; ``errors_omitted`` counts the rest.
+
+Jobs started over HTTP hold an exclusive ``flock`` on their job directory's
+lock file while they run, so every worker process can tell a running job from
+one whose process died, and a resume never starts a second run.
+
+Usage:
+    python bulk_import.py manifest.csv --images photos.zip
+    python bulk_import.py manifest.jsonl --images ./photos --batch-size 1000 --workers 16
+"""
+import argparse
+import csv
+import fcntl
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pymysql
+
+import aggregates
+import changes
+import skills
+from images import MAX_IMAGE_BYTES
+from storage import delete_objects, image_keys, upload_employee_image
+from validators import employee_error
+
+FIELDS = ('emp_id', 'first_name', 'last_name', 'pri_skill', 'location', 'image')
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_UPLOAD_WORKERS = 8
+MAX_REPORTED_ERRORS = 1000
+
+INSERT_SQL = """
+    INSERT INTO employees (emp_id, first_name, last_name, pri_skill, location, image_url, image_variants,
+                           change_version)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+class ImageSource:
+    """Read image files by name from a zip archive or a directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self._zip is not None:
+            # Match on the bare file name so archives with a top-level folder work too
+            self._members = {os.path.basename(name): name for name in self._zip.namelist()
+                             if not name.endswith('/')}
+        elif not os.path.isdir(path):
+            raise ValueError(f"Image source '{path}' is neither a zip file nor a directory.")
+
+    def read(self, name):
+        """Bytes of one image; never decompresses or reads more than MAX_IMAGE_BYTES + 1"""
+        if self._zip is not None:
+            member = self._members.get(os.path.basename(name))
+            if member is None:
+                raise FileNotFoundError(f"Image '{name}' not found in archive.")
+            with self._lock:
+                # The declared size can be forged, so the read is capped as well
+                if self._zip.getinfo(member).file_size > MAX_IMAGE_BYTES:
+                    raise ValueError(self._too_large(name))
+                with self._zip.open(member) as f:
+                    data = f.read(MAX_IMAGE_BYTES + 1)
+        else:
+            full_path = os.path.realpath(os.path.join(self.path, name))
+            if not full_path.startswith(os.path.realpath(self.path) + os.sep):
+                raise FileNotFoundError(f"Image '{name}' is outside the image directory.")
+            with open(full_path, 'rb') as f:
+                data = f.read(MAX_IMAGE_BYTES + 1)
+        if len(data) > MAX_IMAGE_BYTES:
+            raise ValueError(self._too_large(name))
+        return data
+
+    @staticmethod
+    def _too_large(name):
+        return f"Image '{name}' is too large. Maximum is {MAX_IMAGE_BYTES // 1024} KB."
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def read_manifest(path):
+    """Yield (line_number, row_dict_or_None, parse_error) from a CSV or JSONL manifest"""
+    if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError("expected a JSON object")
+                    yield line_no, row, None
+                except ValueError as e:
+                    yield line_no, None, f"Invalid JSON: {e}"
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+
+
+class ImportCheckpoint:
+    """Append-only log of batches that are about to be / have been committed
+
+    ``pending`` is written before a batch transaction starts and ``committed``
+    after it succeeds. On resume, committed IDs are skipped outright and pending
+    IDs that turn out to exist in the table are treated as imported rather than
+    as duplicates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.committed = set()
+        self.pending = set()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue        # torn write from a crash
+                    if 'committed' in entry:
+                        self.committed.update(entry['committed'])
+                    elif 'pending' in entry:
+                        self.pending.update(entry['pending'])
+            self.pending -= self.committed
+
+    def _append(self, entry):
+        if not self.path:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def mark_pending(self, emp_ids):
+        self.pending.update(emp_ids)
+        self._append({'pending': list(emp_ids)})
+
+    def mark_committed(self, emp_ids):
+        self.committed.update(emp_ids)
+        self.pending.difference_update(emp_ids)
+        self._append({'committed': list(emp_ids)})
+
+
+class BulkImporter:
+    """Runs one import and keeps a live progress dict"""
+
+    def __init__(self, pool, s3_client, images, batch_size=DEFAULT_BATCH_SIZE,
+                 upload_workers=DEFAULT_UPLOAD_WORKERS, checkpoint=None,
+                 on_progress=None, on_commit=None):
+        self.pool = pool
+        self.s3_client = s3_client
+        self.images = images
+        self.batch_size = max(1, batch_size)
+        self.upload_workers = max(1, upload_workers)
+        self.checkpoint = checkpoint or ImportCheckpoint(None)
+        self.on_progress = on_progress
+        self.on_commit = on_commit
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.progress = {
+            'status': 'pending',
+            'processed': 0,
+            'inserted': 0,
+            'skipped': 0,
+            'failed': 0,
+            'batches': 0,
+            'started_at': None,
+            'finished_at': None,
+            'errors': [],
+            'errors_omitted': 0,
+        }
+
+    # ------------------------------------------------------------------
+    def _fail(self, line_no, emp_id, message):
+        with self._lock:
+            self.progress['failed'] += 1
+            if len(self.progress['errors']) < MAX_REPORTED_ERRORS:
+                self.progress['errors'].append({'line': line_no, 'emp_id': emp_id, 'error': message})
+            else:
+                self.progress['errors_omitted'] += 1
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.progress[name] += n
+
+    def _report_progress(self):
+        if self.on_progress:
+            self.on_progress(self.snapshot())
+
+    def snapshot(self):
+        with self._lock:
+            progress = dict(self.progress)
+            progress['errors'] = list(self.progress['errors'])
+        return progress
+
+    def _validate(self, row):
+        """Return a cleaned row or raise ValueError with the same messages as AddEmp"""
+        row = {field: str(row.get(field) or '').strip() for field in FIELDS}
+        error = employee_error(row['emp_id'], row['first_name'], row['last_name'])
+        if error:
+            raise ValueError(error)
+        if not row['image']:
+            raise ValueError("Please select a profile image.")
+        return row
+
+    def _upload(self, row):
+        data = self.images.read(row['image'])
+        return upload_employee_image(self.s3_client, io.BytesIO(data), row['emp_id'])
+
+    def _insert(self, rows):
+        """Insert a batch in one transaction; on a key conflict retry row by row"""
+        params = [(r['emp_id'], r['first_name'], r['last_name'], r['pri_skill'], r['location'],
+                   r['image_url'], r['image_variants'])
+                  for _, r in rows]
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                conn.begin()
+                first_version = changes.next_versions(cursor, len(params))
+                cursor.executemany(INSERT_SQL, [values + (first_version + i,) for i, values in enumerate(params)])
+                skills.link_skills(cursor, [(r['emp_id'], r['pri_skill']) for _, r in rows])
+                aggregates.record_inserts(cursor, [(r['location'], r['pri_skill']) for _, r in rows])
+                conn.commit()
+                return [r['emp_id'] for _, r in rows]
+            except pymysql.err.IntegrityError:
+                # Someone inserted one of these IDs since the dedupe query
+                conn.rollback()
+                inserted = []
+                for index, ((line_no, row), values) in enumerate(zip(rows, params)):
+                    try:
+                        conn.begin()
+                        cursor.execute(INSERT_SQL, values + (changes.next_versions(cursor),))
+                        skills.link_skills(cursor, [(row['emp_id'], row['pri_skill'])])
+                        aggregates.record_inserts(cursor, [(row['location'], row['pri_skill'])])
+                        conn.commit()
+                        inserted.append(row['emp_id'])
+                    except pymysql.err.IntegrityError:
+                        conn.rollback()
+                        # Remove the uploaded image, unless the row that won uses the very same picture
+                        cursor.execute("SELECT image_url FROM employees WHERE emp_id = %s", (row['emp_id'],))
+                        winner = cursor.fetchone()
+                        if not winner or winner[0] != row['image_url']:
+                            delete_objects(self.s3_client, image_keys(row['image_url'], row['image_variants']))
+                        self._fail(line_no, row['emp_id'],
+                                   f"Employee ID {row['emp_id']} already exists! Please use a different ID.")
+                    except Exception as e:
+                        # The rows before this one are committed and must still be checkpointed;
+                        # the pool rolls back the open transaction when the connection returns
+                        for line_no, row in rows[index:]:
+                            self._fail(line_no, row['emp_id'], f"Database error: {e}")
+                        break
+                return inserted
+            finally:
+                cursor.close()
+
+    def _process_batch(self, batch, executor):
+        candidates = []
+        for line_no, raw, parse_error in batch:
+            emp_id = str((raw or {}).get('emp_id') or '').strip() or None
+            if parse_error:
+                self._fail(line_no, emp_id, parse_error)
+                continue
+            if emp_id in self.checkpoint.committed:
+                self._count('skipped')
+                continue
+            try:
+                row = self._validate(raw)
+            except Exception as e:
+                self._fail(line_no, emp_id, str(e))
+                continue
+            if row['emp_id'] in self._seen:
+                self._fail(line_no, row['emp_id'], f"Employee ID {row['emp_id']} appears more than once in the manifest.")
+                continue
+            self._seen.add(row['emp_id'])
+            candidates.append((line_no, row))
+
+        if not candidates:
+            return
+
+        # One set-based query instead of a SELECT per employee
+        ids = [row['emp_id'] for _, row in candidates]
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT emp_id FROM employees WHERE emp_id IN ({', '.join(['%s'] * len(ids))})",
+                ids
+            )
+            existing = {r[0] for r in cursor.fetchall()}
+            cursor.close()
+
+        to_upload = []
+        resumed = []
+        for line_no, row in candidates:
+            if row['emp_id'] not in existing:
+                to_upload.append((line_no, row))
+            elif row['emp_id'] in self.checkpoint.pending:
+                # Committed by the run that crashed before it could checkpoint
+                resumed.append(row['emp_id'])
+            else:
+                self._fail(line_no, row['emp_id'],
+                           f"Employee ID {row['emp_id']} already exists! Please use a different ID.")
+        if resumed:
+            self.checkpoint.mark_committed(resumed)
+            self._count('skipped', len(resumed))
+
+        # Upload images in parallel; no DB connection is held meanwhile
+        futures = [(line_no, row, executor.submit(self._upload, row)) for line_no, row in to_upload]
+        uploaded = []
+        for line_no, row, future in futures:
+            try:
+                row['image_url'], row['image_variants'] = future.result()
+                uploaded.append((line_no, row))
+            except Exception as e:
+                self._fail(line_no, row['emp_id'], str(e))
+
+        if not uploaded:
+            return
+
+        self.checkpoint.mark_pending([row['emp_id'] for _, row in uploaded])
+        try:
+            inserted = self._insert(uploaded)
+        except Exception as e:
+            for line_no, row in uploaded:
+                self._fail(line_no, row['emp_id'], f"Database error: {e}")
+            return
+        self.checkpoint.mark_committed(inserted)
+        self._count('inserted', len(inserted))
+        if inserted and self.on_commit:
+            self.on_commit(inserted)
+
+    def run(self, manifest_path):
+        """Import every row of the manifest; returns the final progress report"""
+        with self._lock:
+            self.progress['status'] = 'running'
+            self.progress['started_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        started = time.monotonic()
+        self._report_progress()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix='bulk-upload') as executor:
+                batch = []
+                for entry in read_manifest(manifest_path):
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size:
+                        self._run_batch(batch, executor)
+                        batch = []
+                if batch:
+                    self._run_batch(batch, executor)
+            status = 'completed'
+        except Exception as e:
+            status = 'crashed'
+            self._fail(None, None, f"Import aborted: {e}")
+
+        with self._lock:
+            self.progress['status'] = status
+            self.progress['finished_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            self.progress['duration_seconds'] = round(time.monotonic() - started, 2)
+        self._report_progress()
+        return self.snapshot()
+
+    def _run_batch(self, batch, executor):
+        self._process_batch(batch, executor)
+        with self._lock:
+            self.progress['processed'] += len(batch)
+            self.progress['batches'] += 1
+        self._report_progress()
+
+
+# ----------------------------------------------------------------------
+# Background jobs for the HTTP endpoint
+# ----------------------------------------------------------------------
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _job_dir(base_dir, job_id):
+    return os.path.join(base_dir, job_id)
+
+
+def _lock_job(job_dir, shared=False):
+    """Open file holding the job's lock, or None while another run holds it"""
+    f = open(os.path.join(job_dir, 'lock'), 'a')
+    try:
+        fcntl.flock(f, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def _write_report(job_dir, progress):
+    tmp_path = os.path.join(job_dir, 'report.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, os.path.join(job_dir, 'report.json'))
+
+
+def create_job(base_dir, manifest_file, manifest_name, images_file):
+    """Spool uploaded manifest and image archive into a new job directory"""
+    job_id = uuid.uuid4().hex[:12]
+    job_dir = _job_dir(base_dir, job_id)
+    os.makedirs(job_dir)
+    ext = '.jsonl' if manifest_name.lower().endswith(('.jsonl', '.ndjson', '.json')) else '.csv'
+    with open(os.path.join(job_dir, 'manifest' + ext), 'wb') as f:
+        shutil.copyfileobj(manifest_file, f)
+    with open(os.path.join(job_dir, 'images.zip'), 'wb') as f:
+        shutil.copyfileobj(images_file, f)
+    return job_id
+
+
+def start_job(base_dir, job_id, pool, s3_client, on_commit=None,
+              batch_size=DEFAULT_BATCH_SIZE, upload_workers=DEFAULT_UPLOAD_WORKERS):
+    """Run (or resume) a spooled job on a background thread
+
+    Returns the importer, or None when another process is already running the job.
+    """
+    job_dir = _job_dir(base_dir, job_id)
+    manifest = next((os.path.join(job_dir, name) for name in ('manifest.csv', 'manifest.jsonl')
+                     if os.path.exists(os.path.join(job_dir, name))), None)
+    if manifest is None:
+        raise FileNotFoundError(f"Import job {job_id} not found.")
+
+    with _jobs_lock:
+        running = _jobs.get(job_id)
+        if running and running['thread'].is_alive():
+            return running['importer']
+        lock = _lock_job(job_dir)
+        if lock is None:
+            return None
+        try:
+            images = ImageSource(os.path.join(job_dir, 'images.zip'))
+        except Exception:
+            lock.close()
+            raise
+        importer = BulkImporter(
+            pool, s3_client, images,
+            batch_size=batch_size,
+            upload_workers=upload_workers,
+            checkpoint=ImportCheckpoint(os.path.join(job_dir, 'checkpoint.jsonl')),
+            on_progress=lambda progress: _write_report(job_dir, progress),
+            on_commit=on_commit,
+        )
+
+        def run():
+            try:
+                importer.run(manifest)
+            finally:
+                images.close()
+                lock.close()
+
+        thread = threading.Thread(target=run, name=f"bulk-import-{job_id}", daemon=True)
+        _jobs[job_id] = {'importer': importer, 'thread': thread}
+        thread.start()
+    return importer
+
+
+def job_status(base_dir, job_id):
+    """Live progress for a running job, or the last report written to disk"""
+    with _jobs_lock:
+        running = _jobs.get(job_id)
+    if running:
+        return running['importer'].snapshot()
+    report_path = os.path.join(_job_dir(base_dir, job_id), 'report.json')
+    if not os.path.exists(report_path):
+        return None
+    with open(report_path, encoding='utf-8') as f:
+        progress = json.load(f)
+    if progress.get('status') == 'running':
+        lock = _lock_job(_job_dir(base_dir, job_id), shared=True)
+        if lock is not None:
+            # Nobody holds the lock: the process died mid-import; POST .../resume to continue
+            lock.close()
+            progress['status'] = 'interrupted'
+    return progress
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import employees from a CSV/JSONL manifest.")
+    parser.add_argument('manifest', help="CSV or JSONL file with emp_id, first_name, last_name, pri_skill, location, image")
+    parser.add_argument('--images', required=True, help="zip archive or directory containing the image files")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=DEFAULT_UPLOAD_WORKERS, help="parallel S3 uploads")
+    parser.add_argument('--state', help="checkpoint file (default: <manifest>.checkpoint)")
+    parser.add_argument('--report', help="write the final JSON report to this file")
+    args = parser.parse_args(argv)
+
+    import config
+    from db_pool import ConnectionPool
+    import metrics
+    from schema import UTC_SESSION
+    from storage import create_s3_client
+
+    pool = ConnectionPool(host=config.host, port=getattr(config, 'db_port', 3306), user=config.user,
+                          password=config.password, db=config.db, max_size=2, cursorclass=metrics.TimedCursor,
+                          init_command=UTC_SESSION)
+    s3_client = create_s3_client()
+    images = ImageSource(args.images)
+    checkpoint = ImportCheckpoint(args.state or args.manifest + '.checkpoint')
+    if checkpoint.committed:
+        print(f"↩️  Resuming: {len(checkpoint.committed)} employees already imported")
+
+    def show_progress(progress):
+        print(f"📦 {progress['processed']} rows processed - "
+              f"{progress['inserted']} inserted, {progress['skipped']} skipped, {progress['failed']} failed")
+
+    importer = BulkImporter(pool, s3_client, images,
+                            batch_size=args.batch_size,
+                            upload_workers=args.workers,
+                            checkpoint=checkpoint,
+                            on_progress=show_progress)
+    try:
+        report = importer.run(args.manifest)
+    finally:
+        images.close()
+        pool.close()
+
+    for error in report['errors']:
+        print(f"❌ line {error['line']} (emp_id {error['emp_id']}): {error['error']}")
+    if report['errors_omitted']:
+        print(f"❌ ... and {report['errors_omitted']} more errors")
+    print(f"✅ Import {report['status']} in {report.get('duration_seconds', 0)}s")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['status'] == 'completed' and not report['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
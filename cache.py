@@ -0,0 +1,240 @@
+"""Read-through cache for employee queries
+
+Two interchangeable backends are provided: an in-process LRU with per-entry
+TTL, and a Redis-compatible backend that works with any client exposing
+``get``/``set``/``delete``/``incr`` (redis-py, fakeredis, or a local stand-in).
+
+Single-employee lookups are cached under their own key and deleted when that
+employee is inserted. List pages and search results depend on the whole table,
+so their keys embed a generation number that every insert bumps; entries from
+older generations are never read again and age out through LRU/TTL.
+
+The memory backend keeps the generation per process, so a write only
+invalidates the cache of the process that made it; the others keep serving
+stale lists and searches for up to the TTL. It is meant for a single process.
+Run several workers or hosts against the Redis backend, which they all share.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+GENERATION_KEY = 'employees:generation'
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=10000, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()      # key -> (expires_at, value)
+        self._counters = {}             # never evicted or expired
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0,
+                       'expirations': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self._stats['sets'] += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._data)
+        stats['max_entries'] = self.max_entries
+        stats['backend'] = 'memory'
+        return stats
+
+
+class RedisCache:
+    """Cache backend on top of a Redis-compatible client
+
+    Values are pickled, so only use this with a Redis instance the app trusts.
+    """
+
+    def __init__(self, client, default_ttl=300, prefix='hrms:'):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception:
+            self._count('errors')
+            return None
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+            self._count('sets')
+        except Exception:
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            if self.client.delete(self.prefix + key):
+                self._count('invalidations')
+        except Exception:
+            self._count('errors')
+
+    def incr(self, key):
+        try:
+            return self.client.incr(self.prefix + key)
+        except Exception:
+            self._count('errors')
+            return None
+
+    def get_counter(self, key):
+        try:
+            return int(self.client.get(self.prefix + key) or 0)
+        except Exception:
+            self._count('errors')
+            return None
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = 'redis'
+        return stats
+
+
+class NullCache:
+    """Backend that never stores anything; used when caching is disabled"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def get_counter(self, key):
+        return None
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none'}
+
+
+class QueryCache:
+    """Read-through wrapper that knows how employee writes invalidate reads"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_or_load(self, key, loader, ttl=None, per_generation=True):
+        """Return the cached value for ``key`` or call ``loader()`` and cache it
+
+        ``per_generation`` entries are dropped by any employee insert; the rest
+        must be deleted explicitly (see ``invalidate_employee``).
+        """
+        if per_generation:
+            generation = self.generation()
+            if generation is None:
+                # Backend unreachable: an unversioned entry could be stale forever
+                return loader()
+            key = f"gen{generation}:{key}"
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        self.backend.set(key, value, ttl)
+        return value
+
+    def generation(self):
+        """Number bumped by every employee write, or None when the backend is unreachable"""
+        return self.backend.get_counter(GENERATION_KEY)
+
+    def invalidate_employee(self, emp_id):
+        """Call after a committed write to ``emp_id``"""
+        self.backend.delete(employee_key(emp_id))
+        self.backend.incr(GENERATION_KEY)
+
+    def invalidate_employees(self, emp_ids):
+        """Batch form of ``invalidate_employee`` that bumps the generation once"""
+        for emp_id in emp_ids:
+            self.backend.delete(employee_key(emp_id))
+        self.backend.incr(GENERATION_KEY)
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def employee_key(emp_id):
+    return f"emp:{emp_id}"
+
+
+def create_cache(backend='memory', max_entries=10000, ttl=300, redis_url=None):
+    """Build a QueryCache from config values"""
+    if backend == 'redis':
+        import redis
+        return QueryCache(RedisCache(redis.Redis.from_url(redis_url), default_ttl=ttl))
+    if backend == 'memory':
+        return QueryCache(LRUCache(max_entries=max_entries, default_ttl=ttl))
+    return QueryCache(NullCache())
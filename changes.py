@@ -0,0 +1,127 @@
+"""Change tracking for the employees table
+
+Every write stamps the row with the next value of a single counter, so
+``change_version`` grows by one for each insert, update or delete, in commit
+order. The counter lives in a one-row table. Taking the next value row-locks
+it until the writer commits, which means a reader can never see version N+1
+before version N. That makes "everything after version N" a safe
+continuation point, even though the lock serializes concurrent writers.
+
+Deleted employees leave a tombstone with their deletion version, so consumers
+of the change feed learn about removals too. Rows that existed before change
+tracking was added all have version 0 and are returned by a feed started from
+the beginning.
+"""
+import base64
+import binascii
+
+import aggregates
+import idempotency
+import skills
+from schema import EMPLOYEE_COLUMNS, ensure_column, ensure_index
+
+COUNTER_TABLE = 'employee_change_counter'
+TOMBSTONE_TABLE = 'employee_tombstones'
+
+
+def create_change_tables(cursor):
+    """Add the version column, counter and tombstone tables (idempotent)"""
+    ensure_column(cursor, 'employees', 'change_version', "BIGINT NOT NULL DEFAULT 0")
+    ensure_index(cursor, 'employees', 'idx_employees_change', 'change_version, emp_id')
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL
+        )
+    """)
+    cursor.execute(f"INSERT IGNORE INTO {COUNTER_TABLE} (id, version) VALUES (1, 0)")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TOMBSTONE_TABLE} (
+            emp_id VARCHAR(20) PRIMARY KEY,
+            change_version BIGINT NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_tombstones_change (change_version, emp_id)
+        )
+    """)
+
+
+def next_versions(cursor, count=1):
+    """Reserve ``count`` consecutive versions and return the first one
+
+    Must run inside the writer's transaction (after ``conn.begin()``): the
+    counter row stays locked until that transaction commits or rolls back.
+    """
+    # LAST_INSERT_ID(expr) hands the new value back in the OK packet, as the cursor's lastrowid
+    cursor.execute(
+        f"UPDATE {COUNTER_TABLE} SET version = LAST_INSERT_ID(version + %s) WHERE id = 1",
+        (count,)
+    )
+    return cursor.lastrowid - count + 1
+
+
+def delete_employee(cursor, emp_id):
+    """Delete an employee and leave a tombstone for the change feed (inside a transaction)
+
+    Returns the deleted row's ``(image_url, image_variants)``, so the caller
+    can remove the images once the transaction commits, or None when there is
+    no such employee.
+    """
+    # A missing employee must not take the counter lock (or a version)
+    cursor.execute("SELECT 1 FROM employees WHERE emp_id = %s", (emp_id,))
+    if cursor.fetchone() is None:
+        return None
+    # Counter first, then the row: the same lock order as every other writer
+    version = next_versions(cursor)
+    cursor.execute("SELECT location, pri_skill, DATE_FORMAT(created_at, '%%Y-%%m'), image_url, image_variants "
+                   "FROM employees WHERE emp_id = %s FOR UPDATE", (emp_id,))
+    row = cursor.fetchone()
+    if row is None:
+        # Deleted by someone else since the check; the version is simply never used
+        return None
+    cursor.execute("DELETE FROM employees WHERE emp_id = %s", (emp_id,))
+    skills.unlink_skills(cursor, emp_id)
+    idempotency.forget_employee(cursor, emp_id)
+    aggregates.record_delete(cursor, *row[:3])
+    cursor.execute(
+        f"INSERT INTO {TOMBSTONE_TABLE} (emp_id, change_version) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE change_version = VALUES(change_version), deleted_at = CURRENT_TIMESTAMP",
+        (emp_id, version)
+    )
+    return row[3], row[4]
+
+
+def encode_token(version, emp_id):
+    """Opaque continuation token for the change feed"""
+    return base64.urlsafe_b64encode(f"{version}|{emp_id}".encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Turn a continuation token back into its (version, emp_id) key"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        version, emp_id = raw.split('|', 1)
+        return int(version), emp_id
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid change token.")
+
+
+def changes_since(cursor, after_key, limit):
+    """Changes after ``after_key`` (or from the beginning when None), oldest first
+
+    Returns ``(changes, has_more)`` where each change is
+    ``('upsert', version, emp_id, employee_row)`` or
+    ``('delete', version, emp_id, deleted_at)``. An employee changed several
+    times only shows up once, at its latest version.
+    """
+    version, emp_id = after_key if after_key else (-1, '')
+    keyset = ("WHERE change_version > %s OR (change_version = %s AND emp_id > %s) "
+              "ORDER BY change_version, emp_id LIMIT %s")
+    params = (version, version, emp_id, limit + 1)
+
+    cursor.execute(f"SELECT change_version, {EMPLOYEE_COLUMNS} FROM employees {keyset}", params)
+    upserts = [('upsert', row[0], row[1], row[1:]) for row in cursor.fetchall()]
+    cursor.execute(f"SELECT change_version, emp_id, deleted_at FROM {TOMBSTONE_TABLE} {keyset}", params)
+    deletes = [('delete', row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+    merged = sorted(upserts + deletes, key=lambda change: (change[1], change[2]))
+    return merged[:limit], len(merged) > limit
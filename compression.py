@@ -0,0 +1,35 @@
+"""gzip compression for HTML, JSON and text responses"""
+import gzip
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml'}
+
+
+def _compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def gzip_response(response, accept_encodings, min_size=1024, level=6):
+    """Compress ``response`` in place when the client accepts gzip and it is worth it
+
+    Streamed responses (e.g. /listemp?stream=1) are left alone so they keep
+    flushing rows as they are produced.
+    """
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not _compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accept_encodings['gzip']:
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The compressed bytes differ, so a strong validator no longer applies
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,265 @@
+"""Thread-safe PyMySQL connection pool for the Employee Management System"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolError(Exception):
+    """Raised when the pool cannot hand out a connection"""
+
+
+class PoolTimeout(PoolError):
+    """Raised when every connection stays busy for longer than the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of PyMySQL connections.
+
+    Connections are opened lazily up to ``max_size``. A borrower that finds the
+    pool exhausted waits up to ``checkout_timeout`` seconds for a connection to be
+    returned. Idle connections are pinged before being handed out again, and
+    connections older than ``max_lifetime`` seconds are closed and replaced so
+    that RDS failovers and server-side timeouts never leave a dead socket in use.
+    """
+
+    def __init__(self, host, user, password, db, port=3306, max_size=10, min_size=0,
+                 checkout_timeout=5.0, max_lifetime=1800, ping_interval=30,
+                 connect_timeout=5, **connect_kwargs):
+        self.host = host
+        self.port = port
+        self.max_size = max(1, int(max_size))
+        self.min_size = min(max(0, int(min_size)), self.max_size)
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self._connect_args = dict(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            db=db,
+            connect_timeout=connect_timeout,
+            autocommit=True,
+        )
+        self._connect_args.update(connect_kwargs)
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = deque()        # (connection, returned_at), most recently returned on the right
+        self._created_at = {}       # connection -> time it was opened
+        self._size = 0              # open connections, idle + in use
+        self._waiting = 0
+        self._closed = False
+
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'connections_broken': 0,
+            'connect_errors': 0,
+            'peak_in_use': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+    def _connect(self):
+        try:
+            conn = pymysql.connect(**self._connect_args)
+        except Exception:
+            with self._lock:
+                self._metrics['connect_errors'] += 1
+            raise
+        with self._lock:
+            self._created_at[conn] = time.monotonic()
+            self._metrics['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn, reason='broken'):
+        """Close a connection and free its slot in the pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created_at.pop(conn, None)
+            self._size -= 1
+            self._metrics['connections_' + reason] += 1
+            self._lock.notify()
+
+    def _expired(self, conn, now):
+        created = self._created_at.get(conn, now)
+        return bool(self.max_lifetime) and now - created >= self.max_lifetime
+
+    def _healthy(self, conn, returned_at, now):
+        """Ping connections that have been idle long enough to have gone stale"""
+        if not conn.open:
+            return False
+        if self.ping_interval is not None and now - returned_at < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self, count=None):
+        """Open connections up front so the first requests don't pay for the handshake"""
+        count = self.min_size if count is None else min(count, self.max_size)
+        opened = []
+        try:
+            for _ in range(count):
+                opened.append(self.acquire())
+        finally:
+            for conn in opened:
+                self.release(conn)
+        return len(opened)
+
+    # ------------------------------------------------------------------
+    # Checkout / return
+    # ------------------------------------------------------------------
+    def acquire(self, timeout=None):
+        """Borrow a healthy connection, opening or waiting for one as needed"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._lock:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {timeout:.1f}s "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    # Reserve a slot before connecting outside the lock
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception as e:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise PoolError(f"Could not connect to database: {e}") from e
+            else:
+                now = time.monotonic()
+                if self._expired(conn, now):
+                    self._discard(conn, 'recycled')
+                    continue
+                if not self._healthy(conn, returned_at, now):
+                    self._discard(conn, 'broken')
+                    continue
+
+            wait_time = time.monotonic() - started
+            with self._lock:
+                self._metrics['checkouts'] += 1
+                if waited:
+                    self._metrics['waits'] += 1
+                self._metrics['wait_time_total'] += wait_time
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+                in_use = self._size - len(self._idle)
+                self._metrics['peak_in_use'] = max(self._metrics['peak_in_use'], in_use)
+            return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, dropping it if it is no longer usable"""
+        if conn is None:
+            return
+        if not conn.open:
+            self._discard(conn, 'broken')
+            return
+        # A streamed response closed early leaves an unbuffered result half read; the
+        # connection can run nothing else until every row is read, so drop it instead
+        result = getattr(conn, '_result', None)
+        if result is not None and result.unbuffered_active:
+            self._discard(conn, 'recycled')
+            return
+        # Never hand the next borrower a connection with an open transaction
+        if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn, 'broken')
+                return
+        if self._closed or self._expired(conn, time.monotonic()):
+            self._discard(conn, 'recycled')
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that borrows a connection and always gives it back"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections and refuse new checkouts; busy ones close on return"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._discard(conn, 'recycled')
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def stats(self):
+        """Snapshot of pool size and saturation counters"""
+        with self._lock:
+            idle = len(self._idle)
+            in_use = self._size - idle
+            stats = dict(self._metrics)
+            stats.update({
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': in_use,
+                'waiting': self._waiting,
+                'saturation': round(in_use / self.max_size, 3),
+                'closed': self._closed,
+            })
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = round(stats['wait_time_total'] / checkouts, 6) if checkouts else 0.0
+        stats['wait_time_total'] = round(stats['wait_time_total'], 6)
+        stats['wait_time_max'] = round(stats['wait_time_max'], 6)
+        return stats
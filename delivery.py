@@ -0,0 +1,101 @@
+"""Delivery of private S3 profile images to browsers
+
+Pages never link to the bucket directly. Every stored image URL (``s3://``,
+or a public URL left by older versions) is turned into one of:
+
+* ``presigned`` (default): a presigned GET URL. Each URL is cached in-process
+  and handed out unchanged until a quarter of its lifetime is left. Browsers
+  therefore see the same URL on every page view and answer it from their
+  cache. A URL signed with temporary credentials (an instance or task role)
+  stops working when they expire, whatever its ``ExpiresIn``, so it is only
+  reused until MIN_URL_LIFETIME before the credentials run out.
+* ``proxy``: ``/images/<key>`` on this app, which streams the object with its
+  ETag and answers If-None-Match with 304. Useful when browsers cannot reach
+  S3, or to put a CDN in front of the app.
+
+Content-hashed keys never change content, so both paths send
+``Cache-Control: immutable`` for them. Keys from before content hashing
+(``employees/<id>/profile.jpg``) get a one-day max-age instead.
+"""
+from cache import LRUCache
+from config import bucket
+from storage import IMAGE_KEY_PATTERN, IMMUTABLE_CACHE_CONTROL, key_from_image_url
+
+MUTABLE_CACHE_CONTROL = 'public, max-age=86400'
+PROXY_PREFIX = '/images/'
+# Every URL handed out stays loadable at least this long (less if image_url_expiry is shorter)
+MIN_URL_LIFETIME = 600
+# Reuse limit for URLs whose signing credentials' expiry can't be read
+UNKNOWN_CREDENTIALS_LIFETIME = 3600
+
+
+def proxy_allowed(s3_key):
+    """Only processed profile images may be read through the proxy"""
+    return IMAGE_KEY_PATTERN.match(s3_key) is not None
+
+
+def credentials_remaining(s3_client):
+    """Seconds the credentials signing for ``s3_client`` stay valid, or None for long-term keys"""
+    credentials = getattr(getattr(s3_client, '_request_signer', None), '_credentials', None)
+    if credentials is None:
+        return UNKNOWN_CREDENTIALS_LIFETIME
+    seconds_remaining = getattr(credentials, '_seconds_remaining', None)
+    if seconds_remaining is None:
+        # Static access keys; only refreshable (temporary) credentials expire
+        return None
+    try:
+        return int(seconds_remaining())
+    except Exception:
+        return UNKNOWN_CREDENTIALS_LIFETIME
+
+
+def cache_control(s3_key):
+    match = IMAGE_KEY_PATTERN.match(s3_key)
+    return IMMUTABLE_CACHE_CONTROL if match and match.group('digest') else MUTABLE_CACHE_CONTROL
+
+
+class ImageDelivery:
+    """Turns stored image URLs into URLs a browser can load"""
+
+    def __init__(self, get_s3_client, mode='presigned', expiry=86400, max_entries=10000):
+        if mode not in ('presigned', 'proxy'):
+            raise ValueError("image_delivery must be 'presigned' or 'proxy'")
+        self.get_s3_client = get_s3_client
+        self.mode = mode
+        self.expiry = expiry
+        self._urls = LRUCache(max_entries=max_entries, default_ttl=expiry * 3 // 4)
+
+    @property
+    def url_lifetime(self):
+        """Seconds a URL from ``url()`` stays loadable at least, or None if it never expires"""
+        if self.mode == 'proxy':
+            return None
+        return min(MIN_URL_LIFETIME, self.expiry - self.expiry * 3 // 4)
+
+    def url(self, image_url):
+        s3_key = key_from_image_url(image_url)
+        if s3_key is None:
+            return image_url
+        if self.mode == 'proxy' and proxy_allowed(s3_key):
+            return PROXY_PREFIX + s3_key
+
+        url = self._urls.get(s3_key)
+        if url is None:
+            s3_client = self.get_s3_client()
+            if s3_client is None:
+                return image_url
+            url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': s3_key, 'ResponseCacheControl': cache_control(s3_key)},
+                ExpiresIn=self.expiry
+            )
+            ttl = self.expiry * 3 // 4
+            remaining = credentials_remaining(s3_client)
+            if remaining is not None:
+                ttl = min(ttl, remaining - self.url_lifetime)
+            if ttl > 0:
+                self._urls.set(s3_key, url, ttl)
+        return url
+
+    def stats(self):
+        return self._urls.stats()
@@ -0,0 +1,400 @@
+"""Connectivity and latency diagnostics for RDS, STS and S3
+
+Probes the database, the AWS identity and the image bucket at the same time,
+repeats every operation ``--repeat`` times and writes a JSON report:
+
+* RDS: TCP connect, TLS handshake (with --db-ssl), connect + authenticate,
+  and round trips of ``SELECT 1`` on one connection.
+* STS: TCP connect and TLS handshake to the endpoint, GetCallerIdentity.
+* S3: TCP connect and TLS handshake to the endpoint, HeadBucket, then
+  PutObject/GetObject/DeleteObject for each ``--sizes`` object size. Objects
+  go under diagnostics/<run id>/ and are deleted again.
+
+Each operation gets min/mean/p50/p99/max latency in milliseconds, ops/s and,
+for object transfers, MB/s. AWS calls reuse their connections and are not
+retried, so call latencies show the service, and connect/handshake times show
+the network path. Run it on every node before scaling decisions and compare
+the reports. Defaults come from config.py; the flags point it at local
+stand-ins (MySQL, moto or MinIO) instead.
+
+Usage:
+    python diagnostics.py --output node-a.json
+    python diagnostics.py --repeat 50 --concurrency 4 --sizes 4KB,1MB,8MB
+    python diagnostics.py --db-host 127.0.0.1 --db-user root --db-password secret \\
+        --s3-endpoint-url http://127.0.0.1:9000 --bucket hrms-bench --skip sts
+
+Exits with 1 when any probe failed.
+"""
+import argparse
+import json
+import platform
+import socket
+import ssl
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import boto3
+import pymysql
+from botocore.config import Config
+
+import config
+from benchmark import percentile
+
+PROBES = ('rds', 'sts', 's3')
+DEFAULT_SIZES = '4KB,256KB,1MB'
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(value):
+    """Bytes in a size such as ``512``, ``256KB`` or ``8MB``"""
+    text = value.strip().upper()
+    for unit in ('GB', 'MB', 'KB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def summarize(latencies, errors, duration, transferred=0):
+    """Latency percentiles (ms) and throughput of one measured operation"""
+    latencies = sorted(latencies)
+    summary = {
+        'count': len(latencies),
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:3],
+    }
+    if latencies:
+        summary.update({
+            'min': _ms(latencies[0]),
+            'mean': _ms(sum(latencies) / len(latencies)),
+            'p50': _ms(percentile(latencies, 50)),
+            'p99': _ms(percentile(latencies, 99)),
+            'max': _ms(latencies[-1]),
+            'ops_per_s': round(len(latencies) / duration, 2) if duration else None,
+        })
+        if transferred:
+            summary['mb_per_s'] = round(transferred / duration / 1024 ** 2, 2) if duration else None
+    return summary
+
+
+def measure(operation, repeat, concurrency=1):
+    """Run ``operation(i)`` for i in range(repeat) on ``concurrency`` threads
+
+    An ``operation`` that moves data returns the bytes it transferred; only
+    successful calls count towards the latency and throughput figures.
+    """
+    latencies, errors = [], []
+    transferred = [0]
+    lock = threading.Lock()
+
+    def run(i):
+        started = time.perf_counter()
+        try:
+            nbytes = operation(i)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if isinstance(nbytes, int):
+                transferred[0] += nbytes
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run, range(repeat)))
+    else:
+        for i in range(repeat):
+            run(i)
+    return summarize(latencies, errors, time.perf_counter() - started, transferred[0])
+
+
+def _failed(*summaries):
+    return any(summary and (summary['errors'] or not summary['count']) for summary in summaries)
+
+
+def endpoint_timings(host, port, use_tls, repeat, timeout):
+    """TCP connect and, for TLS endpoints, handshake times over fresh connections"""
+    context = ssl.create_default_context()
+    connects, handshakes = [], []
+    connect_errors, handshake_errors = [], []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            connect_started = time.perf_counter()
+            sock = socket.create_connection((host, port), timeout=timeout)
+            connects.append(time.perf_counter() - connect_started)
+        except OSError as e:
+            connect_errors.append(f"{type(e).__name__}: {e}")
+            continue
+        try:
+            if use_tls:
+                handshake_started = time.perf_counter()
+                sock = context.wrap_socket(sock, server_hostname=host)
+                handshakes.append(time.perf_counter() - handshake_started)
+        except OSError as e:
+            handshake_errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            sock.close()
+    duration = time.perf_counter() - started
+    return {
+        'endpoint': f"{host}:{port}",
+        'tcp_connect_ms': summarize(connects, connect_errors, duration),
+        'tls_handshake_ms': summarize(handshakes, handshake_errors, duration) if use_tls else None,
+    }
+
+
+def url_timings(url, repeat, timeout):
+    parts = urlsplit(url)
+    use_tls = parts.scheme == 'https'
+    return endpoint_timings(parts.hostname, parts.port or (443 if use_tls else 80), use_tls, repeat, timeout)
+
+
+class _TimedTLSContext(ssl.SSLContext):
+    """SSL context that records how long each handshake took (PyMySQL upgrades mid-protocol)"""
+
+    def wrap_socket(self, *args, **kwargs):
+        started = time.perf_counter()
+        wrapped = super().wrap_socket(*args, **kwargs)
+        self.handshakes.append(time.perf_counter() - started)
+        return wrapped
+
+
+# ----------------------------------------------------------------------
+# Probes; each returns its section of the report
+# ----------------------------------------------------------------------
+def probe_rds(args):
+    report = {'endpoint': f"{args.db_host}:{args.db_port}", 'database': args.db_name, 'tls': args.db_ssl}
+    report.update({key: value for key, value in
+                   endpoint_timings(args.db_host, args.db_port, False, args.repeat, args.timeout).items()
+                   if key != 'endpoint'})
+    tls_context = None
+    if args.db_ssl:
+        tls_context = _TimedTLSContext(ssl.PROTOCOL_TLS_CLIENT)
+        tls_context.load_default_certs()
+        if args.db_ssl_ca:
+            tls_context.load_verify_locations(args.db_ssl_ca)
+        tls_context.handshakes = []
+
+    def connect():
+        return pymysql.connect(host=args.db_host, port=args.db_port, user=args.db_user, password=args.db_password,
+                               database=args.db_name, connect_timeout=args.timeout, read_timeout=args.timeout,
+                               ssl=tls_context, autocommit=True)
+
+    report['connect_ms'] = measure(lambda i: connect().close(), args.repeat, args.concurrency)
+    if tls_context is not None:
+        report['tls_handshake_ms'] = summarize(tls_context.handshakes, [], 0)
+    try:
+        conn = connect()
+    except pymysql.MySQLError as e:
+        report.update(ok=False, error=str(e))
+        return report
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT VERSION()")
+        report['server_version'] = cursor.fetchone()[0]
+        cursor.execute("SHOW TABLES LIKE 'employees'")
+        report['employees_table'] = cursor.fetchone() is not None
+
+        def query(i):
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+
+        # One connection, so this is the network round trip plus a trivial statement
+        report['query_ms'] = measure(query, args.repeat)
+        cursor.close()
+    except pymysql.MySQLError as e:
+        report.update(ok=False, error=str(e))
+        return report
+    finally:
+        conn.close()
+    report['ok'] = not _failed(report['tcp_connect_ms'], report['connect_ms'], report['query_ms'])
+    return report
+
+
+def _client_config(args):
+    # No retries: a retried call would hide exactly the slowness being measured
+    return Config(connect_timeout=args.timeout, read_timeout=args.timeout,
+                  retries={'max_attempts': 1, 'mode': 'standard'},
+                  max_pool_connections=max(10, args.concurrency))
+
+
+def probe_sts(args):
+    report = {}
+    try:
+        sts = boto3.client('sts', region_name=args.region, endpoint_url=args.sts_endpoint_url,
+                           config=_client_config(args))
+        report.update(url_timings(sts.meta.endpoint_url, args.repeat, args.timeout))
+        identity = sts.get_caller_identity()
+    except Exception as e:
+        report.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return report
+    credentials = boto3.Session().get_credentials()
+    report.update({
+        'account': identity['Account'],
+        'arn': identity['Arn'],
+        'credentials_source': credentials.method if credentials else None,
+        'get_caller_identity_ms': measure(lambda i: sts.get_caller_identity(), args.repeat, args.concurrency),
+    })
+    report['ok'] = not _failed(report['tcp_connect_ms'], report['tls_handshake_ms'],
+                               report['get_caller_identity_ms'])
+    return report
+
+
+def probe_s3(args):
+    report = {'bucket': args.bucket}
+    try:
+        s3 = boto3.client('s3', region_name=args.region, endpoint_url=args.s3_endpoint_url,
+                          config=_client_config(args))
+        report.update(url_timings(s3.meta.endpoint_url, args.repeat, args.timeout))
+        s3.head_bucket(Bucket=args.bucket)
+    except Exception as e:
+        report.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return report
+    report['head_bucket_ms'] = measure(lambda i: s3.head_bucket(Bucket=args.bucket), args.repeat, args.concurrency)
+
+    prefix = f"diagnostics/{uuid.uuid4().hex}"
+    report['objects'] = {}
+    summaries = [report['tcp_connect_ms'], report['tls_handshake_ms'], report['head_bucket_ms']]
+    for label in args.sizes.split(','):
+        label = label.strip()
+        size = parse_size(label)
+        body = b'\0' * size
+        keys = [f"{prefix}/{size}/{i}" for i in range(args.repeat)]
+
+        def put(i):
+            s3.put_object(Bucket=args.bucket, Key=keys[i], Body=body)
+            return size
+
+        def get(i):
+            obj = s3.get_object(Bucket=args.bucket, Key=keys[i])
+            return len(obj['Body'].read())
+
+        def delete(i):
+            s3.delete_object(Bucket=args.bucket, Key=keys[i])
+
+        result = {'bytes': size}
+        try:
+            for name, operation in (('put', put), ('get', get), ('delete', delete)):
+                result[name] = measure(operation, args.repeat, args.concurrency)
+                summaries.append(result[name])
+        finally:
+            # Leave nothing behind when a put succeeded but its delete failed
+            if not result.get('delete') or result['delete']['errors']:
+                _remove_objects(s3, args.bucket, keys)
+        report['objects'][label] = result
+    report['ok'] = not _failed(*summaries)
+    return report
+
+
+def _remove_objects(s3, bucket, keys):
+    for start in range(0, len(keys), 1000):
+        try:
+            s3.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]],
+                                                     'Quiet': True})
+        except Exception as e:
+            print(f"⚠️ Could not delete diagnostics objects under {keys[0].rsplit('/', 1)[0]}: {e}", file=sys.stderr)
+
+
+def _run_probe(probe, args):
+    try:
+        return probe(args)
+    except Exception as e:
+        return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+
+def _headline(name, report):
+    if 'error' in report:
+        return f"❌ {name.upper()}: {report['error']}"
+    parts = [f"connect p50 {report['tcp_connect_ms'].get('p50')} ms"]
+    if report.get('tls_handshake_ms'):
+        parts.append(f"TLS p50 {report['tls_handshake_ms'].get('p50')} ms")
+    for key in ('query_ms', 'get_caller_identity_ms', 'head_bucket_ms'):
+        if key in report:
+            parts.append(f"{key[:-3].replace('_', ' ')} p50 {report[key].get('p50')} / p99 {report[key].get('p99')} ms")
+    return f"{'✅' if report['ok'] else '⚠️'} {name.upper()}: {', '.join(parts)}"
+
+
+def run_diagnostics(args):
+    """Run the selected probes in parallel and return the report"""
+    probes = {'rds': probe_rds, 'sts': probe_sts, 's3': probe_s3}
+    selected = [name for name in PROBES if name not in args.skip]
+    print(f"🔍 Probing {', '.join(name.upper() for name in selected)} in parallel "
+          f"({args.repeat} rounds, concurrency {args.concurrency})...", file=sys.stderr)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(selected) or 1) as pool:
+        futures = {name: pool.submit(_run_probe, probes[name], args) for name in selected}
+        results = {name: future.result() for name, future in futures.items()}
+    for name, result in results.items():
+        print(_headline(name, result), file=sys.stderr)
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'node': socket.gethostname(),
+        'python': platform.python_version(),
+        'region': args.region,
+        'repeat': args.repeat,
+        'concurrency': args.concurrency,
+        'duration_s': round(time.perf_counter() - started, 3),
+        'ok': all(result.get('ok') for result in results.values()),
+        **results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure connectivity and latency to RDS, STS and S3")
+    parser.add_argument('--repeat', type=int, default=20, help="measured calls per operation")
+    parser.add_argument('--concurrency', type=int, default=1, help="parallel calls per operation")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma separated S3 object sizes")
+    parser.add_argument('--timeout', type=float, default=10.0, help="connect/read timeout in seconds")
+    parser.add_argument('--skip', default='', help=f"comma separated probes to skip ({','.join(PROBES)})")
+    parser.add_argument('--db-host', default=config.host)
+    parser.add_argument('--db-port', type=int, default=getattr(config, 'db_port', 3306))
+    parser.add_argument('--db-user', default=config.user)
+    parser.add_argument('--db-password', default=config.password)
+    parser.add_argument('--db-name', default=config.db)
+    parser.add_argument('--db-ssl', action='store_true', help="connect to MySQL over TLS and time the handshake")
+    parser.add_argument('--db-ssl-ca', help="CA bundle for --db-ssl (e.g. the RDS global bundle)")
+    parser.add_argument('--region', default=config.region)
+    parser.add_argument('--bucket', default=config.bucket)
+    parser.add_argument('--s3-endpoint-url', default=getattr(config, 's3_endpoint_url', None))
+    parser.add_argument('--sts-endpoint-url', default=getattr(config, 'sts_endpoint_url', None))
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+    args.skip = {name.strip() for name in args.skip.split(',') if name.strip()}
+    unknown = args.skip - set(PROBES)
+    if unknown:
+        parser.error(f"unknown probe(s): {', '.join(sorted(unknown))}")
+    if args.repeat < 1 or args.concurrency < 1:
+        parser.error("--repeat and --concurrency must be at least 1")
+    try:
+        [parse_size(size) for size in args.sizes.split(',')]
+    except ValueError:
+        parser.error(f"invalid --sizes: {args.sizes}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_diagnostics(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"📝 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Streaming export of the employee directory as CSV, NDJSON or XLSX
+
+Rows come from an unbuffered (server-side) cursor and are encoded and flushed
+in CHUNK_SIZE pieces, so memory stays flat however many employees are
+exported. The query walks the primary key (ORDER BY emp_id), which MySQL
+streams without sorting, and the header goes out before the first row is
+read, so a download starts immediately.
+
+XLSX is written without a spreadsheet library: a minimal workbook of
+inline-string cells, zipped on the fly (zipfile can write to unseekable
+outputs). Excel stops reading a sheet at 1,048,576 rows.
+
+Usage:
+    python export.py --format csv --output employees.csv
+    python export.py --format xlsx --search-type skills --search-value "python, aws" --output python-aws.xlsx
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import pymysql
+
+import api
+import search
+import skills
+from schema import EMPLOYEE_COLUMNS, EMPLOYEE_FIELDS, UTC_SESSION
+
+CHUNK_SIZE = 65536
+# Seconds MySQL waits on a client that has stopped reading (a slow download) before dropping it
+NET_WRITE_TIMEOUT = 3600
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+SEARCH_TYPES = ('emp_id', 'emp_name', 'primary_skills', 'skills')
+
+
+def filter_clause(cursor, search_type=None, value='', match_mode=None):
+    """WHERE clause selecting what /fetchdata finds for the same search, without its result cap"""
+    if not search_type:
+        return '', ()
+    if search_type == 'emp_id':
+        return "WHERE emp_id = %s", (value,)
+    if search_type == 'skills':
+        condition, params = skills.match_clause(cursor, value, match_mode or 'all')
+    elif search_type in search.SEARCH_COLUMNS:
+        condition, params = search.match_clause(search_type, value, match_mode or 'relevance')
+    else:
+        raise ValueError("Invalid search type.")
+    return f"WHERE ({condition})", params
+
+
+class ExportCursor:
+    """Unbuffered cursor over the export query; closing it gives the session back its net_write_timeout
+
+    The connection usually goes back to a pool afterwards, and the next
+    borrower must not inherit the export's hour-long timeout.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        if self._cursor is None:
+            return
+        cursor, self._cursor = self._cursor, None
+        conn = cursor.connection
+        try:
+            cursor.close()
+            _restore_timeout(conn)
+        except Exception:
+            # A closed connection is dropped by the pool instead of being reused with the long timeout
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _restore_timeout(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SET SESSION net_write_timeout = @export_net_write_timeout")
+
+
+def open_export(conn, where='', params=(), cursorclass=pymysql.cursors.SSCursor):
+    """Run the export query on an unbuffered cursor; the caller iterates it and then closes it"""
+    cursor = conn.cursor(cursorclass)
+    try:
+        # Remember the session's value in the same round trip, for ExportCursor.close
+        cursor.execute("SET @export_net_write_timeout = @@SESSION.net_write_timeout, "
+                       "SESSION net_write_timeout = %s", (NET_WRITE_TIMEOUT,))
+        cursor.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees {where} ORDER BY emp_id", params)
+    except Exception:
+        ExportCursor(cursor).close()
+        raise
+    return ExportCursor(cursor)
+
+
+def _text(value):
+    if isinstance(value, list):
+        return ','.join(str(v) for v in value)
+    return '' if value is None else str(value)
+
+
+def _records(rows, fields):
+    for row in rows:
+        record = api.employee_dict(row, fields)
+        yield [_text(record[field]) for field in fields]
+
+
+def csv_chunks(rows, fields=EMPLOYEE_FIELDS):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # The BOM makes Excel read the file as UTF-8
+    buf.write('\ufeff')
+    writer.writerow(fields)
+    yield buf.getvalue().encode()
+    buf.seek(0)
+    buf.truncate()
+    for values in _records(rows, fields):
+        # Keep spreadsheet apps from evaluating user-entered text as a formula
+        writer.writerow(["'" + v if v[:1] in ('=', '+', '-', '@', '\t', '\r') else v for v in values])
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode()
+
+
+def ndjson_chunks(rows, fields=EMPLOYEE_FIELDS):
+    buf = []
+    # Send the first row on its own so the download starts right away
+    buffered = CHUNK_SIZE
+    for row in rows:
+        line = json.dumps(api.employee_dict(row, fields), separators=(',', ':'), default=str) + '\n'
+        buf.append(line)
+        buffered += len(line)
+        if buffered >= CHUNK_SIZE:
+            yield ''.join(buf).encode()
+            buf = []
+            buffered = 0
+    yield ''.join(buf).encode()
+
+
+class _Sink:
+    """Write-only file object that the XLSX generator empties after every chunk"""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Employees" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Control characters XML 1.0 cannot represent
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_row(values):
+    cells = ''.join(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_INVALID.sub("", v))}</t></is></c>'
+                    for v in values)
+    return f'<row>{cells}</row>'.encode()
+
+
+def xlsx_chunks(rows, fields=EMPLOYEE_FIELDS):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(fields))
+            yield sink.drain()
+            for values in _records(rows, fields):
+                sheet.write(_xlsx_row(values))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+WRITERS = {'csv': csv_chunks, 'ndjson': ndjson_chunks, 'xlsx': xlsx_chunks}
+
+
+def export_chunks(fmt, rows, fields=EMPLOYEE_FIELDS):
+    """Encoded chunks of ``rows`` (EMPLOYEE_COLUMNS tuples) in ``fmt``"""
+    return WRITERS[fmt](rows, fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the employee directory")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--output', help="output file (default: stdout)")
+    parser.add_argument('--search-type', choices=SEARCH_TYPES, help="filter like /fetchdata")
+    parser.add_argument('--search-value', default='')
+    parser.add_argument('--match-mode', help="relevance|contains for names and skill text, all|any for skills")
+    parser.add_argument('--fields', help="comma-separated columns (default: all)")
+    args = parser.parse_args()
+
+    try:
+        fields = api.parse_fields(args.fields)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.search_type and not args.search_value.strip():
+        parser.error("--search-value is required with --search-type")
+
+    import config
+    try:
+        conn = pymysql.connect(host=config.host, port=getattr(config, 'db_port', 3306), user=config.user,
+                               password=config.password, db=config.db, connect_timeout=10, autocommit=True,
+                               init_command=UTC_SESSION)
+    except pymysql.MySQLError as e:
+        print(f"❌ RDS Connection failed: {e}", file=sys.stderr)
+        return 1
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    started = time.perf_counter()
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    try:
+        with conn.cursor() as lookup:
+            where, params = filter_clause(lookup, args.search_type, args.search_value.strip(), args.match_mode)
+        cursor = open_export(conn, where, params)
+        try:
+            for chunk in export_chunks(args.format, counted(cursor), fields):
+                out.write(chunk)
+        finally:
+            cursor.close()
+    except (pymysql.MySQLError, ValueError) as e:
+        print(f"❌ Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            out.close()
+        conn.close()
+    print(f"✅ Exported {exported} employees in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Cache of rendered HTML: employee cards and whole search result pages
+
+A card only depends on its employee row, so rendered cards are keyed by the
+row itself: ``emp_id`` plus the remaining columns as the row version. A
+changed row (new image, finished upload) gets a new key, and the old card
+ages out through LRU/TTL. ``updated_at`` alone would not do, because it only
+has one-second resolution and an upload can finish within the second the
+employee was added.
+
+Search result pages are keyed by the query and the query cache's write
+generation (see cache.QueryCache), so every employee write makes all cached
+pages unreachable, in every process sharing a Redis cache backend.
+
+Rendered HTML embeds browser image URLs, and presigned ones expire, so
+entries must not outlive them (``ttl``). Both caches are in-process LRUs
+bounded by entry count; rendering is per-process CPU, so there is nothing to
+gain from sharing the HTML itself.
+"""
+from markupsafe import Markup
+
+from cache import LRUCache, NullCache
+
+
+def _hit_rate(stats):
+    lookups = stats.get('hits', 0) + stats.get('misses', 0)
+    stats['hit_rate'] = round(stats.get('hits', 0) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+class FragmentCache:
+    """Rendered employee cards and search pages; 0 entries disables either"""
+
+    def __init__(self, card_entries=20000, page_entries=500, ttl=300):
+        self.cards = LRUCache(max_entries=card_entries, default_ttl=ttl) if card_entries else NullCache()
+        self.pages = LRUCache(max_entries=page_entries, default_ttl=ttl) if page_entries else NullCache()
+
+    def card(self, kind, row, render):
+        """HTML of one ``kind`` of card for ``row``, from ``render(row)`` on a miss"""
+        key = (kind, row[0], tuple(row[1:]))
+        html = self.cards.get(key)
+        if html is None:
+            html = Markup(render(row))
+            self.cards.set(key, html)
+        return html
+
+    def page(self, key, generation, render):
+        """HTML of a whole page for ``key``, rendered by ``render()`` on a miss
+
+        Returns ``render()`` as is, uncached, when ``generation`` is None (the
+        query cache can't tell whether employees changed) or when it returns
+        None (nothing worth caching, e.g. an error page).
+        """
+        if generation is None:
+            return render()
+        key = (generation, key)
+        html = self.pages.get(key)
+        if html is None:
+            html = render()
+            if html is not None:
+                self.pages.set(key, html)
+        return html
+
+    def clear(self):
+        self.cards.clear()
+        self.pages.clear()
+
+    def card_stats(self):
+        return _hit_rate(self.cards.stats())
+
+    def page_stats(self):
+        return _hit_rate(self.pages.stats())
+
+    def stats(self):
+        return {'cards': self.card_stats(), 'pages': self.page_stats()}
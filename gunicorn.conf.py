@@ -0,0 +1,74 @@
+"""Gunicorn settings for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden with an environment variable, so the same
+file works on a laptop and on a large instance.
+
+Worker classes:
+
+* ``gthread`` (default): each worker runs GUNICORN_THREADS request threads.
+  Good for mixed traffic, and needs no extra packages.
+* ``gevent``: every request runs as a greenlet. PyMySQL and botocore are
+  pure-Python socket users, so gevent's monkey-patching makes their waits
+  on MySQL and S3 non-blocking without touching the route code. One worker
+  can then hold GUNICORN_WORKER_CONNECTIONS slow clients (large uploads,
+  slow S3) instead of one per thread. Requires ``pip install gevent``. Raise
+  db_pool_size as well, since the pool then caps concurrent DB work per
+  worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8080')}")
+
+# Requests are mostly I/O bound; CPU bound work (image resizing) runs on the upload workers
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 12)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# On SIGTERM, workers get this long to finish in-flight requests before worker_exit drains the rest
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+# Each worker must open its own DB pool, S3 client and background threads after fork
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    import config
+    if workers > 1 and getattr(config, 'cache_backend', 'memory') == 'memory':
+        print(f"⚠️  cache_backend = \"memory\" is per process: with {workers} workers, a write only invalidates "
+              f"its own worker's cache and the others serve stale lists and searches for up to cache_ttl "
+              f"(set cache_backend = \"redis\")")
+
+
+def post_worker_init(worker):
+    import app as hrms
+    if worker_class == 'gthread' and threads > hrms.db_pool.max_size:
+        print(f"⚠️  {threads} threads share a pool of {hrms.db_pool.max_size} DB connections; "
+              f"requests will queue for connections (raise db_pool_size)")
+    if worker_class == 'gthread':
+        # Uploads, exports and imports hold a thread for long; /health needs one left over
+        limits = hrms.admission_control.limits
+        held = sum(limits[name]['concurrency'] + limits[name]['queue'] for name in ('upload', 'export', 'bulk_import'))
+        if held >= threads:
+            print(f"⚠️  admission_limits let {held} long-running requests hold threads out of {threads}; "
+                  f"/health can be starved (lower their concurrency/queue or raise GUNICORN_THREADS)")
+
+
+def worker_exit(server, worker):
+    """Stop background threads and close pooled connections before the worker exits"""
+    import sys
+    hrms = sys.modules.get('app')
+    if hrms is not None:
+        hrms.shutdown()
@@ -0,0 +1,72 @@
+"""Background health probing for RDS and S3
+
+Each probe runs on its own daemon thread every ``interval`` seconds and
+writes its outcome into a shared snapshot. Request handlers only ever read
+the snapshot, so dashboards and load-balancer health checks cost nothing
+against the database or S3 no matter how often they are hit.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class HealthMonitor:
+    """Runs named probe callables on an interval and keeps their latest results
+
+    A probe returns a dict of extra fields (merged into its snapshot entry) and
+    signals failure by raising or by returning ``{'ok': False, ...}``.
+    """
+
+    def __init__(self, probes, interval=15):
+        self.probes = dict(probes)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = {name: {'ok': False, 'checked_at': None, 'latency_ms': None, 'error': 'not checked yet'}
+                          for name in self.probes}
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _run_probe(self, name):
+        started = time.perf_counter()
+        result = {'ok': True, 'error': None}
+        try:
+            result.update(self.probes[name]() or {})
+        except Exception as e:
+            result.update({'ok': False, 'error': str(e)})
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        result['checked_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock:
+            self._snapshot[name] = result
+        return result
+
+    def probe_now(self, name=None):
+        """Run one probe (or all of them) synchronously"""
+        names = [name] if name else list(self.probes)
+        return {n: self._run_probe(n) for n in names}
+
+    def _loop(self, name):
+        # First check right away so the snapshot fills in shortly after start-up
+        self._run_probe(name)
+        while not self._stop.wait(self.interval):
+            self._run_probe(name)
+
+    def start(self):
+        """Start one background thread per probe"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for name in self.probes:
+            thread = threading.Thread(target=self._loop, args=(name,), name=f"health-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    def snapshot(self):
+        """Latest result of every probe"""
+        with self._lock:
+            return {name: dict(result) for name, result in self._snapshot.items()}
@@ -0,0 +1,76 @@
+"""Idempotency keys for adding employees
+
+The add-employee form carries a random key generated when the page is
+rendered, and the browser's direct-upload flow signs the same key into its
+upload token. The key is stored with the outcome in the same transaction as
+the employee row. So a key is recorded exactly when its employee was
+committed, and a retried or double-submitted request can be answered from the
+stored outcome instead of failing on the duplicate ID.
+
+Writers insert first and only look a key up after the insert failed on a
+duplicate, so a successful add costs no extra round trip. Keys are deleted
+together with their employee, or by ``prune`` once they are older than the
+retention window; a retry that late is answered like any duplicate ID.
+"""
+import hashlib
+import json
+
+from schema import ensure_index
+
+TABLE = 'idempotency_keys'
+MAX_KEY_LENGTH = 200
+
+
+def create_idempotency_table(cursor):
+    """Create the idempotency key table (idempotent)"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            idem_key CHAR(64) PRIMARY KEY,
+            emp_id VARCHAR(20) NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_idempotency_emp (emp_id),
+            INDEX idx_idempotency_created (created_at)
+        )
+    """)
+    # Tables created by earlier versions need this added
+    ensure_index(cursor, TABLE, 'idx_idempotency_created', 'created_at')
+
+
+def clean_key(value):
+    """A client-supplied key, trimmed and bounded, or None when absent"""
+    value = (value or '').strip()[:MAX_KEY_LENGTH]
+    return value or None
+
+
+def _digest(key):
+    # Fixed width whatever the client sent
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def record(cursor, key, emp_id, result):
+    """Store the outcome of adding ``emp_id`` under ``key`` (inside the insert's transaction)"""
+    cursor.execute(f"INSERT INTO {TABLE} (idem_key, emp_id, result) VALUES (%s, %s, %s)",
+                   (_digest(key), emp_id, json.dumps(result)))
+
+
+def lookup(cursor, key):
+    """``(emp_id, result)`` stored under ``key``, or None if no request with it was committed"""
+    cursor.execute(f"SELECT emp_id, result FROM {TABLE} WHERE idem_key = %s", (_digest(key),))
+    row = cursor.fetchone()
+    return (row[0], json.loads(row[1])) if row else None
+
+
+def forget_employee(cursor, emp_id):
+    cursor.execute(f"DELETE FROM {TABLE} WHERE emp_id = %s", (emp_id,))
+
+
+def prune(cursor, max_age, batch_size=1000):
+    """Delete keys older than ``max_age`` seconds in batches; returns how many were deleted"""
+    deleted = 0
+    while True:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE created_at < NOW() - INTERVAL %s SECOND LIMIT %s",
+                       (max_age, batch_size))
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return deleted
@@ -0,0 +1,130 @@
+"""Server-side processing of employee profile images
+
+Every upload is identified from its magic bytes (never the file extension),
+checked against byte and pixel limits, re-encoded without EXIF/metadata, and
+turned into square WebP and JPEG thumbnails at fixed widths. The templates pick
+the thumbnail closest to the size they display instead of loading originals.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+import config
+
+# Magic byte signatures -> (format name, file extension)
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', ('png', '.png')),
+    (b'\xff\xd8\xff', ('jpeg', '.jpg')),
+    (b'GIF87a', ('gif', '.gif')),
+    (b'GIF89a', ('gif', '.gif')),
+]
+SNIFF_BYTES = 16
+
+MAX_IMAGE_BYTES = getattr(config, 'image_max_bytes', 5 * 1024 * 1024)
+MAX_IMAGE_PIXELS = getattr(config, 'image_max_pixels', 25_000_000)
+# Longest side of the stored "original"; anything larger is scaled down
+MAX_ORIGINAL_SIDE = 1600
+THUMBNAIL_WIDTHS = (80, 160, 320)
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Refuse decompression bombs before Pillow allocates the pixel buffer
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class ImageError(Exception):
+    """The upload is not an acceptable image"""
+
+
+def sniff_format(head):
+    """Identify an image from its first bytes; returns (format, extension)"""
+    for signature, fmt in SIGNATURES:
+        if head.startswith(signature):
+            return fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return ('webp', '.webp')
+    raise ImageError("Invalid file format. Use PNG, JPG, JPEG, GIF or WebP.")
+
+
+def sniff_upload(fileobj):
+    """Check the magic bytes of an uploaded file without consuming it"""
+    position = fileobj.tell()
+    head = fileobj.read(SNIFF_BYTES)
+    fileobj.seek(position)
+    return sniff_format(head)
+
+
+def _encode(img, fmt, **options):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def _flatten(img):
+    """RGB copy of an image, compositing any transparency onto white"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[-1])
+        return background
+    return img.convert('RGB')
+
+
+def process_image(data):
+    """Validate and normalize an image
+
+    Returns a list of ``(file_name, bytes, content_type)`` to store under the
+    employee's prefix: ``profile.jpg`` (or ``profile.png`` when the image has
+    transparency) followed by ``thumb_<width>.webp`` / ``thumb_<width>.jpg``.
+    """
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageError(f"Image is too large ({len(data) // 1024} KB). Maximum is {MAX_IMAGE_BYTES // 1024} KB.")
+    sniff_format(data[:SNIFF_BYTES])
+
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            if source.width * source.height > MAX_IMAGE_PIXELS:
+                raise ImageError(f"Image dimensions {source.width}x{source.height} are too large.")
+            source.seek(0)      # first frame of animated GIF/WebP
+            img = ImageOps.exif_transpose(source)
+            img.load()
+    except ImageError:
+        raise
+    except (Image.DecompressionBombError, OSError, ValueError) as e:
+        raise ImageError(f"Could not read image: {e}")
+
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    original = img.convert('RGBA') if has_alpha else img.convert('RGB')
+    original.thumbnail((MAX_ORIGINAL_SIDE, MAX_ORIGINAL_SIDE), Image.LANCZOS)
+
+    # Saving without exif=/icc_profile=/pnginfo= drops all metadata
+    if has_alpha:
+        outputs = [('profile.png', _encode(original, 'PNG', optimize=True), 'image/png')]
+    else:
+        outputs = [('profile.jpg', _encode(original, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True),
+                    'image/jpeg')]
+
+    flat = _flatten(original)
+    for width in THUMBNAIL_WIDTHS:
+        thumb = ImageOps.fit(flat, (width, width), Image.LANCZOS)
+        outputs.append((f'thumb_{width}.webp', _encode(thumb, 'WEBP', quality=WEBP_QUALITY, method=4), 'image/webp'))
+        outputs.append((f'thumb_{width}.jpg', _encode(thumb, 'JPEG', quality=JPEG_QUALITY, optimize=True),
+                        'image/jpeg'))
+    return outputs
+
+
+def variant_width(variants, size):
+    """Smallest stored thumbnail width that covers ``size`` CSS pixels"""
+    widths = sorted(int(w) for w in str(variants).split(',') if w.strip().isdigit())
+    if not widths:
+        return None
+    return next((w for w in widths if w >= size), widths[-1])
+
+
+def variant_url(image_url, variants, size, fmt='jpg'):
+    """URL of the thumbnail stored next to ``image_url`` that best fits ``size``"""
+    width = variant_width(variants, size)
+    if not image_url or width is None:
+        return image_url
+    return f"{image_url.rsplit('/', 1)[0]}/thumb_{width}.{fmt}"
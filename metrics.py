@@ -0,0 +1,346 @@
+"""Request-level instrumentation for the Employee Management System
+
+Times every request, SQL statement, S3 call and template render. The
+results are kept two ways:
+
+* process-wide Prometheus histograms, served as text by ``/metrics``
+* per-request totals, sent back in a ``Server-Timing`` header so browser
+  dev tools and the benchmark show where one slow request spent its time
+
+SQL statements slower than the slow-query threshold are logged with their
+literals stripped and aggregated by statement. Everything here is standard
+library only, so CLI tools such as bulk_import.py get the same timings
+through the shared cursor class and S3 client.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+
+import pymysql.cursors
+
+# Prometheus' default buckets, which suit request and query latencies alike
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request totals: {'db': [seconds, count], 's3': [...], ...}; None outside requests
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """Thread-safe labelled histogram with cumulative Prometheus buckets"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}       # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Thread-safe labelled counter"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(list(zip(self.labelnames, labelvalues)))} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+REQUEST_SECONDS = Histogram('hrms_http_request_duration_seconds', 'Time spent handling HTTP requests',
+                            ('method', 'route', 'status'))
+DB_SECONDS = Histogram('hrms_db_query_duration_seconds', 'Time spent executing SQL statements', ('operation',))
+DB_ERRORS = Counter('hrms_db_query_errors_total', 'SQL statements that raised', ('operation',))
+S3_SECONDS = Histogram('hrms_s3_call_duration_seconds', 'Time spent in S3 API calls', ('operation',))
+S3_ERRORS = Counter('hrms_s3_call_errors_total', 'S3 API calls that failed', ('operation',))
+RENDER_SECONDS = Histogram('hrms_template_render_duration_seconds', 'Time spent rendering Jinja templates',
+                           ('template',))
+SLOW_QUERIES = Counter('hrms_db_slow_queries_total', 'SQL statements slower than the slow-query threshold',
+                       ('operation',))
+ADMISSION_WAIT_SECONDS = Histogram('hrms_admission_wait_seconds', 'Time admitted requests queued for a slot',
+                                   ('route_class',))
+ADMISSION_REJECTIONS = Counter('hrms_admission_rejections_total', 'Requests turned away by admission control',
+                               ('route_class', 'reason'))
+
+_collectors = []    # callables returning extra exposition lines (pool, cache, queue gauges)
+
+
+def register_gauges(prefix, stats):
+    """Export every numeric value of ``stats()`` as ``<prefix>_<key>`` gauges"""
+    def collect():
+        lines = []
+        for key, value in sorted(stats().items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.extend([f"# TYPE {name} gauge", f"{name} {value}"])
+        return lines
+    _collectors.append(collect)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in (REQUEST_SECONDS, DB_SECONDS, DB_ERRORS, SLOW_QUERIES, S3_SECONDS, S3_ERRORS, RENDER_SECONDS,
+                   ADMISSION_WAIT_SECONDS, ADMISSION_REJECTIONS):
+        lines.extend(metric.collect())
+    for collect in _collectors:
+        try:
+            lines.extend(collect())
+        except Exception as e:
+            lines.append(f"# collector error: {_escape(e)}")
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------
+# Per-request accounting
+# ----------------------------------------------------------------------
+def start_request():
+    _request_timings.set({})
+
+
+def end_request():
+    timings = _request_timings.get()
+    _request_timings.set(None)
+    return timings or {}
+
+
+def record(component, seconds):
+    """Add ``seconds`` to the current request's total for ``component``"""
+    timings = _request_timings.get()
+    if timings is not None:
+        total = timings.setdefault(component, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+
+def server_timing(timings, total_seconds):
+    """Format per-request totals as a ``Server-Timing`` header value"""
+    entries = []
+    for component, (seconds, count) in sorted(timings.items()):
+        entries.append(f'{component};dur={seconds * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"')
+    entries.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+
+# ----------------------------------------------------------------------
+# SQL timing and the slow-query log
+# ----------------------------------------------------------------------
+SLOW_QUERY_SECONDS = 0.2
+MAX_SLOW_STATEMENTS = 200
+
+_slow_lock = threading.Lock()
+_slow_statements = {}    # normalized SQL -> {'count', 'total_ms', 'max_ms', 'last_seen'}
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+
+
+def normalize_sql(sql):
+    """Strip literals and collapse value lists so equivalent statements group together"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = ' '.join(sql.split())
+    sql = sql.replace('%s', '?')
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+def _operation(sql):
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    words = sql.split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+
+def _record_query(sql, seconds, failed):
+    operation = _operation(sql)
+    DB_SECONDS.observe(seconds, operation)
+    record('db', seconds)
+    if failed:
+        DB_ERRORS.inc(operation)
+    if seconds < SLOW_QUERY_SECONDS:
+        return
+    SLOW_QUERIES.inc(operation)
+    statement = normalize_sql(sql)
+    elapsed_ms = seconds * 1000
+    print(f"🐢 Slow query ({elapsed_ms:.0f} ms): {statement[:500]}")
+    with _slow_lock:
+        entry = _slow_statements.get(statement)
+        if entry is None:
+            if len(_slow_statements) >= MAX_SLOW_STATEMENTS:
+                # Forget the statement seen least recently
+                del _slow_statements[min(_slow_statements, key=lambda s: _slow_statements[s]['last_seen'])]
+            entry = _slow_statements[statement] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        entry['count'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['last_seen'] = time.time()
+
+
+def slow_queries(limit=50):
+    """Slowest normalized statements, worst total time first"""
+    with _slow_lock:
+        entries = [dict(entry, statement=statement) for statement, entry in _slow_statements.items()]
+    entries.sort(key=lambda e: e['total_ms'], reverse=True)
+    for entry in entries:
+        entry['avg_ms'] = round(entry['total_ms'] / entry['count'], 2)
+        entry['total_ms'] = round(entry['total_ms'], 2)
+        entry['max_ms'] = round(entry['max_ms'], 2)
+    return entries[:limit]
+
+
+class _TimedExecute:
+    """Mixin timing ``execute``/``executemany``; executemany is recorded once, not per batch"""
+
+    _in_executemany = False
+
+    def execute(self, query, args=None):
+        if self._in_executemany:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, args)
+            failed = False
+            return result
+        finally:
+            _record_query(query, time.perf_counter() - started, failed)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        failed = True
+        self._in_executemany = True
+        try:
+            result = super().executemany(query, args)
+            failed = False
+            return result
+        finally:
+            self._in_executemany = False
+            _record_query(query, time.perf_counter() - started, failed)
+
+
+class TimedCursor(_TimedExecute, pymysql.cursors.Cursor):
+    """Default cursor class for pooled connections"""
+
+
+class TimedSSCursor(_TimedExecute, pymysql.cursors.SSCursor):
+    """Unbuffered cursor; only the time to the first row is counted, not the streaming"""
+
+
+# ----------------------------------------------------------------------
+# S3 timing through botocore events
+# ----------------------------------------------------------------------
+def _s3_before_call(model, context, **kwargs):
+    context['hrms_call'] = (model.name, time.perf_counter())
+
+
+def _s3_after_call(context, http_response=None, exception=None, **kwargs):
+    # after-call-error (connection failures) carries no model, so the
+    # operation name travels in the per-call context instead
+    call = context.pop('hrms_call', None)
+    if call is None:
+        return
+    operation, started = call
+    seconds = time.perf_counter() - started
+    S3_SECONDS.observe(seconds, operation)
+    record('s3', seconds)
+    if exception is not None or (http_response is not None and http_response.status_code >= 300):
+        S3_ERRORS.inc(operation)
+
+
+def instrument_s3_client(client):
+    """Time every API call made through a boto3 S3 client"""
+    events = client.meta.events
+    events.register('before-call.s3', _s3_before_call)
+    events.register('after-call.s3', _s3_after_call)
+    events.register('after-call-error.s3', _s3_after_call)
+    return client
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+def instrument_app(app):
+    """Time requests and template renders, and add the Server-Timing header"""
+    from flask import before_render_template, g, request, template_rendered
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        start_request()
+
+    @app.after_request
+    def _stop_timer(response):
+        started = g.pop('request_started', None)
+        timings = end_request()
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, request.method, route, str(response.status_code))
+        response.headers['Server-Timing'] = server_timing(timings, elapsed)
+        return response
+
+    def _render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    def _render_finished(sender, template, context, **extra):
+        started = g.pop('render_started', None)
+        if started is not None:
+            seconds = time.perf_counter() - started
+            RENDER_SECONDS.observe(seconds, template.name or 'string')
+            record('render', seconds)
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_finished, app, weak=False)
@@ -0,0 +1,116 @@
+"""Schema migrations for the Employee Management System database
+
+Run once per deploy, before (or while) the web workers start:
+
+    python migrations.py
+    flask --app app migrate
+
+Every step is idempotent, so re-running is harmless. The applied version is
+recorded in ``schema_version``; web workers only read it to decide whether
+they are ready, and never change the schema themselves.
+"""
+import sys
+
+import pymysql
+
+import aggregates
+import changes
+import idempotency
+import search
+import skills
+from schema import UTC_SESSION, ensure_column, ensure_index
+
+# Bump whenever migrate() gains a step
+SCHEMA_VERSION = 6
+
+
+def current_version(cursor):
+    """Schema version recorded by the last migration (0 if never migrated)"""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except pymysql.err.ProgrammingError as e:
+        # 1146: table doesn't exist yet
+        if e.args and e.args[0] == 1146:
+            return 0
+        raise
+    row = cursor.fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def create_employees_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            emp_id VARCHAR(20) PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            pri_skill VARCHAR(200),
+            location VARCHAR(100),
+            image_url VARCHAR(500),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            image_status VARCHAR(16) NOT NULL DEFAULT 'ready',
+            image_variants VARCHAR(64),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            change_version BIGINT NOT NULL DEFAULT 0,
+            INDEX idx_employees_created_emp (created_at, emp_id),
+            INDEX idx_employees_change (change_version, emp_id)
+        )
+    """)
+    # Tables created by earlier versions need these added
+    ensure_index(cursor, 'employees', 'idx_employees_created_emp', 'created_at, emp_id')
+    ensure_column(cursor, 'employees', 'image_status', "VARCHAR(16) NOT NULL DEFAULT 'ready'")
+    ensure_column(cursor, 'employees', 'image_variants', "VARCHAR(64)")
+    if ensure_column(cursor, 'employees', 'updated_at',
+                     "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"):
+        cursor.execute("UPDATE employees SET updated_at = created_at")
+
+
+def migrate(cursor):
+    """Bring the schema up to SCHEMA_VERSION"""
+    version = current_version(cursor)
+    create_employees_table(cursor)
+    changes.create_change_tables(cursor)
+    search.create_search_indexes(cursor)
+    skills.create_skill_tables(cursor)
+    idempotency.create_idempotency_table(cursor)
+    if version < 3:
+        scanned = skills.backfill(cursor)
+        print(f"✅ Linked skills for {scanned} existing employees")
+    aggregates.create_aggregate_tables(cursor)
+    if 0 < version < 5:
+        aggregates.use_binary_values(cursor)
+    if version < 5 or aggregates.never_rebuilt(cursor):
+        # Seed the dashboard counts from the existing rows (per normalized skill since version 3,
+        # with byte-for-byte values since version 5)
+        aggregates.rebuild(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+    print(f"✅ Database schema is at version {SCHEMA_VERSION}")
+
+
+def main():
+    import config
+    try:
+        conn = pymysql.connect(host=config.host, port=getattr(config, 'db_port', 3306), user=config.user,
+                               password=config.password, db=config.db, connect_timeout=10, autocommit=True,
+                               init_command=UTC_SESSION)
+    except pymysql.MySQLError as e:
+        print(f"❌ RDS Connection failed: {e}")
+        return 1
+    try:
+        with conn.cursor() as cursor:
+            migrate(cursor)
+        return 0
+    except pymysql.MySQLError as e:
+        print(f"❌ Migration failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Read/write splitting over RDS read replicas
+
+Writes, and anything that must see them, use the primary pool. Read-only
+queries ask the router for a pool: the replicas take turns (round-robin),
+skipping any replica whose last health probe failed or reported a
+replication lag above ``max_lag`` seconds. When no replica qualifies, reads
+fall back to the primary, so a cluster without replicas behaves exactly as
+before.
+
+Replicas start out of rotation and join once their first probe passes. A
+replica that cannot hand out a connection is dropped straight away and
+rejoins on its next successful probe.
+
+After committing a write, the process reads from the primary for as long as
+the replicas in rotation are behind (their reported lag plus a second), see
+``note_write``. That keeps query-cache entries refilled right after a write
+from coming from a replica that hasn't applied it yet. Clients that wrote get
+their own, longer read-your-writes window from the app (a cookie).
+"""
+import itertools
+import threading
+import time
+
+import pymysql
+
+
+def replica_lag(cursor):
+    """Seconds this server's replication is behind its source
+
+    Returns None when the server reports no replication status (not a
+    replica, Aurora, or no REPLICATION CLIENT privilege). Raises when
+    replication is configured but stopped.
+    """
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.err.ProgrammingError as e:
+            # 1064: MySQL before 8.0.22 only knows the old spelling
+            if not e.args or e.args[0] != 1064:
+                raise
+            cursor.execute("SHOW SLAVE STATUS")
+    except pymysql.err.OperationalError as e:
+        # 1227: access denied for lack of REPLICATION CLIENT
+        if e.args and e.args[0] == 1227:
+            return None
+        raise
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    columns = [column[0] for column in cursor.description]
+    lags = []
+    for row in rows:
+        status = dict(zip(columns, row))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        if lag is None:
+            raise RuntimeError("Replication is not running")
+        lags.append(lag)
+    # Multi-source replicas report one row per channel
+    return max(lags)
+
+
+class ReplicaRouter:
+    """Chooses the pool a read-only query should use"""
+
+    def __init__(self, primary, replicas=(), max_lag=5, probe_timeout=2):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._state = {pool: {'in_rotation': False, 'lag_seconds': None} for pool in self.replicas}
+        self._turn = itertools.count()
+        self._last_write = None
+        self._metrics = {'primary_reads': 0, 'replica_reads': 0, 'fallbacks': 0, 'removals': 0}
+
+    @staticmethod
+    def name(pool):
+        return f"replica:{pool.host}:{pool.port}"
+
+    def _set_state(self, pool, in_rotation, lag=None):
+        with self._lock:
+            state = self._state[pool]
+            if state['in_rotation'] and not in_rotation:
+                self._metrics['removals'] += 1
+            state.update(in_rotation=in_rotation, lag_seconds=lag)
+
+    # ------------------------------------------------------------------
+    # Health
+    # ------------------------------------------------------------------
+    def check(self, pool):
+        """Probe one replica and put it in or out of rotation; result is a HealthMonitor probe dict"""
+        try:
+            with pool.connection(timeout=self.probe_timeout) as conn:
+                cursor = conn.cursor()
+                try:
+                    lag = replica_lag(cursor)
+                finally:
+                    cursor.close()
+        except Exception:
+            self._set_state(pool, False)
+            raise
+        caught_up = lag is None or lag <= self.max_lag
+        self._set_state(pool, caught_up, lag)
+        result = {'lag_seconds': lag, 'in_rotation': caught_up}
+        if not caught_up:
+            result.update(ok=False, error=f"Replication lag {lag}s exceeds {self.max_lag}s")
+        return result
+
+    def probes(self):
+        """HealthMonitor probes, one per replica"""
+        return {self.name(pool): (lambda pool=pool: self.check(pool)) for pool in self.replicas}
+
+    def mark_failed(self, pool, error):
+        """Take a replica out of rotation until its next successful probe"""
+        print(f"⚠️ {self.name(pool)} taken out of rotation: {error}")
+        self._set_state(pool, False)
+        with self._lock:
+            self._metrics['fallbacks'] += 1
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    def note_write(self):
+        """Call after committing a write; reads go to the primary until replicas have had time to apply it"""
+        self._last_write = time.monotonic()
+
+    def read_pool(self):
+        """Pool for the next read-only query"""
+        last_write = self._last_write
+        with self._lock:
+            healthy = [pool for pool in self.replicas if self._state[pool]['in_rotation']]
+            # Seconds_Behind_Source is truncated to whole seconds, hence the extra one
+            catch_up = max((self._state[pool]['lag_seconds'] or 0 for pool in healthy), default=0) + 1
+            recently_written = last_write is not None and time.monotonic() - last_write < catch_up
+            if not healthy or recently_written:
+                self._metrics['primary_reads'] += 1
+                return self.primary
+            self._metrics['replica_reads'] += 1
+        return healthy[next(self._turn) % len(healthy)]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            lags = [state['lag_seconds'] for state in self._state.values()
+                    if state['in_rotation'] and state['lag_seconds'] is not None]
+            stats.update({
+                'replicas': len(self.replicas),
+                'in_rotation': sum(1 for state in self._state.values() if state['in_rotation']),
+                'lag_max_seconds': max(lags) if lags else 0,
+            })
+        return stats
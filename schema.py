@@ -0,0 +1,52 @@
+"""Shared schema helpers for the employees table"""
+import re
+
+# Column order the templates index into (data[0] = emp_id ... data[9] = updated_at)
+EMPLOYEE_COLUMNS = ("emp_id, first_name, last_name, pri_skill, location, image_url, created_at, "
+                    "image_status, image_variants, updated_at")
+EMPLOYEE_FIELDS = tuple(column.strip() for column in EMPLOYEE_COLUMNS.split(','))
+
+# Sessions read TIMESTAMPs in UTC, which is how the API labels them, and
+# DATE_FORMAT() months agree whatever the server's default time zone is
+UTC_SESSION = "SET time_zone = '+00:00'"
+
+
+def index_exists(cursor, table, index_name):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, index_name)
+    )
+    return cursor.fetchone() is not None
+
+
+def ensure_index(cursor, table, index_name, columns, kind='INDEX', options=''):
+    """Add an index to an existing table unless it is already there"""
+    if index_exists(cursor, table, index_name):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD {kind} {index_name} ({columns}) {options}".rstrip())
+    print(f"✅ Added {kind.lower()} {index_name} on {table}({columns})")
+    return True
+
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+
+def ensure_column(cursor, table, column, definition):
+    """Add a column to an existing table unless it is already there"""
+    if column_exists(cursor, table, column):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    print(f"✅ Added column {table}.{column}")
+    return True
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so ``value`` matches literally"""
+    return re.sub(r'([\\%_])', r'\\\1', value)
@@ -0,0 +1,148 @@
+"""Employee name and skill search backed by MySQL FULLTEXT (ngram) indexes
+
+The ngram parser splits every value into overlapping 2-character tokens, so a
+quoted boolean-mode phrase behaves like the old ``LIKE '%value%'`` substring
+match but is answered from the inverted index instead of a table scan. Values
+too short to tokenize, servers without the indexes, and callers that ask for
+``contains`` matching fall back to the original LIKE queries.
+"""
+import pymysql
+
+import skills
+from schema import EMPLOYEE_COLUMNS, ensure_index, escape_like, index_exists
+
+# Must match the server's ngram_token_size (MySQL default is 2)
+NGRAM_TOKEN_SIZE = 2
+MAX_RESULTS = 200
+AUTOCOMPLETE_LIMIT = 10
+
+# FULLTEXT indexes: name -> indexed columns
+FULLTEXT_INDEXES = {
+    'ft_employees_name': 'first_name, last_name',
+    'ft_employees_skill': 'pri_skill',
+}
+
+# B-tree indexes that make prefix LIKE lookups (autocomplete) range scans
+PREFIX_INDEXES = {
+    'idx_employees_first_name': 'first_name',
+    'idx_employees_last_name': 'last_name',
+    'idx_employees_pri_skill': 'pri_skill',
+}
+
+SEARCH_COLUMNS = {
+    'emp_name': 'first_name, last_name',
+    'primary_skills': 'pri_skill',
+}
+
+# Set by create_search_indexes(); False means every search uses LIKE
+fulltext_enabled = False
+
+
+def create_search_indexes(cursor):
+    """Create the FULLTEXT and prefix indexes used by search, if missing"""
+    global fulltext_enabled
+
+    for index_name, columns in PREFIX_INDEXES.items():
+        ensure_index(cursor, 'employees', index_name, columns)
+
+    try:
+        # Stopwords would drop common ngrams like "an" and "in" from the index
+        cursor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+        for index_name, columns in FULLTEXT_INDEXES.items():
+            ensure_index(cursor, 'employees', index_name, columns,
+                         kind='FULLTEXT INDEX', options='WITH PARSER ngram')
+        fulltext_enabled = True
+    except pymysql.MySQLError as e:
+        fulltext_enabled = False
+        print(f"⚠️  FULLTEXT search unavailable, falling back to LIKE: {e}")
+    return fulltext_enabled
+
+
+def detect_search_indexes(cursor):
+    """Enable FULLTEXT search if a migration has already created the indexes"""
+    global fulltext_enabled
+    fulltext_enabled = all(index_exists(cursor, 'employees', name) for name in FULLTEXT_INDEXES)
+    return fulltext_enabled
+
+
+def _boolean_query(value):
+    """Require every whitespace-separated term as a phrase: +"term1" +"term2" """
+    terms = [t.replace('"', '') for t in value.split()]
+    return ' '.join(f'+"{t}"' for t in terms if t)
+
+
+def _use_fulltext(value):
+    terms = [t.replace('"', '') for t in value.split()]
+    return fulltext_enabled and bool(terms) and all(len(t) >= NGRAM_TOKEN_SIZE for t in terms)
+
+
+def match_clause(search_type, value, match_mode='relevance'):
+    """WHERE condition and parameters for a search, without ranking or a result limit"""
+    if search_type not in SEARCH_COLUMNS:
+        raise ValueError("Invalid search type.")
+    if match_mode != 'contains' and _use_fulltext(value):
+        return f"MATCH({SEARCH_COLUMNS[search_type]}) AGAINST (%s IN BOOLEAN MODE)", (_boolean_query(value),)
+    pattern = f"%{value}%"
+    if search_type == 'emp_name':
+        return "first_name LIKE %s OR last_name LIKE %s", (pattern, pattern)
+    return "pri_skill LIKE %s", (pattern,)
+
+
+def like_search(cursor, search_type, value):
+    """Original substring search with LIKE '%value%' - always a table scan"""
+    condition, params = match_clause(search_type, value, 'contains')
+    cursor.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE {condition}", params)
+    return cursor.fetchall()
+
+
+def fulltext_search(cursor, search_type, value, limit=MAX_RESULTS):
+    """Relevance-ranked search answered from the ngram FULLTEXT index"""
+    columns = SEARCH_COLUMNS[search_type]
+    query = _boolean_query(value)
+    cursor.execute(
+        f"SELECT {EMPLOYEE_COLUMNS}, MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) AS score "
+        f"FROM employees WHERE MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) "
+        "ORDER BY score DESC, emp_id LIMIT %s",
+        (query, query, limit)
+    )
+    return cursor.fetchall()
+
+
+def search_employees(cursor, search_type, value, match_mode='relevance'):
+    """Search by name or skill, using the FULLTEXT index whenever it can answer"""
+    global fulltext_enabled
+
+    if search_type not in SEARCH_COLUMNS:
+        raise ValueError("Invalid search type.")
+
+    if match_mode == 'contains' or not _use_fulltext(value):
+        return like_search(cursor, search_type, value)
+
+    try:
+        return fulltext_search(cursor, search_type, value)
+    except pymysql.err.MySQLError as e:
+        # 1191: the FULLTEXT index is gone (e.g. restored from an older dump)
+        if e.args and e.args[0] == 1191:
+            fulltext_enabled = False
+            print("⚠️  FULLTEXT index missing, falling back to LIKE search")
+            return like_search(cursor, search_type, value)
+        raise
+
+
+def autocomplete(cursor, field, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """Distinct names or skills starting with ``prefix``, via index range scans"""
+    pattern = escape_like(prefix) + '%'
+    if field == 'name':
+        cursor.execute(
+            "(SELECT first_name AS value FROM employees WHERE first_name LIKE %s ORDER BY first_name LIMIT %s) "
+            "UNION "
+            "(SELECT last_name AS value FROM employees WHERE last_name LIKE %s ORDER BY last_name LIMIT %s) "
+            "ORDER BY value LIMIT %s",
+            (pattern, limit, pattern, limit, limit)
+        )
+    elif field == 'skill':
+        # Individual skills, not whole pri_skill lists
+        return skills.suggest(cursor, prefix, limit)
+    else:
+        raise ValueError("Invalid autocomplete field.")
+    return [row[0] for row in cursor.fetchall()]
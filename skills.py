@@ -0,0 +1,148 @@
+"""Normalized employee skills
+
+``pri_skill`` stays the free text the user typed. Each comma-separated entry
+is also normalized (whitespace collapsed, lower-cased) into ``skills``, with
+one ``employee_skills`` row per (employee, skill). Exact skill queries then
+become range lookups on ``idx_employee_skills_skill`` instead of
+``LIKE '%x%'`` scans, so "python" no longer matches "micropython".
+"""
+import re
+
+from schema import EMPLOYEE_COLUMNS, escape_like
+
+SKILLS_TABLE = 'skills'
+LINK_TABLE = 'employee_skills'
+MAX_SKILL_LENGTH = 100
+MAX_RESULTS = 200
+SUGGEST_LIMIT = 10
+
+# "/" is left alone so CI/CD and TCP/IP stay single skills
+SKILL_SEPARATORS = re.compile(r'[,;|\n]+')
+
+
+def create_skill_tables(cursor):
+    """Create the skills and employee_skills tables (idempotent)"""
+    # Binary collation: names are already lower-cased, and accents must not collide on the unique key
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKILLS_TABLE} (
+            skill_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR({MAX_SKILL_LENGTH}) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            UNIQUE KEY uq_skills_name (name)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LINK_TABLE} (
+            emp_id VARCHAR(20) NOT NULL,
+            skill_id INT NOT NULL,
+            PRIMARY KEY (emp_id, skill_id),
+            INDEX idx_employee_skills_skill (skill_id, emp_id)
+        )
+    """)
+
+
+def parse_skills(pri_skill):
+    """Normalized, de-duplicated skill names from a free-text skill list"""
+    names = []
+    for part in SKILL_SEPARATORS.split(pri_skill or ''):
+        name = ' '.join(part.split()).lower()[:MAX_SKILL_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def skill_ids(cursor, names, create=False):
+    """Map skill names to their ids, optionally creating the missing ones"""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    if create:
+        cursor.executemany(f"INSERT IGNORE INTO {SKILLS_TABLE} (name) VALUES (%s)", [(name,) for name in names])
+    placeholders = ', '.join(['%s'] * len(names))
+    cursor.execute(f"SELECT skill_id, name FROM {SKILLS_TABLE} WHERE name IN ({placeholders})", names)
+    return {name: skill_id for skill_id, name in cursor.fetchall()}
+
+
+def link_skills(cursor, employees):
+    """Record the skills of employees given as ``(emp_id, pri_skill)`` pairs (inside the insert's transaction)"""
+    parsed = [(emp_id, parse_skills(pri_skill)) for emp_id, pri_skill in employees]
+    ids = skill_ids(cursor, [name for _, names in parsed for name in names], create=True)
+    links = [(emp_id, ids[name]) for emp_id, names in parsed for name in names]
+    if links:
+        cursor.executemany(f"INSERT IGNORE INTO {LINK_TABLE} (emp_id, skill_id) VALUES (%s, %s)", links)
+
+
+def unlink_skills(cursor, emp_id):
+    cursor.execute(f"DELETE FROM {LINK_TABLE} WHERE emp_id = %s", (emp_id,))
+
+
+def backfill(cursor, batch_size=1000):
+    """Link the skills of every existing employee (idempotent); returns how many were scanned"""
+    last_emp_id = ''
+    scanned = 0
+    while True:
+        cursor.execute("SELECT emp_id, pri_skill FROM employees WHERE emp_id > %s ORDER BY emp_id LIMIT %s",
+                       (last_emp_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return scanned
+        link_skills(cursor, rows)
+        scanned += len(rows)
+        last_emp_id = rows[-1][0]
+
+
+def _matching_ids(cursor, value, match):
+    """Skill ids to look up for ``value``, or None when no employee can match"""
+    if match not in ('all', 'any'):
+        raise ValueError("match must be 'all' or 'any'")
+    names = parse_skills(value)
+    ids = skill_ids(cursor, names)
+    if not ids or (match == 'all' and len(ids) < len(names)):
+        return None
+    return list(ids.values())
+
+
+def _matching_emp_ids(ids, match):
+    placeholders = ', '.join(['%s'] * len(ids))
+    having = f"HAVING COUNT(*) = {len(ids)}" if match == 'all' else ''
+    return f"SELECT emp_id FROM {LINK_TABLE} WHERE skill_id IN ({placeholders}) GROUP BY emp_id {having}"
+
+
+def employees_with_skills(cursor, value, match='all', limit=MAX_RESULTS):
+    """Employees having all (or any) of the comma-separated skills in ``value``"""
+    ids = _matching_ids(cursor, value, match)
+    if ids is None:
+        return []
+    cursor.execute(
+        f"SELECT {EMPLOYEE_COLUMNS} FROM ({_matching_emp_ids(ids, match)}) matched "
+        "JOIN employees USING (emp_id) ORDER BY emp_id LIMIT %s",
+        (*ids, limit)
+    )
+    return cursor.fetchall()
+
+
+def match_clause(cursor, value, match='all'):
+    """WHERE condition and parameters selecting the same employees as employees_with_skills, without a limit"""
+    ids = _matching_ids(cursor, value, match)
+    if ids is None:
+        return "FALSE", ()
+    return f"emp_id IN ({_matching_emp_ids(ids, match)})", tuple(ids)
+
+
+def skill_counts(cursor, prefix='', limit=50):
+    """Skills starting with ``prefix`` (alphabetically) and how many employees have each"""
+    cursor.execute(
+        f"SELECT s.name, COUNT(es.emp_id) FROM ("
+        f"SELECT skill_id, name FROM {SKILLS_TABLE} WHERE name LIKE %s ORDER BY name LIMIT %s"
+        f") s LEFT JOIN {LINK_TABLE} es ON es.skill_id = s.skill_id GROUP BY s.skill_id, s.name ORDER BY s.name",
+        (escape_like(' '.join(prefix.split()).lower()) + '%', limit)
+    )
+    return [{'skill': name, 'headcount': headcount} for name, headcount in cursor.fetchall()]
+
+
+def suggest(cursor, prefix, limit=SUGGEST_LIMIT):
+    """Skill names starting with ``prefix``, via the unique index"""
+    cursor.execute(
+        f"SELECT name FROM {SKILLS_TABLE} WHERE name LIKE %s ORDER BY name LIMIT %s",
+        (escape_like(' '.join(prefix.split()).lower()) + '%', limit)
+    )
+    return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,92 @@
+// Send the image straight to S3 with a presigned form so it never passes
+// through the web server; on any error fall back to the normal POST.
+(function () {
+    var form = document.getElementById('add-employee-form');
+    var status = document.getElementById('upload-status');
+    var button = form.querySelector('button[type="submit"]');
+    if (!window.fetch || !window.FormData) {
+        return;
+    }
+
+    function postJSON(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(body)
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (!response.ok) {
+                    var error = new Error(data.error || 'Request failed');
+                    error.fatal = response.status === 400 || response.status === 409;
+                    throw error;
+                }
+                return data;
+            });
+        });
+    }
+
+    function showStatus(message, color) {
+        status.style.display = 'block';
+        status.style.color = color || '#232F3E';
+        status.textContent = message;
+    }
+
+    form.addEventListener('submit', function (event) {
+        var file = form.emp_image_file.files[0];
+        if (!file) {
+            return;
+        }
+        event.preventDefault();
+        if (button.disabled) {
+            return;
+        }
+        button.disabled = true;
+        showStatus('⏳ Uploading profile image to S3...');
+
+        var upload;
+        postJSON('/api/uploads/presign', {
+            emp_id: form.emp_id.value,
+            first_name: form.first_name.value,
+            last_name: form.last_name.value,
+            pri_skill: form.pri_skill.value,
+            location: form.location.value,
+            content_type: file.type,
+            content_length: file.size,
+            idempotency_key: form.idempotency_key.value
+        }).then(function (data) {
+            if (data.replayed) {
+                return data;
+            }
+            upload = data;
+            var body = new FormData();
+            Object.keys(data.upload.fields).forEach(function (name) {
+                body.append(name, data.upload.fields[name]);
+            });
+            body.append('file', file);   // S3 ignores fields after the file
+            return fetch(data.upload.url, {method: 'POST', body: body});
+        }).then(function (response) {
+            if (response.replayed) {
+                return response;
+            }
+            if (!response.ok) {
+                throw new Error('S3 rejected the upload (' + response.status + ')');
+            }
+            return postJSON('/api/uploads/confirm', {upload_token: upload.upload_token});
+        }).then(function (data) {
+            form.reset();
+            // The next employee entered on this page is a new request
+            form.idempotency_key.value = Date.now().toString(36) + Math.random().toString(36).slice(2);
+            button.disabled = false;
+            showStatus('✅ Employee ' + data.name + ' (ID: ' + data.emp_id +
+                       ') added! The profile image is being processed.', 'green');
+        }).catch(function (error) {
+            if (error.fatal) {
+                button.disabled = false;
+                showStatus('❌ ' + error.message, 'red');
+                return;
+            }
+            showStatus('⏳ Direct upload unavailable, sending through the server...');
+            form.submit();
+        });
+    });
+})();
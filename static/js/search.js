@@ -0,0 +1,36 @@
+// Suggest matching names/skills as the user types
+const searchType = document.getElementById('search_type');
+const searchValue = document.getElementById('search_value');
+const suggestions = document.getElementById('search_suggestions');
+const skillMatchOptions = document.getElementById('skill_match_options');
+let pending = null;
+
+searchType.addEventListener('change', function () {
+    skillMatchOptions.style.display = searchType.value === 'skills' ? 'inline' : 'none';
+});
+
+searchValue.addEventListener('input', function () {
+    const field = { emp_name: 'name', primary_skills: 'skill', skills: 'skill' }[searchType.value];
+    // Complete the last skill of a comma-separated list, keeping the ones before it
+    const parts = searchType.value === 'skills' ? searchValue.value.split(',') : [searchValue.value];
+    const prefix = parts.pop().trim();
+    const head = parts.length ? parts.join(',') + ', ' : '';
+    clearTimeout(pending);
+    if (!field || prefix.length < 2) {
+        suggestions.innerHTML = '';
+        return;
+    }
+    pending = setTimeout(function () {
+        fetch('/api/autocomplete?field=' + field + '&q=' + encodeURIComponent(prefix))
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                suggestions.innerHTML = '';
+                (data.suggestions || []).forEach(function (value) {
+                    const option = document.createElement('option');
+                    option.value = head + value;
+                    suggestions.appendChild(option);
+                });
+            })
+            .catch(function () {});
+    }, 150);
+});
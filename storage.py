@@ -0,0 +1,195 @@
+"""S3 storage for employee profile images
+
+Objects are private. Each processed image is stored under a prefix named
+after a hash of its content, e.g. ``employees/1001/3f2a9c0d5e6b7a81/``, so a
+new picture always gets new keys. That makes every stored object immutable,
+and it is uploaded with a one-year ``Cache-Control``. See delivery.py for how
+browsers reach them.
+"""
+import hashlib
+import re
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+import config
+import metrics
+from config import bucket, region
+from images import SNIFF_BYTES, THUMBNAIL_WIDTHS, ImageError, process_image, sniff_format
+
+# Content types a browser may upload directly, and the extension each is stored with
+DIRECT_UPLOAD_TYPES = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+
+def create_s3_client():
+    """S3 client for the configured region (or a local S3 stand-in via s3_endpoint_url)"""
+    client = boto3.client('s3', region_name=region, endpoint_url=getattr(config, 's3_endpoint_url', None))
+    return metrics.instrument_s3_client(client)
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CONTENT_HASH_LENGTH = 16
+
+# Processed images (originals and thumbnails), with or without a content-hash prefix
+IMAGE_KEY_PATTERN = re.compile(
+    r'^employees/[^/]+/(?:(?P<digest>[0-9a-f]{%d})/)?(?:profile\.(?:jpg|png)|thumb_\d+\.(?:webp|jpg))$'
+    % CONTENT_HASH_LENGTH
+)
+
+
+def public_url(s3_key):
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{s3_key}"
+
+
+def key_from_image_url(image_url):
+    """Object key behind a stored image URL (s3:// or a legacy public URL), or None if not in our bucket"""
+    if not image_url:
+        return None
+    public_prefix = public_url('')
+    if image_url.startswith(public_prefix):
+        return image_url[len(public_prefix):]
+    return key_from_s3_uri(image_url)
+
+
+def upload_employee_image(s3_client, fileobj, emp_id):
+    """Normalize an employee image, upload it with its thumbnails, return (url, variants)
+
+    ``variants`` is the comma-separated list of thumbnail widths stored next to
+    the original, as kept in ``employees.image_variants``.
+    """
+    stored = []
+    try:
+        outputs = process_image(fileobj.read())
+        
+        # All variants live under the employee's prefix, in a folder named after the picture's content
+        digest = hashlib.sha256(outputs[0][1]).hexdigest()[:CONTENT_HASH_LENGTH]
+        prefix = f"employees/{emp_id}/{digest}/"
+        for name, body, content_type in outputs:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=prefix + name,
+                Body=body,
+                ContentType=content_type,
+                CacheControl=IMMUTABLE_CACHE_CONTROL
+            )
+            stored.append(prefix + name)
+        
+        return s3_uri(prefix + outputs[0][0]), ','.join(str(w) for w in THUMBNAIL_WIDTHS)
+        
+    except ImageError:
+        raise
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code == 'AccessDenied':
+            raise Exception(f"Access denied to S3 bucket. Please fix permissions.")
+        elif error_code == 'InvalidAccessKeyId':
+            raise Exception(f"AWS Access Key ID is invalid. Please check your credentials.")
+        else:
+            raise Exception(f"AWS S3 Error: {e}")
+    except Exception as e:
+        raise Exception(f"Upload Error: {e}")
+    finally:
+        # Don't leave half an image set behind when one of the puts failed
+        if stored and len(stored) < len(outputs):
+            delete_objects(s3_client, stored)
+
+
+def s3_uri(s3_key):
+    return f"s3://{bucket}/{s3_key}"
+
+
+def key_from_s3_uri(uri):
+    """Object key of an s3:// URI in the configured bucket, or None for anything else"""
+    prefix = f"s3://{bucket}/"
+    return uri[len(prefix):] if uri.startswith(prefix) else None
+
+
+def presign_employee_upload(s3_client, emp_id, content_type, max_bytes, expires_in=300):
+    """Presigned POST that lets a browser upload one bounded-size image straight to S3
+
+    Returns ``(s3_key, {'url': ..., 'fields': {...}})``. S3 itself rejects
+    uploads with a different key, content type, or size outside 1..max_bytes.
+    """
+    extension = DIRECT_UPLOAD_TYPES.get(content_type)
+    if not extension:
+        raise ImageError("Invalid file format. Use PNG, JPG, JPEG, GIF or WebP.")
+    
+    # A fresh key per upload so two attempts for the same ID never overwrite each other
+    s3_key = f"employees/{emp_id}/profile-upload-{uuid.uuid4().hex}{extension}"
+    post = s3_client.generate_presigned_post(
+        Bucket=bucket,
+        Key=s3_key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, max_bytes],
+        ],
+        ExpiresIn=expires_in
+    )
+    return s3_key, post
+
+
+def verify_direct_upload(s3_client, s3_key, content_type, max_bytes):
+    """Check a browser upload landed with the promised type and size; returns its size"""
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=s3_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            raise ImageError("The image has not been uploaded yet.")
+        raise
+    if head['ContentLength'] > max_bytes:
+        raise ImageError(f"Image is too large. Maximum is {max_bytes // 1024} KB.")
+    if head.get('ContentType') != content_type:
+        raise ImageError("Uploaded image type does not match the requested type.")
+    
+    # Only the first bytes are needed to confirm it really is an image
+    head_bytes = s3_client.get_object(
+        Bucket=bucket, Key=s3_key, Range=f"bytes=0-{SNIFF_BYTES - 1}"
+    )['Body'].read()
+    sniff_format(head_bytes)
+    return head['ContentLength']
+
+
+def read_object(s3_client, s3_key, max_bytes):
+    """Download an object into memory, refusing anything above max_bytes"""
+    body = s3_client.get_object(Bucket=bucket, Key=s3_key)['Body']
+    data = body.read(max_bytes + 1)
+    body.close()
+    if len(data) > max_bytes:
+        raise ImageError(f"Image is too large. Maximum is {max_bytes // 1024} KB.")
+    return data
+
+
+def delete_object(s3_client, s3_key):
+    s3_client.delete_object(Bucket=bucket, Key=s3_key)
+
+
+def delete_objects(s3_client, s3_keys):
+    """Best-effort removal of several objects in one request; returns the keys that could not be deleted"""
+    try:
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in s3_keys], 'Quiet': True}
+        )
+    except Exception as e:
+        print(f"⚠️ Could not delete {len(s3_keys)} S3 objects: {e}")
+        return list(s3_keys)
+    failed = [error['Key'] for error in response.get('Errors', [])]
+    if failed:
+        print(f"⚠️ Could not delete S3 objects: {', '.join(failed)}")
+    return failed
+
+
+def image_keys(image_url, variants):
+    """Object keys of a stored image and all its thumbnails"""
+    s3_key = key_from_image_url(image_url)
+    if s3_key is None:
+        return []
+    prefix = s3_key.rsplit('/', 1)[0]
+    widths = [w for w in str(variants or '').split(',') if w.strip().isdigit()]
+    return [s3_key] + [f"{prefix}/thumb_{w.strip()}.{fmt}" for w in widths for fmt in ('webp', 'jpg')]
@@ -0,0 +1,14 @@
+"""Make the top-level modules importable, with config.py.example standing in for a missing config.py"""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if importlib.util.find_spec('config') is None:
+    spec = importlib.util.spec_from_loader('config', loader=None)
+    config = importlib.util.module_from_spec(spec)
+    with open(os.path.join(ROOT, 'config.py.example'), encoding='utf-8') as f:
+        exec(compile(f.read(), 'config.py.example', 'exec'), config.__dict__)
+    sys.modules['config'] = config
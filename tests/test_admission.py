@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionControl, ConcurrencyLimiter, MemoryBucketStore, Rejected
+
+
+def test_bucket_allows_burst_then_reports_next_token(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    store = MemoryBucketStore()
+    assert store.take('c', rate=2, burst=2)[0]
+    assert store.take('c', rate=2, burst=2)[0]
+    allowed, retry_after = store.take('c', rate=2, burst=2)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+    now[0] += 0.5
+    assert store.take('c', rate=2, burst=2)[0]
+
+
+def test_bucket_keys_are_independent_and_bounded():
+    store = MemoryBucketStore(max_clients=2)
+    for key in ('a', 'b', 'c'):
+        assert store.take(key, rate=0.001, burst=1)[0]
+    assert store.stats()['clients'] == 2
+    assert not store.take('c', rate=0.001, burst=1)[0]
+    # 'a' was forgotten, so it starts over with a full bucket
+    assert store.take('a', rate=0.001, burst=1)[0]
+
+
+def test_limiter_rejects_when_queue_is_full():
+    limiter = ConcurrencyLimiter(1, queue_size=0)
+    assert limiter.acquire() == 0.0
+    with pytest.raises(Rejected) as e:
+        limiter.acquire()
+    assert (e.value.status, e.value.reason) == (503, 'queue_full')
+    limiter.release()
+    limiter.acquire()
+    assert limiter.stats()['rejected_queue_full'] == 1
+
+
+def test_limiter_times_out_queued_request():
+    limiter = ConcurrencyLimiter(1, queue_size=1, max_wait=0.05)
+    limiter.acquire()
+    with pytest.raises(Rejected) as e:
+        limiter.acquire()
+    assert e.value.reason == 'timeout'
+    assert limiter.stats()['queue_depth'] == 0
+
+
+def test_limiter_hands_slot_to_waiter():
+    limiter = ConcurrencyLimiter(1, queue_size=1, max_wait=5)
+    limiter.acquire()
+    timer = threading.Timer(0.05, limiter.release)
+    timer.start()
+    started = time.monotonic()
+    waited = limiter.acquire()
+    timer.join()
+    assert waited > 0
+    assert time.monotonic() - started < 5
+    assert limiter.stats()['active'] == 1
+
+
+def test_slot_release_is_idempotent():
+    control = AdmissionControl({'upload': {'concurrency': 1, 'queue': 0, 'rate': 0}})
+    slot = control.admit('upload', 'client')
+    slot.release()
+    slot.release()
+    assert control.class_stats('upload')['active'] == 0
+
+
+def test_limits_merge_over_pool_sized_defaults():
+    control = AdmissionControl({'list': {'queue': 3}}, pool_size=6)
+    assert control.limits['list']['concurrency'] == 6
+    assert control.limits['list']['queue'] == 3
+    assert control.limits['search']['queue'] == 24
+    assert control.limits['upload']['concurrency'] == 2
+
+
+def test_admit_rate_limits_per_client():
+    control = AdmissionControl({'export': {'rate': 0.001, 'burst': 1, 'concurrency': 5}})
+    control.admit('export', 'a').release()
+    with pytest.raises(Rejected) as e:
+        control.admit('export', 'a')
+    assert e.value.status == 429
+    assert e.value.retry_after >= 1
+    control.admit('export', 'b').release()
+    assert control.class_stats('export')['rejected_rate_limited'] == 1
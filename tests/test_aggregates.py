@@ -0,0 +1,23 @@
+import aggregates
+
+
+class CountsCursor:
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return ('2024-03',)
+
+    def executemany(self, sql, rows):
+        self.rows.extend(rows)
+
+
+def test_locations_are_trimmed_like_the_rebuild():
+    cursor = CountsCursor()
+    aggregates.record_inserts(cursor, [('  London ', None), ('\tLondon', None)])
+    aggregates.record_delete(cursor, 'London  ', None, '2024-03')
+    locations = [(value, delta) for dimension, value, delta in cursor.rows if dimension == 'location']
+    assert locations == [('\tLondon', 1), ('London', 1), ('London', -1)]
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+import api
+from schema import EMPLOYEE_FIELDS
+
+
+def row(**values):
+    record = dict.fromkeys(EMPLOYEE_FIELDS)
+    record.update(values)
+    return tuple(record[field] for field in EMPLOYEE_FIELDS)
+
+
+def test_parse_fields_defaults_to_every_column():
+    assert api.parse_fields('') == EMPLOYEE_FIELDS
+    assert api.parse_fields(None) == EMPLOYEE_FIELDS
+
+
+def test_parse_fields_keeps_order_and_drops_duplicates():
+    assert api.parse_fields(' last_name,emp_id,,last_name ') == ('last_name', 'emp_id')
+
+
+def test_parse_fields_rejects_unknown_columns():
+    with pytest.raises(ValueError, match='salary'):
+        api.parse_fields('emp_id,salary')
+
+
+def test_employee_dict_projects_and_converts():
+    employee = row(emp_id='7', first_name='Ada', created_at=datetime(2024, 3, 1, 12, 0),
+                   image_variants='160,480,,x')
+    assert api.employee_dict(employee, ('emp_id', 'created_at', 'image_variants')) == {
+        'emp_id': '7',
+        'created_at': '2024-03-01T12:00:00+00:00',
+        'image_variants': [160, 480],
+    }
+
+
+def test_employee_dict_without_variants():
+    assert api.employee_dict(row(emp_id='7'), ('image_variants', 'created_at')) == {
+        'image_variants': [],
+        'created_at': None,
+    }
+
+
+@pytest.fixture
+def flask_app():
+    return Flask(__name__)
+
+
+def test_json_response_answers_matching_etag_with_304(flask_app):
+    with flask_app.test_request_context('/'):
+        first = api.json_response({'employees': []})
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert first.status_code == 200
+
+    with flask_app.test_request_context('/', headers={'If-None-Match': etag}):
+        cached = api.json_response({'employees': []})
+    assert cached.status_code == 304
+
+    with flask_app.test_request_context('/', headers={'If-None-Match': etag}):
+        changed = api.json_response({'employees': [{'emp_id': '7'}]})
+    assert changed.status_code == 200
+
+
+def test_json_response_answers_if_modified_since_with_304(flask_app):
+    modified = datetime(2024, 3, 1, 12, 0)
+    with flask_app.test_request_context('/', headers={'If-Modified-Since': 'Fri, 01 Mar 2024 12:00:00 GMT'}):
+        response = api.json_response({'emp_id': '7'}, modified=modified)
+    assert response.status_code == 304
+
+
+def test_error_response_is_never_conditional(flask_app):
+    with flask_app.test_request_context('/', headers={'If-None-Match': '*'}):
+        response = api.error_response("Employee not found.", 404)
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_pool_sessions_use_utc():
+    # employee_dict labels every timestamp +00:00
+    import app
+    assert app.db_pool._connect_args['init_command'] == "SET time_zone = '+00:00'"
@@ -0,0 +1,98 @@
+import json
+import zipfile
+
+import pytest
+
+import bulk_import
+from bulk_import import BulkImporter, ImageSource, ImportCheckpoint, read_manifest
+
+
+def test_read_csv_manifest(tmp_path):
+    path = tmp_path / 'employees.csv'
+    path.write_text('﻿emp_id,first_name,last_name,pri_skill,location,image\n'
+                    'E1,Ada,Lovelace,Math,London,ada.png\n'
+                    'E2,Alan,Turing,Crypto,"Bletchley, UK",alan.png\n', encoding='utf-8')
+    rows = list(read_manifest(str(path)))
+    assert [(line, row['emp_id'], error) for line, row, error in rows] == [(2, 'E1', None), (3, 'E2', None)]
+    assert rows[1][1]['location'] == 'Bletchley, UK'
+
+
+def test_read_jsonl_manifest_reports_bad_lines(tmp_path):
+    path = tmp_path / 'employees.jsonl'
+    path.write_text('{"emp_id": "E1"}\n\n[1, 2]\nnot json\n{"emp_id": "E2"}\n', encoding='utf-8')
+    rows = list(read_manifest(str(path)))
+    assert [line for line, _, _ in rows] == [1, 3, 4, 5]
+    assert rows[0][1] == {'emp_id': 'E1'}
+    assert rows[1][1] is None and rows[1][2].startswith('Invalid JSON')
+    assert rows[2][1] is None
+    assert rows[3][1] == {'emp_id': 'E2'}
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = ImportCheckpoint(path)
+    checkpoint.mark_pending(['E1', 'E2'])
+    checkpoint.mark_committed(['E1'])
+    checkpoint.mark_pending(['E3'])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"committed": ["E')        # torn write from a crash
+
+    resumed = ImportCheckpoint(path)
+    assert resumed.committed == {'E1'}
+    assert resumed.pending == {'E2', 'E3'}
+
+
+def test_checkpoint_without_path_keeps_state_in_memory():
+    checkpoint = ImportCheckpoint(None)
+    checkpoint.mark_pending(['E1'])
+    checkpoint.mark_committed(['E1'])
+    assert checkpoint.committed == {'E1'}
+    assert not checkpoint.pending
+
+
+def test_image_source_caps_zip_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_import, 'MAX_IMAGE_BYTES', 100)
+    archive = tmp_path / 'images.zip'
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('photos/small.png', b'x' * 100)
+        z.writestr('photos/bomb.png', b'\0' * 10000)
+    images = ImageSource(str(archive))
+    try:
+        assert images.read('small.png') == b'x' * 100
+        with pytest.raises(ValueError, match='too large'):
+            images.read('bomb.png')
+        with pytest.raises(FileNotFoundError):
+            images.read('missing.png')
+    finally:
+        images.close()
+
+
+def test_image_source_stays_inside_directory(tmp_path):
+    (tmp_path / 'photos').mkdir()
+    (tmp_path / 'photos' / 'ada.png').write_bytes(b'png')
+    (tmp_path / 'secret').write_bytes(b'secret')
+    images = ImageSource(str(tmp_path / 'photos'))
+    assert images.read('ada.png') == b'png'
+    with pytest.raises(FileNotFoundError):
+        images.read('../secret')
+
+
+def test_report_keeps_first_errors(monkeypatch):
+    monkeypatch.setattr(bulk_import, 'MAX_REPORTED_ERRORS', 2)
+    importer = BulkImporter(None, None, None)
+    for line in range(5):
+        importer._fail(line, f"E{line}", "bad row")
+    report = importer.snapshot()
+    assert report['failed'] == 5
+    assert [error['line'] for error in report['errors']] == [0, 1]
+    assert report['errors_omitted'] == 3
+    json.dumps(report)
+
+
+def test_resume_of_job_locked_elsewhere_is_a_conflict(monkeypatch):
+    import app
+    monkeypatch.setattr(bulk_import, 'start_job', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bulk_import, 'job_status', lambda base_dir, job_id: {'status': 'running', 'processed': 10})
+    response = app.app.test_client().post('/bulk-import/abc123/resume')
+    assert response.status_code == 409
+    assert response.get_json()['progress'] == {'status': 'running', 'processed': 10}
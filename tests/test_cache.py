@@ -0,0 +1,70 @@
+import cache
+from cache import GENERATION_KEY, LRUCache, NullCache, QueryCache, employee_key
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()['evictions'] == 1
+
+
+def test_lru_expires_entries(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    lru = LRUCache(default_ttl=10)
+    lru.set('short', 1, ttl=1)
+    lru.set('default', 2)
+    lru.set('forever', 3, ttl=0)
+    now[0] = 5
+    assert lru.get('short') is None
+    assert lru.get('default') == 2
+    now[0] = 1000
+    assert lru.get('default') is None
+    assert lru.get('forever') == 3
+    assert lru.stats()['expirations'] == 2
+
+
+def test_counters_survive_clear_and_eviction():
+    lru = LRUCache(max_entries=1)
+    assert lru.get_counter(GENERATION_KEY) == 0
+    lru.incr(GENERATION_KEY)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.clear()
+    assert lru.get_counter(GENERATION_KEY) == 1
+
+
+def test_employee_write_changes_generation_keys():
+    queries = QueryCache(LRUCache())
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+
+    assert queries.get_or_load('list:1', load) == 1
+    assert queries.get_or_load('list:1', load) == 1
+    queries.invalidate_employee('E1')
+    assert queries.backend.get_counter(GENERATION_KEY) == 1
+    assert queries.get_or_load('list:1', load) == 2
+
+
+def test_invalidate_drops_single_employee_entry():
+    queries = QueryCache(LRUCache())
+    queries.get_or_load(employee_key('E1'), lambda: 'old', per_generation=False)
+    queries.invalidate_employees(['E1', 'E2'])
+    assert queries.get_or_load(employee_key('E1'), lambda: 'new', per_generation=False) == 'new'
+    assert queries.backend.get_counter(GENERATION_KEY) == 1
+
+
+def test_unknown_generation_bypasses_cache():
+    queries = QueryCache(NullCache())
+    assert queries.backend.get_counter(GENERATION_KEY) is None
+    values = iter([1, 2])
+    assert queries.get_or_load('list:1', lambda: next(values)) == 1
+    assert queries.get_or_load('list:1', lambda: next(values)) == 2
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+import changes
+
+
+class ScriptedCursor:
+    """Hands out canned results in order and records every statement"""
+
+    def __init__(self, *results, lastrowid=0):
+        self.results = list(results)
+        self.queries = []
+        self.lastrowid = lastrowid
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+def test_change_token_round_trip():
+    token = changes.encode_token(41, 'E|7')
+    assert '=' not in token
+    assert changes.decode_token(token) == (41, 'E|7')
+
+
+@pytest.mark.parametrize('token', ['***', 'bm8gc2VwYXJhdG9y', 'eHx5'])
+def test_bad_change_token_is_rejected(token):
+    with pytest.raises(ValueError, match='Invalid change token'):
+        changes.decode_token(token)
+
+
+def test_next_versions_returns_first_of_reserved_block():
+    cursor = ScriptedCursor(lastrowid=12)
+    assert changes.next_versions(cursor, 3) == 10
+    assert 'LAST_INSERT_ID(version + %s)' in cursor.queries[0]
+
+
+def test_delete_of_missing_employee_takes_no_version():
+    cursor = ScriptedCursor(None)
+    assert not changes.delete_employee(cursor, '404')
+    assert not any('UPDATE' in sql for sql in cursor.queries)
+
+
+def test_changes_since_merges_upserts_and_tombstones_in_version_order():
+    deleted_at = datetime(2024, 3, 1)
+    cursor = ScriptedCursor(
+        [(3, '2', 'upsert-2'), (5, '1', 'upsert-1'), (5, '3', 'upsert-3')],
+        [(4, '9', deleted_at), (5, '2', deleted_at)],
+    )
+    feed, has_more = changes.changes_since(cursor, (2, '7'), limit=4)
+    assert [(kind, version, emp_id) for kind, version, emp_id, _ in feed] == [
+        ('upsert', 3, '2'), ('delete', 4, '9'), ('upsert', 5, '1'), ('delete', 5, '2'),
+    ]
+    assert has_more
+
+
+def test_changes_since_from_the_beginning():
+    cursor = ScriptedCursor([(0, '1', 'row')], [])
+    feed, has_more = changes.changes_since(cursor, None, limit=10)
+    assert feed == [('upsert', 0, '1', ('1', 'row'))]
+    assert not has_more
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+from pymysql.constants import SERVER_STATUS
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class StubConnection:
+    """Just enough of a PyMySQL connection for the pool"""
+
+    def __init__(self):
+        self.open = True
+        self.server_status = 0
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.open:
+            raise ConnectionError("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        conn = StubConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(db_pool.pymysql, 'connect', connect)
+    return opened
+
+
+def make_pool(**kwargs):
+    return ConnectionPool('db.example', 'user', 'secret', 'employee', **kwargs)
+
+
+def test_released_connection_is_reused(connections):
+    pool = make_pool(max_size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(connections) == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_connection_context_manager_returns_connection(connections):
+    pool = make_pool(max_size=1)
+    with pool.connection() as conn:
+        assert pool.stats()['in_use'] == 1
+    assert pool.stats()['idle'] == 1
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_exhausted_pool_times_out(connections):
+    pool = make_pool(max_size=1, checkout_timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_waiter_gets_connection_released_by_another_thread(connections):
+    pool = make_pool(max_size=1, checkout_timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    assert pool.acquire() is conn
+    assert pool.stats()['waits'] == 1
+
+
+def test_expired_connection_is_recycled(connections):
+    pool = make_pool(max_size=1, max_lifetime=0.01)
+    old = pool.acquire()
+    time.sleep(0.02)
+    pool.release(old)
+    new = pool.acquire()
+    assert new is not old
+    assert not old.open
+    assert pool.stats()['connections_recycled'] == 1
+
+
+def test_stale_connection_is_pinged_and_replaced_when_dead(connections):
+    pool = make_pool(max_size=1, ping_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.open = False
+    assert pool.acquire() is not conn
+    assert pool.stats()['connections_broken'] == 1
+
+
+def test_release_rolls_back_open_transaction(connections):
+    pool = make_pool(max_size=1)
+    conn = pool.acquire()
+    conn.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert pool.acquire() is conn
+
+
+def test_context_manager_rolls_back_on_error(connections):
+    pool = make_pool(max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("boom")
+    assert conn.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_connection_with_half_read_result_is_dropped(connections):
+    pool = make_pool(max_size=1)
+    conn = pool.acquire()
+    conn._result = type('Result', (), {'unbuffered_active': True})()
+    pool.release(conn)
+    assert not conn.open
+    assert pool.acquire() is not conn
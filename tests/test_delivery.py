@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.credentials import RefreshableCredentials
+
+import delivery
+from delivery import ImageDelivery, credentials_remaining
+
+IMAGE_URL = f"s3://{delivery.bucket}/employees/E1/profile.jpg"
+
+
+def _client(expires_in=None):
+    client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='key', aws_secret_access_key='secret')
+    if expires_in is not None:
+        expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        metadata = {'access_key': 'key', 'secret_key': 'secret', 'token': 'token',
+                    'expiry_time': expiry.isoformat()}
+        client._request_signer._credentials = RefreshableCredentials.create_from_metadata(
+            metadata, refresh_using=lambda: metadata, method='test')
+    return client
+
+
+def test_static_keys_never_expire():
+    assert credentials_remaining(_client()) is None
+
+
+def test_role_credentials_report_remaining_seconds():
+    assert 1790 <= credentials_remaining(_client(1800)) <= 1800
+
+
+def test_urls_are_reused_with_static_keys():
+    images = ImageDelivery(_client)
+    assert images.url(IMAGE_URL) == images.url(IMAGE_URL)
+
+
+def test_urls_are_not_reused_past_their_credentials():
+    client = _client(delivery.MIN_URL_LIFETIME - 60)
+    images = ImageDelivery(lambda: client)
+    images.url(IMAGE_URL)
+    assert images.stats()['entries'] == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from diagnostics import measure, parse_size, summarize
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('512', 512),
+    ('4KB', 4096),
+    ('256kb', 256 * 1024),
+    (' 8MB ', 8 * 1024 ** 2),
+    ('1.5MB', int(1.5 * 1024 ** 2)),
+    ('1GB', 1024 ** 3),
+    ('10B', 10),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_parse_size_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_size('lots')
+
+
+def test_summarize_percentiles_and_throughput():
+    latencies = [i / 1000 for i in range(1, 101)]     # 1..100 ms
+    summary = summarize(latencies, [], duration=2.0, transferred=4 * 1024 ** 2)
+    assert summary['count'] == 100
+    assert summary['errors'] == 0
+    assert summary['min'] == 1.0
+    assert summary['max'] == 100.0
+    assert summary['mean'] == 50.5
+    assert 49 <= summary['p50'] <= 51
+    assert summary['p99'] >= 99
+    assert summary['ops_per_s'] == 50.0
+    assert summary['mb_per_s'] == 2.0
+
+
+def test_summarize_without_successes():
+    summary = summarize([], ['Timeout: a', 'Timeout: a', 'Refused: b', 'X', 'Y'], duration=1.0)
+    assert summary == {'count': 0, 'errors': 5, 'error_samples': ['Refused: b', 'Timeout: a', 'X']}
+
+
+def test_measure_counts_bytes_and_errors_only_from_their_calls():
+    def operation(i):
+        if i % 4 == 3:
+            raise OSError("boom")
+        return 1024 ** 2 if i % 2 else {'not': 'bytes'}
+
+    summary = measure(operation, repeat=8, concurrency=4)
+    assert summary['count'] == 6
+    assert summary['errors'] == 2
+    assert summary['error_samples'] == ['OSError: boom']
+    assert 'mb_per_s' in summary
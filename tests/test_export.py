@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import datetime
+
+import export
+from schema import EMPLOYEE_FIELDS
+
+
+def row(**values):
+    record = dict.fromkeys(EMPLOYEE_FIELDS)
+    record.update(emp_id='1', created_at=datetime(2024, 3, 1, 12, 0))
+    record.update(values)
+    return tuple(record[field] for field in EMPLOYEE_FIELDS)
+
+
+def read_csv(rows, fields):
+    data = b''.join(export.export_chunks('csv', rows, fields)).decode('utf-8')
+    assert data.startswith('﻿')
+    return list(csv.reader(io.StringIO(data[1:])))
+
+
+def test_csv_escapes_formula_prefixes():
+    rows = [row(first_name=name) for name in ('=SUM(A1)', '+1', '-1', '@cmd', '\tTab', 'Ada')]
+    lines = read_csv(rows, ('first_name',))
+    assert lines[0] == ['first_name']
+    assert [line[0] for line in lines[1:]] == ["'=SUM(A1)", "'+1", "'-1", "'@cmd", "'\tTab", 'Ada']
+
+
+def test_csv_writes_empty_cells_for_null():
+    assert read_csv([row(location=None)], ('emp_id', 'location'))[1] == ['1', '']
+
+
+def test_ndjson_writes_one_object_per_line():
+    data = b''.join(export.export_chunks('ndjson', [row(), row(emp_id='2')], ('emp_id',)))
+    assert [json.loads(line) for line in data.decode().splitlines()] == [{'emp_id': '1'}, {'emp_id': '2'}]
+
+
+def test_xlsx_is_a_valid_workbook():
+    rows = [row(emp_id=str(i), first_name=f'Name <{i}> &\x01') for i in range(500)]
+    data = b''.join(export.export_chunks('xlsx', rows, ('emp_id', 'first_name')))
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        assert '[Content_Types].xml' in workbook.namelist()
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+    assert sheet.count('<row>') == 501
+    assert 'Name &lt;499&gt; &amp;</t>' in sheet
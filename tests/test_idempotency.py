@@ -0,0 +1,91 @@
+import pymysql
+import pytest
+
+import app
+import idempotency
+
+
+class KeyTableCursor:
+    """Keeps the idempotency key table in a dict"""
+
+    def __init__(self):
+        self.rows = {}
+        self._result = None
+
+    def execute(self, sql, params=None):
+        if sql.startswith('INSERT'):
+            key, emp_id, result = params
+            self.rows[key] = (emp_id, result)
+        elif sql.startswith('SELECT'):
+            self._result = self.rows.get(params[0])
+
+    def fetchone(self):
+        return self._result
+
+
+def duplicate(emp_id):
+    return pymysql.err.IntegrityError(app.DUP_ENTRY, f"Duplicate entry '{emp_id}' for key 'PRIMARY'")
+
+
+@pytest.fixture
+def cursor():
+    cursor = KeyTableCursor()
+    idempotency.record(cursor, 'form-key', '7', {'name': 'Ada Lovelace'})
+    return cursor
+
+
+def test_keys_are_stored_as_fixed_width_digests(cursor):
+    assert [len(key) for key in cursor.rows] == [64]
+    assert idempotency.lookup(cursor, 'form-key') == ('7', {'name': 'Ada Lovelace'})
+    assert idempotency.lookup(cursor, 'other-key') is None
+
+
+def test_clean_key_trims_and_bounds():
+    assert idempotency.clean_key('  ') is None
+    assert idempotency.clean_key(None) is None
+    assert len(idempotency.clean_key('k' * 500)) == idempotency.MAX_KEY_LENGTH
+
+
+def test_retry_with_same_key_replays_result(cursor):
+    assert app.replayed_add(cursor, duplicate('7'), '7', 'form-key') == {'name': 'Ada Lovelace'}
+
+
+def test_same_key_for_another_employee_is_rejected(cursor):
+    with pytest.raises(ValueError, match='already used to add employee 7'):
+        app.replayed_add(cursor, duplicate('8'), '8', 'form-key')
+
+
+def test_duplicate_id_without_recorded_key_is_not_replayed(cursor):
+    assert app.replayed_add(cursor, duplicate('7'), '7', 'fresh-key') is None
+    assert app.replayed_add(cursor, duplicate('7'), '7', None) is None
+
+
+def test_other_errors_are_not_replayed(cursor):
+    error = pymysql.err.OperationalError(2013, "Lost connection to MySQL server")
+    assert app.replayed_add(cursor, error, '7', 'form-key') is None
+
+
+class PruneCursor:
+    """Reports ``pending`` expired keys, deleting at most LIMIT per statement"""
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        self.rowcount = min(self.pending, params[1])
+        self.pending -= self.rowcount
+
+
+def test_prune_deletes_expired_keys_in_batches():
+    cursor = PruneCursor(pending=5)
+    assert idempotency.prune(cursor, 86400, batch_size=2) == 5
+    assert len(cursor.statements) == 3
+    assert all(params == (86400, 2) for _, params in cursor.statements)
+    assert 'created_at < NOW() - INTERVAL %s SECOND' in cursor.statements[0][0]
+
+
+def test_prune_disabled_without_retention():
+    assert app.prune_idempotency_keys(retention=0) == 0
@@ -0,0 +1,33 @@
+import base64
+from datetime import datetime
+
+import pytest
+
+import app
+
+
+def row(emp_id, created_at):
+    return (emp_id, 'Ada', 'Lovelace', 'Python', 'London', None, created_at)
+
+
+def test_page_cursor_round_trip():
+    created_at = datetime(2024, 3, 1, 12, 30, 5)
+    token = app.encode_page_cursor(row('E-42|x', created_at))
+    assert '=' not in token
+    assert app.decode_page_cursor(token) == (created_at, 'E-42|x')
+
+
+def test_page_cursor_drops_microseconds():
+    token = app.encode_page_cursor(row('7', datetime(2024, 3, 1, 12, 30, 5, 999)))
+    assert app.decode_page_cursor(token) == (datetime(2024, 3, 1, 12, 30, 5), '7')
+
+
+@pytest.mark.parametrize('token', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'no separator').decode(),
+    base64.urlsafe_b64encode(b'yesterday|7').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe|7').decode(),
+])
+def test_bad_page_cursor_is_rejected(token):
+    with pytest.raises(ValueError, match='Invalid page cursor'):
+        app.decode_page_cursor(token)
@@ -0,0 +1,71 @@
+import pymysql
+import pytest
+
+import search
+
+
+class RecordingCursor:
+    def __init__(self, error=None):
+        self.queries = []
+        self.error = error
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+        if self.error and 'MATCH(' in sql:
+            raise self.error
+
+    def fetchall(self):
+        return []
+
+
+@pytest.fixture
+def fulltext(monkeypatch):
+    monkeypatch.setattr(search, 'fulltext_enabled', True)
+
+
+def test_boolean_query_requires_every_term_as_phrase():
+    assert search._boolean_query('ada  love"lace') == '+"ada" +"lovelace"'
+    assert search._boolean_query('"') == ''
+
+
+def test_fulltext_search_uses_boolean_mode(fulltext):
+    cursor = RecordingCursor()
+    search.search_employees(cursor, 'emp_name', 'ada lovelace')
+    sql, params = cursor.queries[0]
+    assert 'MATCH(first_name, last_name) AGAINST (%s IN BOOLEAN MODE)' in sql
+    assert params[:2] == ('+"ada" +"lovelace"', '+"ada" +"lovelace"')
+
+
+def test_short_term_falls_back_to_like(fulltext):
+    cursor = RecordingCursor()
+    search.search_employees(cursor, 'primary_skills', 'C')
+    sql, params = cursor.queries[0]
+    assert 'pri_skill LIKE %s' in sql and 'MATCH(' not in sql
+    assert params == ('%C%',)
+
+
+def test_contains_mode_uses_like(fulltext):
+    cursor = RecordingCursor()
+    search.search_employees(cursor, 'emp_name', 'ada', match_mode='contains')
+    sql, params = cursor.queries[0]
+    assert 'first_name LIKE %s OR last_name LIKE %s' in sql
+    assert params == ('%ada%', '%ada%')
+
+
+def test_without_indexes_uses_like(monkeypatch):
+    monkeypatch.setattr(search, 'fulltext_enabled', False)
+    cursor = RecordingCursor()
+    search.search_employees(cursor, 'primary_skills', 'python')
+    assert 'pri_skill LIKE %s' in cursor.queries[0][0]
+
+
+def test_missing_fulltext_index_disables_fulltext(fulltext):
+    cursor = RecordingCursor(error=pymysql.err.InternalError(1191, "Can't find FULLTEXT index"))
+    search.search_employees(cursor, 'emp_name', 'ada')
+    assert 'LIKE %s' in cursor.queries[-1][0]
+    assert search.fulltext_enabled is False
+
+
+def test_unknown_search_type_is_rejected():
+    with pytest.raises(ValueError):
+        search.search_employees(RecordingCursor(), 'salary', 'x')
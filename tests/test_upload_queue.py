@@ -0,0 +1,27 @@
+from upload_queue import UploadQueue
+
+
+def make_queue(tmp_path, on_success, removed):
+    return UploadQueue(str(tmp_path), upload=lambda emp_id, path, filename: ('s3://bucket/image.jpg', '160'),
+                       on_success=on_success, remove=removed.append, backoff_base=0, max_attempts=3)
+
+
+def test_source_is_kept_until_the_image_is_attached(tmp_path):
+    removed = []
+    attached = []
+
+    def on_success(emp_id, uploaded):
+        if not attached:
+            attached.append(None)
+            raise RuntimeError("database unavailable")
+        attached.append(uploaded)
+
+    queue = make_queue(tmp_path, on_success, removed)
+    queue.enqueue('7', 's3://bucket/uploads/7.jpg', 'ada.jpg')
+    queue._process(queue._claim())
+    assert removed == []
+
+    queue._process(queue._claim())
+    assert attached[-1] == ('s3://bucket/image.jpg', '160')
+    assert removed == ['s3://bucket/uploads/7.jpg']
+    assert queue._claim() is None
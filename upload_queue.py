@@ -0,0 +1,296 @@
+"""Persistent background queue for employee image uploads
+
+AddEmp spools the uploaded file to local disk, records a job in a SQLite
+database next to it and returns straight away. Worker threads claim jobs,
+upload them to S3 with exponential backoff, and call back into the app to set
+the employee's ``image_url``. Because both the spooled files and the job table
+live on disk, queued work survives a process restart; jobs left ``running`` by
+a crashed process are reclaimed once their lease expires. A job that fails for
+good gives up its spooled file at once; its row stays for ``failed_retention``
+seconds so the error can be looked up, then the workers prune it.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class UploadQueue:
+    """SQLite-backed job queue with a pool of upload worker threads
+
+    ``upload(emp_id, path, filename)`` must return ``(url, variants)``, the
+    stored image URL and its thumbnail widths. ``path`` is usually a spooled
+    file but may be any string the upload callable understands (the app also
+    queues ``s3://`` URIs of browser uploads). ``on_success(emp_id, (url,
+    variants))`` and ``on_failure(emp_id, error)`` are called once per job when
+    it finishes for good. ``remove(path)`` then deletes the job's source; it
+    defaults to removing the spooled file.
+    """
+
+    def __init__(self, spool_dir, upload, on_success, on_failure=None, remove=os.remove, workers=4,
+                 max_attempts=5, backoff_base=2.0, backoff_max=300.0, lease_timeout=300.0,
+                 poll_interval=1.0, failed_retention=7 * 86400, prune_interval=3600, stats_ttl=5.0):
+        self.spool_dir = spool_dir
+        self.db_path = os.path.join(spool_dir, 'queue.db')
+        self.upload = upload
+        self.on_success = on_success
+        self.on_failure = on_failure
+        self.remove = remove
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.failed_retention = failed_retention
+        self.prune_interval = prune_interval
+        self.stats_ttl = stats_ttl
+        self._next_prune = 0.0
+        self._counts = None             # (expires_at, counts by status, oldest pending enqueued_at)
+
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._metrics = {'enqueued': 0, 'completed': 0, 'failed': 0, 'retries': 0,
+                         'upload_time_total': 0.0, 'lag_max': 0.0}
+
+        os.makedirs(spool_dir, exist_ok=True)
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    emp_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    spool_path TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    lease_expires_at REAL,
+                    finished_at REAL,
+                    last_error TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_upload_jobs_ready ON upload_jobs (status, next_attempt_at)")
+
+    def _db(self):
+        # One short-lived connection per operation keeps sqlite3 thread-safe
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Closing(db)
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def spool(self, fileobj, filename):
+        """Copy an upload to local disk and return the spool path"""
+        ext = os.path.splitext(filename)[1].lower()
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}{ext}")
+        with open(path, 'wb') as f:
+            while True:
+                chunk = fileobj.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+    def discard(self, spool_path):
+        """Delete a job's source once it is uploaded or no longer needed"""
+        try:
+            self.remove(spool_path)
+        except OSError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not remove upload source {spool_path}: {e}")
+
+    def enqueue(self, emp_id, spool_path, filename):
+        now = time.time()
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO upload_jobs (emp_id, filename, spool_path, enqueued_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (emp_id, filename, spool_path, now, now)
+            )
+        with self._lock:
+            self._metrics['enqueued'] += 1
+        with self._wakeup:
+            self._wakeup.notify()
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def _claim(self):
+        """Atomically take the next due job (or one whose lease has expired)"""
+        now = time.time()
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM upload_jobs "
+                "WHERE (status = 'queued' AND next_attempt_at <= ?) "
+                "   OR (status = 'running' AND lease_expires_at <= ?) "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE upload_jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ? "
+                "WHERE id = ?",
+                (now + self.lease_timeout, row['id'])
+            )
+            db.execute("COMMIT")
+            return dict(row, attempts=row['attempts'] + 1)
+
+    def _backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _process(self, job):
+        started = time.time()
+        with self._lock:
+            self._metrics['lag_max'] = max(self._metrics['lag_max'], started - job['enqueued_at'])
+        try:
+            image_url = self.upload(job['emp_id'], job['spool_path'], job['filename'])
+            self.on_success(job['emp_id'], image_url)
+        except Exception as e:
+            error = str(e)
+            if job['attempts'] >= self.max_attempts:
+                with self._db() as db:
+                    db.execute(
+                        "UPDATE upload_jobs SET status = 'failed', finished_at = ?, last_error = ? WHERE id = ?",
+                        (time.time(), error, job['id'])
+                    )
+                self.discard(job['spool_path'])
+                with self._lock:
+                    self._metrics['failed'] += 1
+                print(f"❌ Image upload for employee {job['emp_id']} failed after {job['attempts']} attempts: {error}")
+                if self.on_failure:
+                    try:
+                        self.on_failure(job['emp_id'], error)
+                    except Exception as callback_error:
+                        print(f"❌ Upload failure callback error: {callback_error}")
+            else:
+                with self._db() as db:
+                    db.execute(
+                        "UPDATE upload_jobs SET status = 'queued', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (time.time() + self._backoff(job['attempts']), error, job['id'])
+                    )
+                with self._lock:
+                    self._metrics['retries'] += 1
+            return
+
+        with self._db() as db:
+            db.execute("DELETE FROM upload_jobs WHERE id = ?", (job['id'],))
+        self.discard(job['spool_path'])
+        with self._lock:
+            self._metrics['completed'] += 1
+            self._metrics['upload_time_total'] += time.time() - started
+
+    def prune(self):
+        """Delete failed jobs older than ``failed_retention``; returns how many"""
+        with self._db() as db:
+            cursor = db.execute("DELETE FROM upload_jobs WHERE status = 'failed' AND finished_at < ?",
+                                (time.time() - self.failed_retention,))
+        return cursor.rowcount
+
+    def _maybe_prune(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_prune:
+                return
+            self._next_prune = now + self.prune_interval
+        try:
+            pruned = self.prune()
+        except sqlite3.Error as e:
+            print(f"❌ Upload queue error: {e}")
+            return
+        if pruned:
+            print(f"🧹 Pruned {pruned} failed upload jobs")
+
+    def _worker(self):
+        while not self._stop.is_set():
+            self._maybe_prune()
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"❌ Upload queue error: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._process(job)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"upload-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Stop claiming new jobs and wait for in-flight uploads to finish"""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def _job_counts(self):
+        """Jobs per status and the oldest pending enqueue time, re-read at most every ``stats_ttl`` seconds"""
+        with self._lock:
+            cached = self._counts
+        if cached and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+        with self._db() as db:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM upload_jobs GROUP BY status").fetchall())
+            oldest = db.execute(
+                "SELECT MIN(enqueued_at) FROM upload_jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+        with self._lock:
+            self._counts = (time.monotonic() + self.stats_ttl, counts, oldest)
+        return counts, oldest
+
+    def stats(self):
+        now = time.time()
+        counts, oldest = self._job_counts()
+        with self._lock:
+            stats = dict(self._metrics)
+        completed = stats['completed']
+        stats['upload_time_avg'] = round(stats.pop('upload_time_total') / completed, 3) if completed else 0.0
+        stats['lag_max'] = round(stats['lag_max'], 3)
+        stats.update({
+            'depth': counts.get('queued', 0) + counts.get('running', 0),
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'failed_total': counts.get('failed', 0),
+            'oldest_pending_age': round(now - oldest, 3) if oldest else 0.0,
+            'workers': len(self._threads),
+        })
+        return stats
+
+
+class _Closing:
+    """Context manager that closes (rather than commits) a sqlite3 connection"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, *exc):
+        self.db.close()
@@ -0,0 +1,21 @@
+"""Input validation shared by the web forms and the bulk importer"""
+import re
+
+
+def validate_emp_id(emp_id):
+    return emp_id.isdigit() and len(emp_id) >= 3
+
+
+def validate_name(name):
+    return bool(re.match(r"^[A-Za-z\s]{2,50}$", name.strip()))
+
+
+def employee_error(emp_id, first_name, last_name):
+    """First validation problem with an employee's identifying fields, or None"""
+    if not emp_id or not first_name or not last_name:
+        return "Employee ID, First Name, and Last Name are required."
+    if not validate_emp_id(emp_id):
+        return "Employee ID must contain only numbers (min 3 digits)."
+    if not validate_name(first_name) or not validate_name(last_name):
+        return "Names must contain only letters (2-50 characters)."
+    return None